@@ -0,0 +1,70 @@
+'''
+batch_build scheduling on the fake backend: a nightly-sized manifest of eye, lip and spine builds plus jobs
+that fail, crash and hang, run at several worker counts
+
+Usage:
+    python bench_stuff/bench_batch_build.py 1 4 8
+'''
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rig_stuff import batch_build  # noqa: E402
+
+
+def fail(spec):
+    raise RuntimeError("Missing joint C_Spine_0")
+
+
+def crash(spec):
+    os._exit(3)
+
+
+def sleep(spec):
+    # Stands in for a slow build, or a hung one past its timeout
+    time.sleep(spec)
+
+
+def manifest(assets=200):
+    jobs = [{"asset": f"asset_{i:03d}",
+             "builds": [{"builder": "eyes", "spec": {"spans": 20, "compact": bool(i % 2)}},
+                        {"builder": "lips"},
+                        {"builder": "bench_stuff.bench_batch_build.sleep", "spec": 0.05}]}
+            for i in range(assets)]
+    jobs += [{"asset": "bad_fail", "builds": [{"builder": "bench_stuff.bench_batch_build.fail"}]},
+             {"asset": "bad_crash", "builds": [{"builder": "bench_stuff.bench_batch_build.crash"}]},
+             {"asset": "bad_hang", "timeout": 2, "builds": [{"builder": "bench_stuff.bench_batch_build.sleep",
+                                                             "spec": 60}]}]
+    return {"defaults": {"timeout": 60, "retries": 1}, "jobs": jobs}
+
+
+def bench(workers=(1, 4, 8), assets=200):
+    folder = tempfile.mkdtemp()
+    try:
+        path = os.path.join(folder, "nightly.json")
+        with open(path, "w") as f:
+            json.dump(manifest(assets), f)
+
+        for count in workers:
+            log_path = os.path.join(folder, f"nightly_{count}_results.json")
+            start = time.perf_counter()
+            batch_build.main([path, "--backend", "fake", "--workers", str(count), "--log", log_path])
+            elapsed = time.perf_counter() - start
+            with open(log_path) as f:
+                log = json.load(f)
+            statuses = {r["asset"]: (r["status"], len(r["attempts"])) for r in log["jobs"]
+                        if r["asset"].startswith("bad")}
+            in_order = [r["asset"] for r in log["jobs"]] == [j["asset"] for j in manifest(assets)["jobs"]]
+            print(f"{count:>3} workers | {elapsed:7.2f}s | {log['ok']} ok | {statuses} | manifest order {in_order}\n")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)  # Logs are read above, nothing to keep
+
+
+if __name__ == "__main__":
+    bench([int(c) for c in sys.argv[1:]] or (1, 4, 8), assets=int(os.environ.get("ASSETS", 200)))
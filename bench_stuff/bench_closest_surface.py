@@ -0,0 +1,144 @@
+'''
+closest_surface on a synthetic ribbon: accuracy against a dense sampling of the surface, solve time per frame for
+the whole chain at once, and setup_ribbon_base with follow_jnts=True against follow_jnts="bake" on fake maya.cmds.
+Per frame cost of the live closestPointOnSurface and decomposeMatrix nodes needs Maya, time a playblast of both
+setups there to compare.
+
+Usage:
+    python bench_stuff/bench_closest_surface.py 10 100 1000
+'''
+
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_stuff import fake_maya
+
+cmds = fake_maya.install()
+
+from rig_stuff import closest_surface, nurbs_eval, re_jnt_nurb_combiners  # noqa: E402
+
+
+def clamped_knots(spans, degree):
+    return np.concatenate([np.zeros(degree), np.linspace(0.0, 1.0, spans + 1), np.ones(degree)])
+
+
+def spine(x, length):
+    # Wavy chain along x, what the ribbon is lofted along
+    t = x / length * 2 * math.pi
+    return np.stack([x, 1.5 * np.sin(t), 0.5 * np.sin(2 * t)], axis=-1)
+
+
+def ribbon(length=20.0, spans=8, width=4.0, degree_v=1, twist=0.0, weights=False):
+    """
+    Surface data like jnt_chain_to_surface leaves after its rebuild, degree 3 along the chain. degree_v=3 with a twist
+    and uneven weights makes a harder, rational surface
+    """
+    nu, nv = spans + 3, degree_v + 1
+    x = np.linspace(0.0, length, nu)
+    centre = spine(x, length)
+    across = np.linspace(-0.5, 0.5, nv) * width
+    angle = twist * x / length
+    offset = np.stack([np.zeros_like(angle), np.sin(angle), np.cos(angle)], axis=1)
+    points = centre[:, None, :] + offset[:, None, :] * across[None, :, None]
+    if degree_v > 1:
+        points[:, :, 1] += 0.3 * np.sin(across * 3)[None, :]
+    w = np.ones((nu, nv))
+    if weights:
+        w += 0.5 * np.abs(np.sin(np.arange(nu * nv))).reshape(nu, nv)
+    cvs = np.concatenate([points * w[..., None], w[..., None]], axis=2)
+    return {"cvs": cvs, "knots_u": clamped_knots(spans, 3), "knots_v": clamped_knots(1, degree_v),
+            "degree_u": 3, "degree_v": degree_v}
+
+
+def near_points(count, length=20.0, seed=0):
+    rng = np.random.default_rng(seed)
+    return spine(rng.uniform(-1.0, length + 1.0, count), length) + rng.normal(0.0, 0.6, (count, 3))
+
+
+def dense_closest(data, points, su=4000, sv=64):
+    u, v = (g.ravel() for g in np.meshgrid(np.linspace(0, 1, su), np.linspace(0, 1, sv), indexing="ij"))
+    positions = nurbs_eval.eval_surface(data, u, v, derivs=0)["position"]
+    best = np.full(len(points), np.inf)
+    for start in range(0, len(positions), 8192):
+        block = positions[start:start + 8192]
+        best = np.minimum(best, np.linalg.norm(points[:, None, :] - block[None], axis=2).min(axis=1))
+    return best
+
+
+def check():
+    points = near_points(400)
+    for label, data in (("ribbon", ribbon()), ("rational twisted 3x3", ribbon(degree_v=3, twist=2.0, weights=True))):
+        hit = closest_surface.closest_params(data, points)
+        dense = dense_closest(data, points)
+        e = nurbs_eval.eval_surface(data, hit["u"], hit["v"])
+        r = points - hit["position"]
+        inside = (hit["u"] > 1e-9) & (hit["u"] < 1 - 1e-9) & (hit["v"] > 1e-9) & (hit["v"] < 1 - 1e-9)
+        # Inside the surface the offset to the closest point is normal to it
+        cosines = np.abs(np.stack([np.einsum("ij,ij->i", r, nurbs_eval.normalize(e[d])) for d in ("du", "dv")]))
+        cosines = cosines[:, inside] / np.maximum(np.linalg.norm(r[inside], axis=1), 1e-12)
+        print(f"check {label:<20}: newton - dense sampling {(hit['distance'] - dense).max():+.2e} worst | "
+              f"off normal {cosines.max() if cosines.size else 0.0:.1e} | {(~inside).sum()} on an edge")
+
+
+def solve_frames(count, frames):
+    data = ribbon()
+    base = near_points(count)
+    seed, total = 0.0, 0.0
+    for frame in range(frames):
+        points = base + 0.2 * math.sin(frame * 0.3) * np.array([0.0, 1.0, 0.5])
+        start = time.perf_counter()
+        closest_surface.seed_params(data, points)
+        seed += time.perf_counter() - start
+        start = time.perf_counter()
+        closest_surface.closest_params(data, points)
+        total += time.perf_counter() - start
+    print(f"{count:>6} joints | solve {total / frames * 1000:8.3f}ms/frame, seed {seed / frames * 1000:.3f} of it")
+
+
+def ribbon_setup(count, follow_jnts):
+    cmds.nodes.clear()
+    cmds.connections.clear()
+    joints = cmds.add_joint_chain("spine", count)
+    positions = spine(np.linspace(0.0, 20.0, count), 20.0) + [0.0, 0.2, 0.0]
+    for joint, position in zip(joints, positions.tolist()):
+        for axis, value in zip("XYZ", position):
+            cmds.setAttr(f"{joint}.translate{axis}", value)
+
+    def chain_to_surface(j, name="", width=4):
+        # The fake has no loft, the ribbon's data comes from ribbon() instead of OpenMaya
+        cmds.add_node(f"{name}_ribbonShape", "nurbsSurface")
+        return [f"{name}_ribbonShape", cmds.add_node(f"{name}_curve", "transform")]
+
+    patched = re_jnt_nurb_combiners.jnt_chain_to_surface, closest_surface.get_world_surface_data
+    re_jnt_nurb_combiners.jnt_chain_to_surface = chain_to_surface
+    closest_surface.get_world_surface_data = lambda surface: ribbon(spans=max(4, count // 4))
+    cmds.reset_calls()
+    start = time.perf_counter()
+    try:
+        re_jnt_nurb_combiners.setup_ribbon_base(j=joints[0], name="spine", follow_jnts=follow_jnts)
+    finally:
+        re_jnt_nurb_combiners.jnt_chain_to_surface, closest_surface.get_world_surface_data = patched
+    elapsed = time.perf_counter() - start
+    live = sum(node["type"] in ("closestPointOnSurface", "decomposeMatrix") for node in cmds.nodes.values())
+    label = "bake" if follow_jnts == "bake" else "network"
+    print(f"{count:>6} joints | {label:<7} setup {elapsed:8.4f}s | {cmds.call_count():>6} scene calls | "
+          f"{live} live closestPointOnSurface and decomposeMatrix nodes")
+
+
+def bench(counts=(10, 100, 1000), frames=48):
+    check()
+    for count in counts:
+        solve_frames(count, frames)
+    for count in counts[:2]:
+        for follow_jnts in (True, "bake"):
+            ribbon_setup(count, follow_jnts)
+
+
+if __name__ == "__main__":
+    bench([int(c) for c in sys.argv[1:]] or (10, 100, 1000))
@@ -0,0 +1,65 @@
+'''
+Cost of the cmds profiler per call, off and on, then profiles of zero_out and build_eyes on fake maya.cmds
+
+Usage:
+    python bench_stuff/bench_cmds_profiler.py 200000
+    TRACE=cmds_trace.json python bench_stuff/bench_cmds_profiler.py  # keep the Chrome trace to open
+'''
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_stuff import fake_maya
+
+fake = fake_maya.install()
+
+from rig_stuff import cmds_profiler, re_build_eye, zero_out_controllers  # noqa: E402
+from rig_stuff.lazy_cmds import cmds  # noqa: E402
+
+
+def per_call(label, target, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        target.nodeType("ctrl_0")
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {elapsed / count * 1e9:8.0f} ns per call")
+
+
+def bench(count=200000):
+    fake.add_control("ctrl_0")
+    per_call("maya.cmds", fake, count)
+    per_call("lazy_cmds, profiler off", cmds, count)
+    with cmds_profiler.profile():
+        per_call("lazy_cmds, profiler on", cmds, count)
+
+    for i in range(100):
+        fake.add_control(f"ctrl_{i}")
+        fake.setAttr(f"ctrl_{i}.translateX", 1.0)
+    with cmds_profiler.profile() as profiler:
+        with cmds_profiler.span("zero_out"):
+            zero_out_controllers.zero_out([f"ctrl_{i}" for i in range(100)])
+        with cmds_profiler.span("build_eyes"):
+            re_build_eye.build_eyes()
+    print("\nBy command\n" + profiler.report(top=10))
+    print("\nBy call site\n" + profiler.report(top=10, by="site"))
+    if os.environ.get("TRACE"):
+        path = profiler.export_chrome_trace(os.environ["TRACE"])
+        print(f"\nChrome trace of {len(profiler)} calls -> {path}")
+        return
+    folder = tempfile.mkdtemp()
+    try:
+        with open(profiler.export_chrome_trace(os.path.join(folder, "cmds_trace.json"))) as f:
+            events = len(json.load(f)["traceEvents"])
+        print(f"\nChrome trace of {len(profiler)} calls, {events} events. Set TRACE to keep it")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    bench(*[int(c) for c in sys.argv[1:]])
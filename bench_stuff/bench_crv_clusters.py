@@ -0,0 +1,65 @@
+'''
+crv_to_clusters call count and time against the old per CV version on fake maya.cmds
+
+Usage:
+    python bench_stuff/bench_crv_clusters.py 50 500 2000
+'''
+
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_stuff import fake_maya
+
+cmds = fake_maya.install()
+
+from rig_stuff import re_jnt_nurb_combiners  # noqa: E402
+
+
+def legacy_crv_to_clusters(crv="", exclude=None):
+    # crv_to_clusters before the bulk read, O(n^2) from cvs.index and 4 calls per CV
+    clusters = []
+    cvs = cmds.ls(f'{crv}.cv[:]', fl=True)
+    if exclude == "front":
+        center_cvs = [cv for cv in cvs if cmds.getAttr(cv)[0][0] == 0.0]
+        center_cvs_z = [cmds.getAttr(cv)[0][2] for cv in center_cvs]
+        cvs.remove(center_cvs[center_cvs_z.index(max(center_cvs_z))])
+    padding = len(str(cvs.index(cvs[-1])))
+    for cv in cvs:
+        z_padded = f"{str(cvs.index(cv)).rjust(padding, '0')}"
+        n = f"{str(crv.partition('_')[0])}_cluster_{z_padded}"
+        clust = cmds.cluster(cv, name=f"{n}")
+        grp = cmds.group(em=True, name=f"{n}_grp")
+        cmds.matchTransform(grp, clust)
+        cmds.parent(clust[1], grp)
+        clusters.append(grp)
+    grp = cmds.group(em=True, name=f"{crv.partition('_')[0]}_cluster_grp")
+    cmds.parent(clusters, grp)
+    clusters.sort()
+    return clusters
+
+
+def collar(count):
+    # Ring of CVs around a neck, with centre CVs at the front and back
+    return [(math.sin(i * 2 * math.pi / count) if i % (count // 2) else 0.0, 1.0,
+             math.cos(i * 2 * math.pi / count)) for i in range(count)]
+
+
+def bench(counts=(50, 500, 2000)):
+    for count in counts:
+        for label, func in (("legacy", legacy_crv_to_clusters), ("bulk", re_jnt_nurb_combiners.crv_to_clusters)):
+            cmds.nodes.clear()
+            cmds.add_curve("Collar_curve", collar(count))
+            cmds.reset_calls()
+            start = time.perf_counter()
+            clusters = func(crv="Collar_curve", exclude="front")
+            elapsed = time.perf_counter() - start
+            print(f"{count:>5} CVs | {label:<6} {elapsed:8.4f}s | {cmds.call_count():>6} scene calls | "
+                  f"{len(clusters)} clusters")
+
+
+if __name__ == "__main__":
+    bench([int(c) for c in sys.argv[1:]] or (50, 500, 2000))
@@ -0,0 +1,75 @@
+'''
+Counts scene calls per span for make_eyelid_joints, old per node cmds calls vs GraphBatch, on fake maya.cmds
+
+Usage:
+    python bench_stuff/bench_eyelid.py 14 50 100
+'''
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_stuff import fake_maya
+
+cmds = fake_maya.install()
+
+from rig_stuff import re_build_eye  # noqa: E402
+from rig_stuff.graph_batch import GraphBatch  # noqa: E402
+
+
+def legacy_make_eyelid_joints(spans=14, name="", parent=None):
+    # make_eyelid_joints before GraphBatch, one cmds call per node, attribute and connection
+    parent_grp = parent or name[:-3].strip() + "grp"
+    for i in range(1, spans):
+        z_padded = str(i).rjust(2, '0')
+        curve = f"{name}_curveShape"
+        jnt = f"{name}_jnt_{z_padded}"
+        poc_info = f"{name}_pointOnCurveInfo_{z_padded}"
+        vctr_prod = f"{name}_vectorProduct_{z_padded}"
+        multi_div = f"{name}_multiplyDivide_{z_padded}"
+        cmds.joint(name=jnt, radius=0.25)
+        cmds.parent(jnt, parent_grp)
+        cmds.createNode('pointOnCurveInfo', name=poc_info)
+        cmds.connectAttr(f"{curve}.local", f"{poc_info}.inputCurve")
+        cmds.setAttr(f"{poc_info}.parameter", float(i) / float(spans))
+        cmds.setAttr(f"{poc_info}.turnOnPercentage", 1)
+        cmds.createNode('vectorProduct', name=vctr_prod)
+        cmds.setAttr(f"{vctr_prod}.operation", 0)
+        cmds.setAttr(f"{vctr_prod}.normalizeOutput", 1)
+        cmds.createNode('multiplyDivide', name=multi_div)
+        cmds.setAttr(f"{multi_div}.input2X", 4)
+        cmds.setAttr(f"{multi_div}.input2Y", 4)
+        cmds.setAttr(f"{multi_div}.input2Z", 4)
+        cmds.connectAttr(f"{poc_info}.result.position", f"{vctr_prod}.input1")
+        cmds.connectAttr(f"{vctr_prod}.output", f"{multi_div}.input1")
+        cmds.connectAttr(f"{multi_div}.output", f"{jnt}.translate")
+        cmds.aimConstraint(parent_grp, jnt, mo=False, aim=[0, 0, -1], wut="objectrotation", wuo=parent_grp)
+
+
+def run(label, spans, func):
+    cmds.reset()  # Selection too, or the first joint parents under a deleted one
+    cmds.add_node("Lf_eyelid_grp")
+    cmds.reset_calls()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    calls = cmds.call_count()
+    print(f"{spans:>4} spans | {label:<10} {elapsed:8.4f}s | {calls:>6} scene calls | {calls / (spans - 1):6.2f} per span")
+
+
+def bench(spans_list=(14, 50, 100)):
+    for spans in spans_list:
+        run("legacy", spans, lambda: legacy_make_eyelid_joints(spans, name="Lf_eyelid_upp"))
+        run("mel batch", spans, lambda: re_build_eye.make_eyelid_joints(spans, name="Lf_eyelid_upp"))
+
+        def replay():
+            batch = GraphBatch()
+            re_build_eye.make_eyelid_joints(spans, name="Lf_eyelid_upp", batch=batch)
+            batch.commit(mode="cmds")
+        run("cmds batch", spans, replay)
+
+
+if __name__ == "__main__":
+    bench([int(s) for s in sys.argv[1:]] or (14, 50, 100))
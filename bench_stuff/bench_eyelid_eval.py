@@ -0,0 +1,89 @@
+'''
+Legacy vs compact eyelid networks side by side: DG node count, and per frame evaluation time when run in mayapy
+
+Usage:
+    python bench_stuff/bench_eyelid_eval.py 14 50      # node counts on fake maya.cmds
+    mayapy bench_stuff/bench_eyelid_eval.py --maya 14 50  # node counts and evaluation timing in Maya
+'''
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+IN_MAYA = "--maya" in sys.argv
+if IN_MAYA:
+    import maya.standalone
+    maya.standalone.initialize()
+    import maya.cmds as cmds
+else:
+    from bench_stuff import fake_maya
+    cmds = fake_maya.install()
+
+from rig_stuff.graph_batch import GraphBatch  # noqa: E402
+from rig_stuff.re_build_eye import make_eyelid_joints  # noqa: E402
+
+LIDS = ("Lf_eyelid_upp", "Lf_eyelid_low", "Rt_eyelid_upp", "Rt_eyelid_low")
+
+
+def build_scene(spans, compact):
+    """
+    Fresh scene with 4 animated lid curves and their joints
+
+    Returns:
+        tuple: (every lid joint, node count of the empty scene)
+    """
+    if IN_MAYA:
+        cmds.file(new=True, force=True)
+    else:
+        cmds.nodes.clear()
+    empty = node_count()
+    batch = GraphBatch("bench")
+    joints = []
+    for lid in LIDS:
+        grp = lid[:-3] + "grp"
+        if not cmds.ls(grp):
+            if IN_MAYA:
+                cmds.group(em=True, name=grp)
+            else:
+                cmds.add_node(grp)
+        if IN_MAYA:
+            curve = cmds.curve(d=3, p=[(-1.5, 0, 1), (-0.5, 0.6, 1.2), (0.5, 0.6, 1.2), (1.5, 0, 1)], name=f"{lid}_curve")
+            cmds.rename(cmds.listRelatives(curve, shapes=True)[0], f"{lid}_curveShape")
+            cmds.parent(curve, grp)
+            cmds.setKeyframe(curve, at="translateY", t=1, v=0)
+            cmds.setKeyframe(curve, at="translateY", t=24, v=-0.5)
+        joints += make_eyelid_joints(spans, name=lid, batch=batch, compact=compact)
+    batch.commit(mode="mel" if IN_MAYA else "cmds")
+    return joints, empty
+
+
+def node_count():
+    if IN_MAYA:
+        return len(cmds.ls(dep=True))
+    return len(cmds.nodes)
+
+
+def eval_per_frame(joints, frames=200):
+    # Changing time then pulling every joint's world matrix forces the lid networks to evaluate
+    start = time.perf_counter()
+    for frame in range(frames):
+        cmds.currentTime(frame % 24 + 1)
+        for jnt in joints:
+            cmds.getAttr(f"{jnt}.worldMatrix[0]")
+    return (time.perf_counter() - start) / frames
+
+
+def bench(spans_list=(14, 50)):
+    for spans in spans_list:
+        for compact in (False, True):
+            joints, empty = build_scene(spans, compact)
+            line = f"{spans:>4} spans | {'compact' if compact else 'legacy':<8} | {node_count() - empty:>5} nodes"
+            if IN_MAYA:
+                line += f" | {eval_per_frame(joints) * 1000:7.3f} ms per frame"
+            print(line)
+
+
+if __name__ == "__main__":
+    bench([int(s) for s in sys.argv[1:] if s.isdigit()] or (14, 50))
@@ -0,0 +1,40 @@
+'''
+Cold import time of every rig_stuff module against fake maya.cmds, each in a fresh interpreter.
+Also reports scene calls made at import, which should be 0 now that builds only run from their entry points
+
+Usage:
+    python bench_stuff/bench_import.py
+'''
+
+import glob
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = '''
+import sys, time
+sys.path.insert(0, {root!r})
+from bench_stuff import fake_maya
+cmds = fake_maya.install()
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start, cmds.call_count())
+'''
+
+
+def bench():
+    modules = sorted(f"rig_stuff.{os.path.basename(p)[:-3]}" for p in glob.glob(os.path.join(ROOT, "rig_stuff", "*.py"))
+                     if not p.endswith("__init__.py"))
+    total = 0.0
+    for module in modules:
+        out = subprocess.check_output([sys.executable, "-c", PROBE.format(root=ROOT, module=module)], text=True)
+        elapsed, calls = out.split()
+        total += float(elapsed)
+        print(f"{module:<36} {float(elapsed) * 1000:8.3f} ms | {calls:>4} scene calls at import")
+    print(f"{'total':<36} {total * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,159 @@
+'''
+keep_out on a synthetic neck: BVH build and refit, per frame resolve of a collar pushed into the neck,
+checked against brute force, and the scene calls of the baked setup against the cMuscle one on fake maya.cmds.
+Per frame cost of the live keepOut nodes needs Maya, time a playblast of the cMuscle setup there to compare.
+
+Usage:
+    python bench_stuff/bench_keep_out.py 100 1000 10000
+'''
+
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_stuff import fake_maya
+
+cmds = fake_maya.install()
+
+from rig_stuff import keep_out, re_jnt_nurb_combiners  # noqa: E402
+
+
+def neck(rings=64, sides=128, radius=1.0, height=4.0):
+    # Capped cylinder around the y axis, quads on the sides and fans on the caps
+    angles = np.arange(sides) * 2 * math.pi / sides
+    y = np.linspace(0.0, height, rings)
+    positions = np.stack([np.tile(np.sin(angles), rings) * radius, np.repeat(y, sides),
+                          np.tile(np.cos(angles), rings) * radius], axis=1)
+    positions = np.vstack([positions, [[0.0, 0.0, 0.0], [0.0, height, 0.0]]])
+    counts, indices = [], []
+    for r in range(rings - 1):
+        for s in range(sides):
+            a, b = r * sides + s, r * sides + (s + 1) % sides
+            counts.append(4)
+            indices += [a, b, b + sides, a + sides]
+    bottom, top = len(positions) - 2, len(positions) - 1
+    for s in range(sides):
+        counts += [3, 3]
+        indices += [bottom, (s + 1) % sides, s, top, (rings - 1) * sides + s, (rings - 1) * sides + (s + 1) % sides]
+    return positions, keep_out.triangulate(counts, indices)
+
+
+def collar_frames(frames, points, seed=0):
+    # Collar ring that sways and squeezes into the neck, a third of it inside on most frames
+    rng = np.random.default_rng(seed)
+    angles = np.linspace(0.0, 2 * math.pi, points, endpoint=False)
+    t = np.linspace(0.0, 2 * math.pi, frames)[:, None]
+    radius = 1.05 - 0.25 * np.sin(t) * np.cos(angles)[None, :]
+    height = np.broadcast_to(1.5 + 0.3 * np.sin(angles * 3 + t), radius.shape)
+    ring = np.stack([np.sin(angles)[None, :] * radius, height, np.cos(angles)[None, :] * radius], axis=2)
+    return ring + rng.normal(0.0, 0.01, ring.shape)
+
+
+def brute_closest(positions, triangles, points):
+    best = np.full(len(points), np.inf)
+    corners = positions[triangles]
+    for tri in range(len(triangles)):
+        a, b, c = (np.broadcast_to(corners[tri, i], points.shape) for i in range(3))
+        weights = keep_out.closest_on_triangles(points, a, b, c)
+        on_mesh = weights[:, :1] * a + weights[:, 1:2] * b + weights[:, 2:] * c
+        best = np.minimum(best, np.linalg.norm(on_mesh - points, axis=1))
+    return best
+
+
+def check(bvh, positions, triangles):
+    points = collar_frames(2, 200)[1]
+    hit = bvh.closest(points)
+    error = np.abs(hit["distance"] - brute_closest(positions, triangles, points)).max()
+    inside = np.hypot(points[:, 0], points[:, 2]) < 1.0
+    _, moved = keep_out.resolve_keep_out(bvh, points, keep_out.keep_out_directions(points))
+    _, pushed = keep_out.resolve_keep_out(bvh, points)
+    print(f"check: closest error {error:.2e} | direction inside {(moved == inside).mean():.1%} | "
+          f"closest inside {(pushed == inside).mean():.1%} of {len(points)} points")
+
+
+def rig_keep_out_sel():
+    # What cMuscle_rigKeepOutSel leaves in the scene, a keepOut with its shape and driven node over each selected
+    # transform's children. The fake has no cMuscle plugin, the calls made by the setup are what's counted
+    for index, grp in enumerate(cmds.selection):
+        keep = cmds.add_node(f"cMuscleKeepOut{index + 1}", "transform")
+        children = cmds._children(grp)
+        cmds.nodes[keep]["parent"] = grp
+        for name, node_type in ((f"{keep}Shape", "cMuscleKeepOut"), (f"{keep}Driven", "transform")):
+            cmds.add_node(name, node_type)
+            cmds.nodes[name]["parent"] = keep
+        for child in children:
+            cmds.nodes[child]["parent"] = f"{keep}Driven"
+
+
+class CMuscleMel(object):
+    def __init__(self, mel):
+        self.mel = mel
+
+    def eval(self, script):
+        self.mel.eval(script)
+        if script.startswith("cMuscle_rigKeepOutSel"):
+            rig_keep_out_sel()
+
+
+def cmuscle_setup(clusters):
+    mel = re_jnt_nurb_combiners.mel
+    re_jnt_nurb_combiners.mel = CMuscleMel(mel)
+    try:
+        re_jnt_nurb_combiners.crv_collide_with_geo(clusters, "Neck_collusion_geo")
+    finally:
+        re_jnt_nurb_combiners.mel = mel
+
+
+def scene_calls(count, frames):
+    positions, triangles = neck()
+    ring = collar_frames(4, count)[1]  # A pose pushing into the neck
+    setups = (("cmuscle", cmuscle_setup),
+              ("bake", lambda clusters: keep_out.bake_keep_out(clusters, (positions, triangles),
+                                                               frames=list(range(1, frames + 1)))))
+    for label, setup in setups:
+        cmds.nodes.clear()
+        cmds.add_curve("Collar_curve", ring.tolist())
+        clusters = re_jnt_nurb_combiners.crv_to_clusters(crv="Collar_curve")
+        cmds.reset_calls()
+        start = time.perf_counter()
+        result = setup(clusters)
+        elapsed = time.perf_counter() - start
+        detail = f"{result['curves']} curves over {frames} frames" if result else "live keepOut nodes"
+        print(f"{count:>6} CVs | {label:<7} setup {elapsed:8.4f}s | {cmds.call_count():>6} scene calls | {detail}")
+
+
+def bench(counts=(100, 1000, 10000), frames=48):
+    positions, triangles = neck()
+    start = time.perf_counter()
+    bvh = keep_out.TriangleBvh(positions, triangles)
+    print(f"build: {len(triangles)} triangles, {len(bvh.left)} nodes in {time.perf_counter() - start:.4f}s")
+    start = time.perf_counter()
+    bvh.refit(positions * 1.01)
+    bvh.refit(positions)
+    print(f"refit: {(time.perf_counter() - start) / 2:.4f}s")
+    check(bvh, positions, triangles)
+
+    for count in counts:
+        points = collar_frames(frames, count)
+        for label, directions in (("closest", None), ("cmuscle", "cmuscle")):
+            solved = keep_out.solve_frames(bvh, points, directions, offset=0.01)
+            per_frame = solved["seconds"]
+            print(f"{count:>6} points x {frames} frames | {label:<7} {per_frame.mean() * 1000:8.3f}ms/frame "
+                  f"(max {per_frame.max() * 1000:.3f}) | {solved['moved'].mean():.1%} pushed")
+        squash = np.stack([positions * [1.0 + 0.05 * math.sin(f), 1.0, 1.0] for f in range(frames)])
+        solved = keep_out.solve_frames(bvh, points, None, 0.01, collider=squash)
+        print(f"{count:>6} points x {frames} frames | refit   {solved['seconds'].mean() * 1000:8.3f}ms/frame "
+              f"with a deforming collider")
+        bvh.refit(positions)
+
+    for count in counts[:2]:
+        scene_calls(count, frames)
+
+
+if __name__ == "__main__":
+    bench([int(c) for c in sys.argv[1:]] or (100, 1000, 10000))
@@ -0,0 +1,124 @@
+'''
+Throughput of other_stuff/laf.py over a library of action sets made by repeating AnimTools.laf's actions,
+as MB/s for a scan of every value, a full decode to Python, and a byte exact write
+
+Usage:
+    python bench_stuff/bench_laf.py 500
+'''
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from other_stuff import laf  # noqa: E402
+
+ANIM_TOOLS = os.path.join(ROOT, "other_stuff", "CSP_AnimTools", "AnimTools.laf")
+
+
+def make_library(copies, path):
+    """
+    Args:
+        copies (int): times to repeat the actions of AnimTools.laf in one set
+        path (str): .laf to write
+
+    Returns:
+        str: path
+    """
+    with laf.load(ANIM_TOOLS) as root:
+        actions = root["actionArray"]
+        originals = list(actions.values())
+        for _ in range(copies - 1):
+            for action in originals:
+                actions.append(action)
+        laf.dump(root, path)
+        del actions, originals
+    return path
+
+
+def timed(label, size, func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<28} {best * 1e3:9.2f} ms | {size / 1048576.0 / best:8.1f} MB/s")
+    return result
+
+
+def check_mixed_edits():
+    # An edit through a record held from before must survive edits through fresh lookups of its parents
+    with laf.load(ANIM_TOOLS) as root:
+        def item():
+            return root["actionArray"][0]["actionItemArray"][1]
+        param = item()["actionItemParameter"]
+        item()["actionItemOpenParameter"] = True
+        param["layername"] = "LN_check"
+        root["actionArray"][0]["actionName"] = "Renamed"
+        edited = laf.loads(laf.dumps(root))
+    action = edited["actionArray"][0]
+    item = action["actionItemArray"][1]
+    assert action["actionName"].value == "Renamed", "Edit on the action was lost"
+    assert item["actionItemOpenParameter"].value is True, "Edit on the action item was lost"
+    assert item["actionItemParameter"]["layername"].value == "LN_check", "Edit on the parameter was lost"
+    print("mixed ancestor and descendant edits round trip")
+
+
+def bench(copies=500):
+    check_mixed_edits()
+    folder = tempfile.mkdtemp()
+    try:
+        path = make_library(copies, os.path.join(folder, "library.laf"))
+        size = os.path.getsize(path)
+        print(f"{copies * 10} actions, {size / 1048576.0:.1f} MB")
+
+        def scan():
+            with laf.load(path) as root:
+                return sum(1 for _ in laf.walk(root))
+
+        def flat_scan():
+            with laf.load(path) as root:
+                return sum(1 for _ in laf.scan(root.buf))
+
+        def kinds():  # Only what an index needs, keys compared as bytes and nested records skipped
+            with laf.load(path) as root:
+                found = []
+                for action in root["actionArray"].values():
+                    for item in action["actionItemArray"].values():
+                        for key, value in item.raw_items():
+                            if key == b"actionItemKind":
+                                found.append(value.offset)
+                return len(found)
+
+        def decode():
+            with laf.load(path) as root:
+                return laf.to_python(root)
+
+        with open(path, "rb") as f:
+            data = f.read()
+
+        values = timed("walk every value", size, scan)
+        timed("scan every value", size, flat_scan)
+        items = timed("find actionItemKind", size, kinds)
+        timed("decode to Python", size, decode)
+        written = timed("dumps, untouched", size, lambda: laf.dumps(laf.loads(data)))
+
+        def rewrite():
+            root = laf.loads(data)
+            for action in root["actionArray"].values():
+                action["actionName"] = action["actionName"].value + " copy"
+            return laf.dumps(root)
+        timed("dumps, every name changed", size, rewrite)
+        assert written == data, "Round trip changed the file"
+        print(f"{values} values, {items} action items, round trip byte exact")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    bench(*[int(c) for c in sys.argv[1:]])
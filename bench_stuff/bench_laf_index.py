@@ -0,0 +1,54 @@
+'''
+Index and rename times of other_stuff/laf_index.py over a library of copies of AnimTools.laf,
+cold, with nothing changed, and after touching a few files
+
+Usage:
+    python bench_stuff/bench_laf_index.py 300 4
+'''
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from other_stuff.laf_index import LafIndex  # noqa: E402
+
+ANIM_TOOLS = os.path.join(ROOT, "other_stuff", "CSP_AnimTools", "AnimTools.laf")
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<32} {(time.perf_counter() - start) * 1e3:9.1f} ms  {result}")
+    return result
+
+
+def bench(files=300, workers=4):
+    folder = tempfile.mkdtemp()
+    try:
+        for i in range(files):
+            shutil.copy(ANIM_TOOLS, os.path.join(folder, f"variant_{i:04d}.laf"))
+        index = LafIndex(os.path.join(folder, "laf_index.json"))
+        print(f"{files} files, {files * os.path.getsize(ANIM_TOOLS) / 1048576.0:.1f} MB, {workers} workers")
+
+        timed("update, cold", lambda: index.update([folder], workers=workers))
+        timed("update, nothing changed", lambda: index.update(workers=workers))
+        for i in range(0, files, 10):
+            os.utime(os.path.join(folder, f"variant_{i:04d}.laf"), ns=(0, time.time_ns() + 10 ** 9))
+        timed("update, every tenth touched", lambda: index.update(workers=workers))
+        timed("find layer", lambda: len(index.find(layer="LN_main")))
+        timed("save", index.save)
+        timed("rename LN_main -> LN_ink",
+              lambda: sum(index.rename_layer("LN_main", "LN_ink", workers=workers).values()))
+        timed("rename LN_ink -> LN_main, 1 proc",
+              lambda: sum(index.rename_layer("LN_ink", "LN_main", workers=1).values()))
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    bench(*[int(c) for c in sys.argv[1:]])
@@ -0,0 +1,73 @@
+'''
+Offline lip frames (one NumPy batch) vs live lip joint networks, 10 and 200 lip joints
+
+Usage:
+    python bench_stuff/bench_lip_frames.py 10 200          # offline timing on a made up surface
+    mayapy bench_stuff/bench_lip_frames.py --maya 10 200   # offline vs live build timing, and accuracy
+'''
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+IN_MAYA = "--maya" in sys.argv
+if IN_MAYA:
+    import maya.standalone
+    maya.standalone.initialize()
+    import maya.cmds as cmds
+else:
+    from bench_stuff import fake_maya
+    cmds = fake_maya.install()
+
+from rig_stuff import nurbs_eval  # noqa: E402
+from rig_stuff.re_build_mouth import check_lip_frames, make_lip_joints, solve_lip_frames  # noqa: E402
+
+
+def lip_surface_data():
+    # Curved 6 x 4 cubic patch, roughly the shape of a mouth
+    u = np.linspace(-3, 3, 6)
+    v = np.linspace(-1, 1, 4)
+    cvs = np.zeros((6, 4, 4))
+    cvs[..., 0] = u[:, None]
+    cvs[..., 1] = v[None, :]
+    cvs[..., 2] = 2 - 0.2 * u[:, None] ** 2
+    cvs[..., 3] = 1.0
+    return {"cvs": cvs, "knots_u": nurbs_eval.full_knots([0, 0, 0, 1, 2, 3, 3, 3]),
+            "knots_v": nurbs_eval.full_knots([0, 0, 0, 1, 1, 1]), "degree_u": 3, "degree_v": 3}
+
+
+def maya_surface():
+    cmds.file(new=True, force=True)
+    surface = cmds.nurbsPlane(d=3, u=3, v=1, w=6, lr=1.0 / 3.0, ch=False, name="my_surface")[0]
+    cmds.rename(cmds.listRelatives(surface, shapes=True)[0], "my_surfaceShape")
+    cmds.select("my_surface.cv[2][*]")
+    cmds.move(0, 0.5, 0, r=True)
+    cmds.select(cl=True)
+    return "my_surfaceShape"
+
+
+def bench(counts=(10, 200)):
+    surface = maya_surface() if IN_MAYA else None
+    data = nurbs_eval.get_surface_data(surface) if IN_MAYA else lip_surface_data()
+    u_max, v_max = data["knots_u"][-1], data["knots_v"][-1]
+    for count in counts:
+        u = np.linspace(0, u_max, count)
+        v = np.full(count, v_max / 2)
+        start = time.perf_counter()
+        frames = solve_lip_frames(surface, u, v, data=data)
+        line = f"{count:>4} lip joints | offline {time.perf_counter() - start:8.5f}s"
+        if IN_MAYA:
+            start = time.perf_counter()
+            make_lip_joints(spans=count, name=f"bench_{count}", surface=surface)
+            line += f" | live build {time.perf_counter() - start:8.4f}s"
+            error = check_lip_frames(surface, u, v, frames)
+            line += " | max error " + ", ".join(f"{k} {e:.2e}" for k, e in error.items())
+        print(line)
+
+
+if __name__ == "__main__":
+    bench([int(c) for c in sys.argv[1:] if c.isdigit()] or (10, 200))
@@ -0,0 +1,108 @@
+'''
+Construction time, memory and repaint time of a picker as one ImageButton per control,
+against one PickerCanvas painting from an atlas. Runs offscreen
+
+Usage:
+    python bench_stuff/bench_picker_canvas.py 1000
+'''
+
+import atexit
+import gc
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide2 import QtCore, QtGui, QtWidgets  # noqa: E402
+
+from ui_stuff.icon_cache import get_cache  # noqa: E402
+from ui_stuff.image_button import ImageButton  # noqa: E402
+from ui_stuff.picker_canvas import PickerCanvas  # noqa: E402
+
+
+def rss():
+    """
+    Returns:
+        int: resident memory in bytes, peak memory where /proc is missing
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def image_files(count, distinct=200):
+    folder = tempfile.mkdtemp()
+    atexit.register(shutil.rmtree, folder, ignore_errors=True)  # Buttons read the files after this returns
+    paths = []
+    for i in range(min(count, distinct)):
+        image = QtGui.QImage(32, 32, QtGui.QImage.Format_ARGB32)
+        image.fill(QtGui.QColor(i % 255, 80, 160))
+        paths.append(os.path.join(folder, f"ctrl_{i}.png"))
+        image.save(paths[-1])
+    return [paths[i % len(paths)] for i in range(count)]  # Pickers reuse icons, e.g. every finger ctrl
+
+
+def buttons(images):
+    parent = QtWidgets.QWidget()
+    for i, img in enumerate(images):
+        ImageButton(img, i % 40 * 32, i // 40 * 32).setParent(parent)
+    return parent
+
+
+def canvas(images):
+    parent = QtWidgets.QWidget()
+    picker = PickerCanvas(parent)
+    for i, img in enumerate(images):
+        picker.add_img(img, i % 40 * 32, i // 40 * 32, name=f"ctrl_{i}")
+    picker.build()
+    return parent
+
+
+def measure(label, app, build, images, frames=20):
+    get_cache().clear()
+    gc.collect()
+    before = rss()
+    start = time.perf_counter()
+    parent = build(images)
+    parent.resize(40 * 32, (len(images) // 40 + 1) * 32)
+    parent.show()
+    app.processEvents()
+    built = time.perf_counter() - start
+    memory = rss() - before
+
+    start = time.perf_counter()
+    for _ in range(frames):
+        parent.repaint()
+    frame = (time.perf_counter() - start) / frames
+    print(f"{label:<14} {built * 1e3:9.1f} ms to build | {memory / 1048576.0:7.1f} MB | "
+          f"{frame * 1e3:7.2f} ms per full repaint | {len(parent.findChildren(QtWidgets.QWidget))} widgets")
+    parent.close()
+    parent.deleteLater()
+    app.processEvents()
+
+
+def bench(count=1000):
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    images = image_files(count)
+    print(f"{count} controls")
+    measure("image buttons", app, buttons, images)
+    measure("picker canvas", app, canvas, images)
+
+    picker = canvas(images).findChild(PickerCanvas)
+    points = [QtCore.QPoint(i * 7 % (40 * 32), i * 13 % ((count // 40 + 1) * 32)) for i in range(10000)]
+    start = time.perf_counter()
+    for point in points:
+        picker.item_at(point)
+    print(f"hit test       {(time.perf_counter() - start) / len(points) * 1e6:9.2f} us per point, "
+          f"atlas {picker.nbytes() / 1048576.0:.2f} MB")
+
+
+if __name__ == "__main__":
+    bench(*[int(c) for c in sys.argv[1:]])
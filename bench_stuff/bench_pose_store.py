@@ -0,0 +1,93 @@
+'''
+Times pose capture/restore against a per attribute getAttr/setAttr loop on fake maya.cmds.
+Restore is one MEL script inside Maya, the fake replays it line by line in Python, so its time there
+is mostly the fake's MEL parser. The mel replay row splits that out
+
+Usage:
+    python bench_stuff/bench_pose_store.py 500
+'''
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_stuff import fake_maya
+
+cmds = fake_maya.install()
+
+from rig_stuff import pose_store  # noqa: E402
+
+
+def legacy_capture(objs):
+    pose = {}
+    for obj in objs:
+        for attr in cmds.listAttr(obj, keyable=1, unlocked=1, settable=1):
+            pose[f"{obj}.{attr}"] = cmds.getAttr(f"{obj}.{attr}")
+    return pose
+
+
+def legacy_restore(pose):
+    for plug, value in pose.items():
+        cmds.setAttr(plug, value)
+
+
+def pose(ctrls, moved=0.3):
+    for ctrl in ctrls:
+        for attr in cmds.nodes[ctrl]["keyable"]:
+            if random.random() < moved:
+                cmds.nodes[ctrl]["values"][attr] = random.uniform(-1, 1)
+
+
+def timed(label, func, *args, **kwargs):
+    cmds.reset_calls()
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    print(f"  {label:<22} {time.perf_counter() - start:8.4f}s | {cmds.call_count():>6} cmds calls")
+    return result
+
+
+def mel_replay():
+    # Replays the last restore script on its own, the part of the restore time Maya spends in C++
+    script = cmds.mel_scripts[-1]
+    start = time.perf_counter()
+    fake_maya.FakeMel(cmds).eval(script)
+    print(f"  {'  of which mel replay':<22} {time.perf_counter() - start:8.4f}s | "
+          f"{len(script.splitlines()):>6} lines in 1 call")
+
+
+def bench(counts=(500,)):
+    random.seed(0)
+    for count in counts:
+        ctrls = [cmds.add_control(f"ctrl_{i}") for i in range(count)]
+        print(f"{count} controls")
+        pose(ctrls)
+        old = timed("legacy capture", legacy_capture, ctrls)
+        pose_store.get_layout(ctrls)
+        stored = timed("capture", pose_store.capture_pose, ctrls)
+        pose(ctrls)
+        timed("legacy restore", legacy_restore, old)
+        pose(ctrls)
+        timed("restore", pose_store.restore_pose, stored)
+        mel_replay()
+        pose(ctrls)
+        timed("restore per setAttr", pose_store.restore_pose, stored, mode="cmds")
+        pose(ctrls)
+        current = pose_store.capture_pose(ctrls)
+        timed("restore changed only", pose_store.restore_pose, stored, current=current)
+
+        path = os.path.join(tempfile.gettempdir(), "bench_pose.pose")
+        start = time.perf_counter()
+        stored.save(path)
+        loaded = pose_store.Pose.load(path)
+        print(f"  save + load            {time.perf_counter() - start:8.4f}s | {os.path.getsize(path)} bytes")
+        assert loaded.names == stored.names and loaded.values == stored.values
+        os.remove(path)
+        cmds.nodes.clear()
+
+
+if __name__ == "__main__":
+    bench([int(c) for c in sys.argv[1:]] or (500,))
@@ -0,0 +1,108 @@
+'''
+vtx_index against linear scans over get_vtx_pos tuples on a symmetric fake mesh: build, mirror table,
+nearest, k nearest and radius queries, and a cold and warm VtxTree.for_mesh with the tree saved beside the scene,
+then one more after a vertex moves
+
+Usage:
+    python bench_stuff/bench_vtx_index.py 10000 100000 1000000
+'''
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_stuff import fake_maya
+
+cmds = fake_maya.install()
+
+import get_vtx_pos  # noqa: E402
+import vtx_index  # noqa: E402
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def symmetric_mesh(name, count, seed=0):
+    # Half a body mirrored in x, plus a seam of centre vertices, shuffled like a real vertex order
+    rng = np.random.default_rng(seed)
+    seam = count // 50
+    half = rng.normal(size=((count - seam) // 2, 3))
+    half[:, 0] = np.abs(half[:, 0]) + 0.001
+    centre = rng.normal(size=(count - 2 * len(half), 3))
+    centre[:, 0] = 0.0
+    positions = np.vstack([half, half * [-1.0, 1.0, 1.0], centre])
+    positions = positions[rng.permutation(len(positions))]
+    cmds.meshes[name] = positions.ravel().tolist()
+    return positions
+
+
+def linear_nearest(tuples, point):
+    # What the tools did before, one scan of the tuple list per lookup
+    best, index = float("inf"), -1
+    for i, (x, y, z) in enumerate(tuples):
+        d = (x - point[0]) ** 2 + (y - point[1]) ** 2 + (z - point[2]) ** 2
+        if d < best:
+            best, index = d, i
+    return index
+
+
+def bench(counts=(10000, 100000, 1000000)):
+    folder = tempfile.mkdtemp()
+    try:
+        cmds.scene = os.path.join(folder, "body.ma")
+        for count in counts:
+            positions = symmetric_mesh("body_geo", count)
+            rng = np.random.default_rng(1)
+            queries = positions[rng.integers(0, count, 10000)] + rng.normal(0.0, 0.01, (10000, 3))
+
+            tuples = get_vtx_pos.get_vtx_pos("body_geo")
+            scan_time = timed(lambda: [linear_nearest(tuples, p) for p in queries[:20]])[0] / 20
+            tree = vtx_index.VtxTree(positions)
+            mirror_time, table = timed(tree.mirror_table)
+            build_time = timed(tree.build)[0]
+            nearest_time, (index, _) = timed(tree.nearest, queries)
+            knn_time, (dist, _) = timed(tree.query, queries, 8)
+            radius_time, hits = timed(tree.query_radius, queries, 0.05)
+
+            brute = np.array([((positions - p) ** 2).sum(axis=1).argmin() for p in queries[:50]])
+            mirrored = np.allclose(positions[table] * [-1.0, 1.0, 1.0], positions)
+            print(f"{count:>8} vtx | mirror table {mirror_time:7.4f}s ({'exact' if mirrored else 'MISMATCH'}) | "
+                  f"build {build_time:7.4f}s | nearest x10k {nearest_time:7.4f}s "
+                  f"({'matches' if (index[:50] == brute).all() else 'MISMATCH'} brute force) | "
+                  f"8-nearest x10k {knn_time:7.4f}s | radius x10k {radius_time:7.4f}s "
+                  f"({len(hits['index']) / len(queries):.1f} hits each)")
+            print(f"{'':>8}     | linear scan {scan_time:8.4f}s per lookup, "
+                  f"{scan_time * len(queries):8.1f}s for 10k")
+
+            path = vtx_index.index_path("body_geo")
+            if os.path.exists(path):
+                os.remove(path)
+            cold_time, _ = timed(vtx_index.VtxTree.for_mesh, "body_geo")
+            cmds.reset_calls()
+            warm_time, warm = timed(vtx_index.VtxTree.for_mesh, "body_geo")
+            warm_mirror = timed(warm.mirror_table)[0]
+            print(f"{'':>8}     | for_mesh cold {cold_time:7.4f}s | warm {warm_time:7.4f}s "
+                  f"({cmds.call_count()} scene calls) + mirror {warm_mirror:7.4f}s | "
+                  f"{os.path.getsize(path) / 1048576.0:.1f} MB on disk")
+
+            # A sculpt keeps the topology, the saved tree must not answer for the old positions
+            cmds.meshes["body_geo"][3 * (count // 2)] += 5.0
+            moved = vtx_index.VtxTree.for_mesh("body_geo")
+            fresh = np.array_equal(moved.positions, get_vtx_pos.get_vtx_positions("body_geo"))
+            print(f"{'':>8}     | moved vertex {'rebuilt' if fresh else 'STALE'}")
+            del cmds.meshes["body_geo"]
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    bench([int(c) for c in sys.argv[1:]] or (10000, 100000, 1000000))
@@ -0,0 +1,44 @@
+'''
+Compares get_vtx_pos tuple path to the array backed get_vtx_positions against fake maya.cmds
+
+Usage:
+    python bench_stuff/bench_vtx_pos.py 10000 1000000 5000000
+'''
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_stuff import fake_maya
+
+cmds = fake_maya.install()
+
+import get_vtx_pos  # noqa: E402
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def bench(counts=(10000, 1000000, 5000000)):
+    for count in counts:
+        cmds.add_mesh("main", count)
+        tuple_time, pos = timed(get_vtx_pos.get_vtx_pos, "main")
+        del pos
+        array_time, pos = timed(get_vtx_pos.get_vtx_positions, "main", as_numpy=False)
+        del pos
+        line = f"{count:>9} vtx | tuples {tuple_time:8.4f}s | array('d') {array_time:8.4f}s"
+        if get_vtx_pos.np is not None:
+            numpy_time, pos = timed(get_vtx_pos.get_vtx_positions, "main")
+            del pos
+            line += f" | numpy {numpy_time:8.4f}s"
+        print(line)
+        del cmds.meshes["main"]
+
+
+if __name__ == "__main__":
+    bench([int(c) for c in sys.argv[1:]] or (10000, 1000000, 5000000))
@@ -0,0 +1,57 @@
+'''
+Times zero_out against the old per attribute loop on fake maya.cmds
+
+Usage:
+    python bench_stuff/bench_zero_out.py 10 100 1000
+'''
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_stuff import fake_maya
+
+cmds = fake_maya.install()
+
+from rig_stuff import zero_out_controllers  # noqa: E402
+
+
+def legacy_zero_out(objs):
+    # The loop zero_out_controllers.py used to run at import
+    for obj in objs:
+        keyable = cmds.listAttr(obj, keyable=1, unlocked=1, settable=1)
+        for attr in keyable:
+            default = cmds.attributeQuery(attr, node=obj, listDefault=1)
+            if cmds.getAttr(obj + "." + attr, settable=1) != 0:
+                cmds.setAttr(obj + "." + attr, default[0])
+
+
+def pose(ctrls, moved=0.2):
+    # Move a fraction of the attributes away from default, like a posed face rig
+    random.seed(0)
+    for ctrl in ctrls:
+        for attr in cmds.nodes[ctrl]["keyable"]:
+            if random.random() < moved:
+                cmds.nodes[ctrl]["values"][attr] = random.uniform(-1, 1)
+
+
+def bench(counts=(10, 100, 1000)):
+    for count in counts:
+        ctrls = [cmds.add_control(f"ctrl_{i}") for i in range(count)]
+        for name, func in (("legacy", legacy_zero_out), ("zero_out", zero_out_controllers.zero_out)):
+            zero_out_controllers.clear_default_cache()
+            pose(ctrls)
+            cmds.reset_calls()
+            start = time.perf_counter()
+            func(ctrls)
+            elapsed = time.perf_counter() - start
+            print(f"{count:>5} ctrls | {name:<8} {elapsed:8.4f}s | {cmds.call_count():>6} cmds calls "
+                  f"({cmds.calls.get('setAttr', 0)} setAttr)")
+        cmds.nodes.clear()
+
+
+if __name__ == "__main__":
+    bench([int(c) for c in sys.argv[1:]] or (10, 100, 1000))
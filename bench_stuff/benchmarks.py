@@ -0,0 +1,360 @@
+'''
+Benchmarks of the rig, mesh and UI tools for bench_stuff/harness.py, old versions next to the current ones
+where the old loop is kept in a bench_*.py script
+'''
+
+import atexit
+import math
+import os
+import random
+import tempfile
+
+from bench_stuff.harness import SkipBenchmark, benchmark
+
+import get_vtx_pos  # noqa: E402
+from bench_stuff import bench_crv_clusters, bench_eyelid, bench_pose_store, bench_zero_out  # noqa: E402
+from rig_stuff import pose_store, re_build_eye, re_jnt_nurb_combiners, zero_out_controllers  # noqa: E402
+from rig_stuff.hierarchy import JointHierarchy  # noqa: E402
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+_temp = None
+
+
+def needs_numpy():
+    if np is None:
+        raise SkipBenchmark("numpy is not installed")
+
+
+def temp_folder():
+    """
+    Returns:
+        str: one folder for the files of every benchmark, removed when the run exits.
+            Timed operations still read from it, so it can't go when their setup returns
+    """
+    global _temp
+    if _temp is None:
+        _temp = tempfile.TemporaryDirectory()
+        atexit.register(_temp.cleanup)
+    return _temp.name
+
+
+# get_vtx_pos.py
+
+@benchmark("vtx_pos.tuples", "vertices", [10000, 100000, 1000000])
+def vtx_pos_tuples(cmds, count):
+    cmds.add_mesh("main", count)
+    return lambda: get_vtx_pos.get_vtx_pos("main")
+
+
+@benchmark("vtx_pos.array", "vertices", [10000, 100000, 1000000])
+def vtx_pos_array(cmds, count):
+    cmds.add_mesh("main", count)
+    return lambda: get_vtx_pos.get_vtx_positions("main", as_numpy=False)
+
+
+@benchmark("vtx_pos.numpy", "vertices", [10000, 100000, 1000000])
+def vtx_pos_numpy(cmds, count):
+    needs_numpy()
+    cmds.add_mesh("main", count)
+    return lambda: get_vtx_pos.get_vtx_positions("main")
+
+
+# zero_out_controllers.py
+
+def posed_controls(cmds, count):
+    ctrls = [cmds.add_control(f"ctrl_{i}") for i in range(count)]
+    bench_zero_out.pose(ctrls)
+    zero_out_controllers.clear_default_cache()
+    return ctrls
+
+
+@benchmark("zero_out.legacy", "ctrls", [10, 100, 1000])
+def zero_out_legacy(cmds, count):
+    ctrls = posed_controls(cmds, count)
+    return lambda: bench_zero_out.legacy_zero_out(ctrls)
+
+
+@benchmark("zero_out.bulk", "ctrls", [10, 100, 1000])
+def zero_out_bulk(cmds, count):
+    ctrls = posed_controls(cmds, count)
+    return lambda: zero_out_controllers.zero_out(ctrls)
+
+
+# pose_store.py
+
+def stored_pose(cmds, count):
+    random.seed(0)
+    ctrls = [cmds.add_control(f"ctrl_{i}") for i in range(count)]
+    bench_pose_store.pose(ctrls)
+    pose_store.get_layout(ctrls, refresh=True)  # Layout is walked once per rig, time the steady state
+    return ctrls
+
+
+@benchmark("pose.legacy_capture", "ctrls", [100, 500])
+def pose_legacy_capture(cmds, count):
+    ctrls = stored_pose(cmds, count)
+    return lambda: bench_pose_store.legacy_capture(ctrls)
+
+
+@benchmark("pose.capture", "ctrls", [100, 500])
+def pose_capture(cmds, count):
+    ctrls = stored_pose(cmds, count)
+    return lambda: pose_store.capture_pose(ctrls)
+
+
+@benchmark("pose.legacy_restore", "ctrls", [100, 500])
+def pose_legacy_restore(cmds, count):
+    ctrls = stored_pose(cmds, count)
+    old = bench_pose_store.legacy_capture(ctrls)
+    bench_pose_store.pose(ctrls)
+    return lambda: bench_pose_store.legacy_restore(old)
+
+
+@benchmark("pose.restore", "ctrls", [100, 500])
+def pose_restore(cmds, count):
+    ctrls = stored_pose(cmds, count)
+    stored = pose_store.capture_pose(ctrls)
+    bench_pose_store.pose(ctrls)
+    return lambda: pose_store.restore_pose(stored)
+
+
+# re_build_eye.py
+
+def eye_scene(cmds):
+    for lid in re_build_eye.SPEC["lids"]:
+        cmds.add_node(lid["name"][:-3] + "grp")
+        cmds.add_curve(f"{lid['name']}_curveShape", [(-1.5, 0, 1), (-0.5, 0.6, 1.2), (0.5, 0.6, 1.2), (1.5, 0, 1)])
+
+
+@benchmark("eyelid.legacy", "spans", [14, 50, 100])
+def eyelid_legacy(cmds, spans):
+    eye_scene(cmds)
+    return lambda: bench_eyelid.legacy_make_eyelid_joints(spans, name="Lf_eyelid_upp")
+
+
+@benchmark("eyelid.mel_batch", "spans", [14, 50, 100])
+def eyelid_mel_batch(cmds, spans):
+    eye_scene(cmds)
+    return lambda: re_build_eye.make_eyelid_joints(spans, name="Lf_eyelid_upp")
+
+
+@benchmark("eyelid.compact", "spans", [14, 50, 100])
+def eyelid_compact(cmds, spans):
+    eye_scene(cmds)
+    return lambda: re_build_eye.make_eyelid_joints(spans, name="Lf_eyelid_upp", compact=True)
+
+
+@benchmark("eyes.build", "spans", [14, 50])
+def eyes_build(cmds, spans):
+    eye_scene(cmds)
+    return lambda: re_build_eye.build_eyes({"spans": spans})
+
+
+# re_jnt_nurb_combiners.py and the modules under it
+
+@benchmark("clusters.legacy", "cvs", [50, 500, 2000])
+def clusters_legacy(cmds, count):
+    cmds.add_curve("Collar_curve", bench_crv_clusters.collar(count))
+    return lambda: bench_crv_clusters.legacy_crv_to_clusters(crv="Collar_curve", exclude="front")
+
+
+@benchmark("clusters.bulk", "cvs", [50, 500, 2000])
+def clusters_bulk(cmds, count):
+    cmds.add_curve("Collar_curve", bench_crv_clusters.collar(count))
+    return lambda: re_jnt_nurb_combiners.crv_to_clusters(crv="Collar_curve", exclude="front")
+
+
+@benchmark("hierarchy.read", "joints", [10, 100, 1000])
+def hierarchy_read(cmds, count):
+    cmds.add_joint_chain("C_Tail", count)
+    return lambda: JointHierarchy("C_Tail_0")
+
+
+@benchmark("arc_length.params", "cvs", [10, 100, 1000])
+def arc_length_params(cmds, count):
+    needs_numpy()
+    from rig_stuff import arc_length, nurbs_eval
+
+    angles = np.linspace(0, 4 * math.pi, count)
+    cvs = np.stack([np.cos(angles) * (1 + angles), np.sin(angles) * (1 + angles), angles, np.ones(count)], axis=1)
+    knots = np.concatenate([[0, 0], np.arange(count - 2), [count - 3] * 2]).astype(np.float64)
+    data = {"cvs": cvs, "knots": nurbs_eval.full_knots(knots), "degree": 3}
+
+    def params():
+        table = arc_length.build_table(data)
+        targets = np.linspace(0, table["lengths"][-1], count)
+        return arc_length.params_at_lengths(data, table, targets)
+    return params
+
+
+@benchmark("lip_frames.solve", "joints", [10, 200, 2000])
+def lip_frames_solve(cmds, count):
+    needs_numpy()
+    from bench_stuff import bench_lip_frames
+    from rig_stuff.re_build_mouth import solve_lip_frames
+
+    data = bench_lip_frames.lip_surface_data()
+    u = np.linspace(0, data["knots_u"][-1], count)
+    v = np.full(count, data["knots_v"][-1] / 2)
+    return lambda: solve_lip_frames(None, u, v, data=data)
+
+
+@benchmark("rail_spine.chain_math", "joints", [30, 300, 3000])
+def rail_spine_chain_math(cmds, count):
+    needs_numpy()
+    from rig_stuff.rail_spine import aim_frames, local_transforms
+
+    positions = np.cumsum(np.random.default_rng(0).normal(size=(count, 3)), axis=0)
+
+    def chain():
+        frames = aim_frames(positions[:-1], positions[1:], np.tile([0.0, 0.0, -1.0], (count - 1, 1)))
+        return local_transforms(np.concatenate([frames, frames[-1:]]), positions)
+    return chain
+
+
+# ui_stuff/image_button.py and ui_stuff/icon_cache.py
+
+def image_files(count):
+    try:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PySide2 import QtGui, QtWidgets
+    except ImportError:
+        raise SkipBenchmark("PySide2 is not installed")
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    images = []
+    for i in range(count):
+        image = QtGui.QImage(32, 32, QtGui.QImage.Format_ARGB32)
+        image.fill(QtGui.QColor(i % 255, 80, 160))
+        images.append(os.path.join(temp_folder(), f"ctrl_{i}.png"))
+        image.save(images[-1])
+    return app, images
+
+
+def image_buttons(app, images):
+    from PySide2 import QtWidgets
+    from ui_stuff.image_button import ImageButton
+
+    def buttons():
+        parent = QtWidgets.QWidget()
+        for i, img in enumerate(images):
+            ImageButton(img, i % 20 * 32, i // 20 * 32).setParent(parent)
+        app.processEvents()
+        return parent
+    return buttons
+
+
+@benchmark("ui.image_buttons", "buttons", [10, 100, 1000])
+def ui_image_buttons(cmds, count):
+    app, images = image_files(count)
+    from ui_stuff.icon_cache import get_cache
+
+    get_cache().clear()  # Every image read from disk, a picker's first open
+    return image_buttons(app, images)
+
+
+@benchmark("ui.image_buttons_cached", "buttons", [10, 100, 1000])
+def ui_image_buttons_cached(cmds, count):
+    app, images = image_files(count)
+    from ui_stuff.icon_cache import get_cache
+
+    get_cache().clear()
+    image_buttons(app, images)()  # A picker opened again, or a second picker sharing the icons
+    return image_buttons(app, images)
+
+
+@benchmark("ui.image_buttons_prewarmed", "buttons", [10, 100, 1000])
+def ui_image_buttons_prewarmed(cmds, count):
+    app, images = image_files(count)
+    from ui_stuff.icon_cache import get_cache
+
+    get_cache().clear()
+    get_cache().prewarm(images).join()  # Decoded in the background while the rest of the UI loaded
+    return image_buttons(app, images)
+
+
+# ui_stuff/picker_canvas.py, next to ui.image_buttons
+
+@benchmark("ui.picker_canvas", "buttons", [10, 100, 1000])
+def ui_picker_canvas(cmds, count):
+    app, images = image_files(count)
+    from PySide2 import QtWidgets
+    from ui_stuff.picker_canvas import PickerCanvas
+
+    def canvas():
+        parent = QtWidgets.QWidget()
+        picker = PickerCanvas(parent)
+        for i, img in enumerate(images):
+            picker.add_img(img, i % 20 * 32, i // 20 * 32)
+        picker.build()
+        app.processEvents()
+        return parent
+    return canvas
+
+
+# other_stuff/laf.py
+
+@benchmark("laf.scan", "copies", [1, 10, 100])
+def laf_scan(cmds, copies):
+    from bench_stuff import bench_laf
+    from other_stuff import laf
+
+    with tempfile.TemporaryDirectory() as folder:
+        with open(bench_laf.make_library(copies, os.path.join(folder, "library.laf")), "rb") as f:
+            data = f.read()
+    return lambda: sum(1 for _ in laf.scan(data))
+
+
+# rig_stuff/keep_out.py
+
+@benchmark("keep_out.resolve", "points", [100, 1000, 10000])
+def keep_out_resolve(cmds, count):
+    needs_numpy()
+    from bench_stuff import bench_keep_out
+    from rig_stuff import keep_out
+
+    bvh = keep_out.TriangleBvh(*bench_keep_out.neck())
+    points = bench_keep_out.collar_frames(4, count)[1]
+    return lambda: keep_out.resolve_keep_out(bvh, points, keep_out.keep_out_directions(points))
+
+
+# vtx_index.py
+
+@benchmark("vtx_index.mirror_table", "vertices", [10000, 100000, 1000000])
+def vtx_index_mirror_table(cmds, count):
+    needs_numpy()
+    from bench_stuff import bench_vtx_index
+    import vtx_index
+
+    positions = bench_vtx_index.symmetric_mesh("body_geo", count)
+    return lambda: vtx_index.VtxTree(positions).mirror_table()
+
+
+@benchmark("vtx_index.query", "vertices", [10000, 100000, 1000000])
+def vtx_index_query(cmds, count):
+    needs_numpy()
+    from bench_stuff import bench_vtx_index
+    import vtx_index
+
+    tree = vtx_index.VtxTree(bench_vtx_index.symmetric_mesh("body_geo", count))
+    tree.build()
+    queries = tree.positions[:10000] + 0.01
+    return lambda: tree.query(queries, 8)
+
+
+# rig_stuff/closest_surface.py
+
+@benchmark("closest_surface.closest_params", "points", [10, 100, 1000])
+def closest_surface_params(cmds, count):
+    needs_numpy()
+    from bench_stuff import bench_closest_surface
+    from rig_stuff import closest_surface
+
+    data = bench_closest_surface.ribbon()
+    points = bench_closest_surface.near_points(count)
+    return lambda: closest_surface.closest_params(data, points)
@@ -0,0 +1,520 @@
+'''
+Pure-Python stand-in for maya.cmds so tools in the_pit can be imported and timed outside of Maya
+'''
+
+import fnmatch
+import re
+import sys
+import types
+
+COMPOUNDS = {"translate": ("translateX", "translateY", "translateZ"),
+             "rotate": ("rotateX", "rotateY", "rotateZ"),
+             "scale": ("scaleX", "scaleY", "scaleZ"),
+             "t": ("translateX", "translateY", "translateZ"),
+             "r": ("rotateX", "rotateY", "rotateZ"),
+             "s": ("scaleX", "scaleY", "scaleZ")}
+CONTROL_ATTRS = [("translateX", 0.0), ("translateY", 0.0), ("translateZ", 0.0),
+                 ("rotateX", 0.0), ("rotateY", 0.0), ("rotateZ", 0.0),
+                 ("scaleX", 1.0), ("scaleY", 1.0), ("scaleZ", 1.0), ("visibility", 1.0)]
+VTX_RE = re.compile(r"^(?P<mesh>[^.]+)\.(?:vtx|cv)\[(?P<start>\*|\d+|)(?::(?P<end>\d+|))?\]$")
+MEL_TOKEN_RE = re.compile(r'"((?:[^"\\]|\\.)*)"|(\S+)')
+MEL_NUMBER_RE = re.compile(r"^-?\d+(\.\d*)?(e-?\d+)?$")
+SHAPE_TYPES = {"locator", "mesh", "nurbsCurve", "nurbsSurface"}
+# Flags GraphBatch writes without a value, every other flag takes the values that follow it
+MEL_BARE_FLAGS = {"skipSelect", "ss", "mo", "maintainOffset", "w", "world", "r", "relative", "add"}
+
+
+class FakeCmds(object):
+    """
+    Holds an in-memory scene and answers the subset of maya.cmds the tools call.
+    Every call is counted in self.calls so benchmarks can report scene calls per operation.
+    """
+    def __init__(self):
+        self.meshes = {}
+        self.nodes = {}
+        self.selection = []
+        self.connections = []
+        self.mel_scripts = []
+        self.mel_errors = []
+        self.calls = {}
+        self.time = 1.0
+        self.playback = (1.0, 24.0)
+        self.scene = ""  # cmds.file(q=True, sceneName=True), "" for an unsaved scene
+        self.quiet = False  # True while mel.eval replays a script, which counts as one call
+
+    def _count(self, name):
+        if not self.quiet:
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def reset_calls(self):
+        self.calls = {}
+
+    def reset(self):
+        """
+        Empties the scene in place, so modules holding on to this object see the new one
+        """
+        self.__init__()
+
+    def call_count(self):
+        return sum(self.calls.values())
+
+    def add_node(self, name, node_type="transform", attrs=None, user_attrs=None):
+        """
+        Args:
+            name (str): node name
+            node_type (str): node type returned by nodeType
+            attrs (list[tuple]): static keyable (attr, default) pairs
+            user_attrs (list[tuple]): user defined keyable (attr, default) pairs
+        """
+        attrs = list(attrs or []) + list(user_attrs or [])
+        self.nodes[name] = {"type": node_type,
+                            "values": {a: d for a, d in attrs},
+                            "defaults": {a: d for a, d in attrs},
+                            "keyable": [a for a, d in attrs],
+                            "locked": set(),
+                            "user": [a for a, d in (user_attrs or [])],
+                            "members": []}
+        return name
+
+    def add_control(self, name, user_attrs=(("blink", 0.0),)):
+        return self.add_node(name, "transform", CONTROL_ATTRS, user_attrs)
+
+    def add_set(self, name, members):
+        self.add_node(name, "objectSet")
+        self.nodes[name]["members"] = list(members)
+        return name
+
+    def add_mesh(self, name, vertex_count):
+        """
+        Args:
+            name (str): mesh name
+            vertex_count (int): number of verticies, positions are generated on a simple grid
+        """
+        flat = [0.0] * (vertex_count * 3)
+        for i in range(vertex_count):
+            flat[i * 3] = float(i % 1000)
+            flat[i * 3 + 1] = float(i // 1000)
+            flat[i * 3 + 2] = 0.5
+        self.meshes[name] = flat
+        return name
+
+    def add_joint_chain(self, name, count, branch_at=None):
+        """
+        Args:
+            name (str): joints are named name_0, name_1...
+            count (int): number of joints
+            branch_at (int): also hang a second, 2 joint branch off this joint
+
+        Returns:
+            list[str]: joints of the main chain, root first
+        """
+        joints = []
+        for i in range(count):
+            jnt = self.add_node(f"{name}_{i}", "joint", [("translateX", float(i)), ("translateY", 0.0),
+                                                           ("translateZ", 0.0)])
+            self.nodes[jnt]["parent"] = joints[-1] if joints else None
+            joints.append(jnt)
+        if branch_at is not None:
+            parent = joints[branch_at]
+            for i in range(2):
+                jnt = self.add_node(f"{name}_branch_{i}", "joint")
+                self.nodes[jnt]["parent"] = parent
+                parent = jnt
+        return joints
+
+    def add_curve(self, name, positions):
+        """
+        Args:
+            name (str): curve name, its CVs are name.cv[i]
+            positions (list[tuple]): local CV positions
+        """
+        self.add_node(name, "nurbsCurve")
+        self.meshes[name] = [c for pos in positions for c in pos]
+        return name
+
+    def _vtx_flat(self, component):
+        match = VTX_RE.match(component)
+        if not match:
+            raise ValueError(f"Fake cmds can't resolve component {component}")
+        flat = self.meshes[match.group("mesh")]
+        if match.group("start") in ("*", ""):
+            return flat
+        start = int(match.group("start"))
+        end = int(match.group("end") or start)
+        return flat[start * 3:(end + 1) * 3]
+
+    def xform(self, *args, **kwargs):
+        self._count("xform")
+        if kwargs.get("m") or kwargs.get("matrix"):
+            objs = args[0] if isinstance(args[0], (list, tuple)) else [args[0]]
+            flat = []
+            for obj in objs:
+                values = self.nodes[obj.rpartition("|")[2]]["values"]
+                flat += [1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0,
+                         values.get("translateX", 0.0), values.get("translateY", 0.0), values.get("translateZ", 0.0), 1.0]
+            return flat
+        components = args[0] if isinstance(args[0], (list, tuple)) else [args[0]]
+        if len(components) == 1:
+            return list(self._vtx_flat(components[0]))
+        flat = []
+        for component in components:
+            flat.extend(self._vtx_flat(component))
+        return flat
+
+    def polyEvaluate(self, *args, **kwargs):
+        self._count("polyEvaluate")
+        counts = {"vertex": len(self.meshes[args[0]]) // 3, "edge": 0, "face": 0}
+        flags = [f for f in ("vertex", "edge", "face") if kwargs.get(f) or kwargs.get(f[0])]
+        if len(flags) == 1:
+            return counts[flags[0]]
+        return {f: counts[f] for f in flags}
+
+    def _plug(self, plug):
+        node, _, attr = plug.partition(".")
+        return self.nodes[node], attr
+
+    def ls(self, *args, **kwargs):
+        self._count("ls")
+        if kwargs.get("sl") or kwargs.get("selection"):
+            return list(self.selection)
+        patterns = args[0] if args and isinstance(args[0], (list, tuple)) else args
+        if patterns and VTX_RE.match(patterns[0]):
+            curve = patterns[0].partition(".")[0]
+            return [f"{curve}.cv[{i}]" for i in range(len(self.meshes[curve]) // 3)]
+        node_type = kwargs.get("type")
+        found = []
+        if kwargs.get("long") or kwargs.get("l"):
+            return [self._path(p) for p in patterns if p in self.nodes]
+        recursive = kwargs.get("recursive") or kwargs.get("r")
+        for pattern in patterns:
+            for name in self.nodes:
+                # -recursive matches the pattern against the name in every namespace
+                if not fnmatch.fnmatchcase(name, pattern) and not (
+                        recursive and fnmatch.fnmatchcase(name.rpartition(":")[2], pattern)):
+                    continue
+                if name not in found and (node_type is None or self.nodes[name]["type"] == node_type):
+                    found.append(name)
+        return found
+
+    def _path(self, name):
+        path = [name]
+        while self.nodes[path[-1]].get("parent"):
+            path.append(self.nodes[path[-1]]["parent"])
+        return "|" + "|".join(reversed(path))
+
+    def _children(self, name):
+        return [n for n, node in self.nodes.items() if node.get("parent") == name]
+
+    def listRelatives(self, *args, **kwargs):
+        self._count("listRelatives")
+        objs = args[0] if args and isinstance(args[0], (list, tuple)) else list(args) or list(self.selection)
+        node_type = kwargs.get("type")
+        found = []
+        for obj in objs:
+            obj = obj.rpartition("|")[2]
+            if kwargs.get("p") or kwargs.get("parent"):
+                parent = self.nodes[obj].get("parent")
+                found += [parent] if parent else []
+            elif kwargs.get("ad") or kwargs.get("allDescendents"):
+                children = {}
+                for name, node in self.nodes.items():
+                    children.setdefault(node.get("parent"), []).append(name)
+                # Maya lists descendants deepest and last sibling first, the reverse of a depth first walk
+                order = []
+                stack = list(reversed(children.get(obj, [])))
+                while stack:
+                    name = stack.pop()
+                    order.append(name)
+                    stack += reversed(children.get(name, []))
+                found += reversed(order)
+            else:
+                found += self._children(obj)
+        if node_type:
+            found = [n for n in found if self.nodes[n]["type"] == node_type]
+        if kwargs.get("f") or kwargs.get("fullPath"):
+            paths = {}
+            for name in reversed(found):  # Parents come before their children this way round
+                parent = self.nodes[name].get("parent")
+                paths[name] = (paths.get(parent) or self._path(parent) if parent else "") + "|" + name
+            found = [paths[n] for n in found]
+        return found or None
+
+    def select(self, *args, **kwargs):
+        self._count("select")
+        if kwargs.get("cl") or kwargs.get("clear"):
+            self.selection = []
+        elif args:
+            objs = args[0] if isinstance(args[0], (list, tuple)) else list(args)
+            self.selection = list(objs) if kwargs.get("r", True) else self.selection + list(objs)
+
+    def nodeType(self, obj):
+        self._count("nodeType")
+        return self.nodes[obj]["type"]
+
+    def listAttr(self, obj, **kwargs):
+        self._count("listAttr")
+        node = self.nodes[obj]
+        if kwargs.get("userDefined") or kwargs.get("ud"):
+            return list(node["user"]) or None
+        attrs = [a for a in node["keyable"] if a not in node["locked"]]
+        return attrs or None
+
+    def attributeQuery(self, attr, node=None, listDefault=False, **kwargs):
+        self._count("attributeQuery")
+        if listDefault:
+            return [self.nodes[node]["defaults"][attr]]
+        return attr in self.nodes[node]["values"]
+
+    def getAttr(self, plug, **kwargs):
+        self._count("getAttr")
+        if VTX_RE.match(plug):
+            flat = self._vtx_flat(plug)
+            return [tuple(flat[i:i + 3]) for i in range(0, len(flat), 3)]
+        node, attr = self._plug(plug)
+        if attr in COMPOUNDS:
+            return [tuple(node["values"].get(a, 0.0) for a in COMPOUNDS[attr])]
+        return node["values"].get(attr, 0.0)  # Attrs the fake never set read as 0, like most Maya defaults
+
+    def setAttr(self, plug, *values, **kwargs):
+        self._count("setAttr")
+        node, attr = self._plug(plug)
+        if attr in COMPOUNDS:
+            node["values"].update(zip(COMPOUNDS[attr], values))
+        else:
+            node["values"][attr] = values[0] if len(values) == 1 else tuple(values)
+
+    def listConnections(self, plug, **kwargs):
+        self._count("listConnections")
+        node, attr = self._plug(plug)
+        if node["type"] == "objectSet":
+            return list(node["members"]) or None
+        source = kwargs.get("source", kwargs.get("s", True))
+        destination = kwargs.get("destination", kwargs.get("d", True))
+        found = [dst if src.startswith(plug) else src for src, dst in self.connections
+                 if (source and dst.startswith(plug)) or (destination and src.startswith(plug))]
+        if not kwargs.get("plugs", kwargs.get("p")):
+            found = [f.partition(".")[0] for f in found]
+        return found or None
+
+    def disconnectAttr(self, src, dst, **kwargs):
+        self._count("disconnectAttr")
+        self.connections.remove((src, dst))
+
+    def objExists(self, name):
+        self._count("objExists")
+        return name.partition(".")[0] in self.nodes
+
+    def rename(self, old, new, **kwargs):
+        self._count("rename")
+        old = old[0] if isinstance(old, (list, tuple)) else old  # Maya takes a list of one too
+        self.nodes[new] = self.nodes.pop(old)
+        for node in self.nodes.values():
+            if node.get("parent") == old:
+                node["parent"] = new
+        if old in self.meshes:
+            self.meshes[new] = self.meshes.pop(old)
+        return new
+
+    def createNode(self, node_type, name=None, n=None, parent=None, p=None, **kwargs):
+        self._count("createNode")
+        name = name or n or f"{node_type}{len(self.nodes) + 1}"
+        self.add_node(name, node_type)
+        self.nodes[name]["parent"] = parent or p
+        if node_type in SHAPE_TYPES and not self.nodes[name]["parent"]:  # Maya makes the shape a transform
+            self.nodes[name]["parent"] = self.add_node(f"{node_type}{len(self.nodes) + 1}")
+            self.nodes[self.nodes[name]["parent"]]["parent"] = None
+        return name
+
+    def joint(self, *args, **kwargs):
+        self._count("joint")
+        name = kwargs.get("name") or kwargs.get("n") or f"joint{len(self.nodes) + 1}"
+        self.add_node(name, "joint")
+        self.nodes[name]["parent"] = self.selection[-1] if self.selection else None
+        self.selection = [name]
+        return name
+
+    def _world_translate(self, name):
+        world = [0.0, 0.0, 0.0]
+        while name in self.nodes:  # A deleted parent ends the walk, as if parented to the world
+            node = self.nodes[name]
+            for axis, attr in enumerate(COMPOUNDS["translate"]):
+                world[axis] += node["values"].get(attr, 0.0)
+            name = node.get("parent")
+        return world
+
+    def parent(self, *args, **kwargs):
+        self._count("parent")
+        objs = list(args[:-1]) if not kwargs.get("world") and not kwargs.get("w") else list(args)
+        new_parent = None if kwargs.get("world") or kwargs.get("w") else args[-1]
+        for obj in objs:
+            for o in (obj if isinstance(obj, (list, tuple)) else [obj]):
+                if not kwargs.get("r") and not kwargs.get("relative"):
+                    # Like Maya, the node keeps its world position, only translate is tracked
+                    old, new = self._world_translate(self.nodes[o].get("parent")), self._world_translate(new_parent)
+                    values = self.nodes[o]["values"]
+                    for axis, attr in enumerate(COMPOUNDS["translate"]):
+                        if old[axis] != new[axis]:
+                            values[attr] = values.get(attr, 0.0) + old[axis] - new[axis]
+                self.nodes[o]["parent"] = new_parent
+        return objs
+
+    def connectAttr(self, src, dst, **kwargs):
+        self._count("connectAttr")
+        self.connections.append((src, dst))
+
+    def aimConstraint(self, *args, **kwargs):
+        self._count("aimConstraint")
+        name = f"{args[-1]}_aimConstraint1"
+        self.add_node(name, "aimConstraint")
+        return [name]
+
+    def parentConstraint(self, *args, **kwargs):
+        self._count("parentConstraint")
+        name = f"{args[-1]}_parentConstraint1"
+        self.add_node(name, "parentConstraint")
+        return [name]
+
+    def cluster(self, *args, **kwargs):
+        self._count("cluster")
+        name = kwargs.get("name") or kwargs.get("n") or f"cluster{len(self.nodes) + 1}"
+        self.add_node(name, "cluster")
+        self.add_node(f"{name}Handle", "clusterHandle")
+        return [name, f"{name}Handle"]
+
+    def group(self, *args, **kwargs):
+        self._count("group")
+        name = kwargs.get("name") or kwargs.get("n") or f"group{len(self.nodes) + 1}"
+        self.add_node(name, "transform")
+        self.nodes[name]["parent"] = None
+        for child in args:
+            self.nodes[child]["parent"] = name
+        return name
+
+    def matchTransform(self, *args, **kwargs):
+        self._count("matchTransform")
+
+    def delete(self, *args, **kwargs):
+        self._count("delete")
+        for obj in args:
+            for o in (obj if isinstance(obj, (list, tuple)) else [obj]):
+                self.nodes.pop(o, None)
+
+    def addAttr(self, *args, **kwargs):
+        self._count("addAttr")
+        node = self.nodes[args[0]]
+        attr = kwargs.get("ln") or kwargs.get("longName")
+        node["values"][attr] = node["defaults"][attr] = kwargs.get("dv", 0.0)
+        node["user"].append(attr)
+        if kwargs.get("k") or kwargs.get("keyable"):
+            node["keyable"].append(attr)
+
+    def file(self, *args, **kwargs):
+        self._count("file")
+        if kwargs.get("sceneName") or kwargs.get("sn"):
+            return self.scene
+        return None
+
+    def currentTime(self, *args, **kwargs):
+        self._count("currentTime")
+        if kwargs.get("q") or kwargs.get("query"):
+            return self.time
+        self.time = float(args[0])
+        return self.time
+
+    def playbackOptions(self, *args, **kwargs):
+        self._count("playbackOptions")
+        if kwargs.get("min") or kwargs.get("minTime"):
+            return self.playback[0]
+        return self.playback[1]
+
+    def undoInfo(self, *args, **kwargs):
+        self._count("undoInfo")
+
+    def warning(self, msg):
+        self._count("warning")
+
+
+def parse_mel(line):
+    """
+    Reads back one line of GraphBatch.to_mel
+
+    Args:
+        line (str): 'createNode -name "poc" -skipSelect "pointOnCurveInfo";'
+
+    Returns:
+        tuple: (command, args, kwargs), as maya.cmds would have been called
+    """
+    tokens = []
+    for match in MEL_TOKEN_RE.finditer(line.strip().rstrip(";")):
+        if match.group(1) is not None:
+            tokens.append((True, match.group(1).replace('\\"', '"').replace("\\\\", "\\")))
+        else:
+            tokens.append((False, match.group(2)))
+
+    def value(quoted, token):
+        if quoted or not MEL_NUMBER_RE.match(token):
+            return token
+        return float(token) if any(c in token for c in ".e") else int(token)
+
+    cmd, args, kwargs = tokens[0][1], [], {}
+    i = 1
+    while i < len(tokens):
+        quoted, token = tokens[i]
+        i += 1
+        if quoted or args or not token.startswith("-") or MEL_NUMBER_RE.match(token):
+            args.append(value(quoted, token))
+            continue
+        flag, values = token[1:], []
+        while i < len(tokens) and not tokens[i][0] and MEL_NUMBER_RE.match(tokens[i][1]):
+            values.append(value(*tokens[i]))
+            i += 1
+        if not values and flag not in MEL_BARE_FLAGS and i < len(tokens) and tokens[i][0]:
+            values.append(tokens[i][1])
+            i += 1
+        kwargs[flag] = True if not values else values[0] if len(values) == 1 else tuple(values)
+    return cmd, args, kwargs
+
+
+class FakeMel(object):
+    """
+    Stand-in for maya.mel. eval counts as one scene call and replays GraphBatch scripts into the fake scene.
+    Lines the fake can't run, like calls to MEL procs or nodes a real scene would already have, go in
+    cmds.mel_errors instead of stopping the script
+    """
+    def __init__(self, cmds):
+        self.cmds = cmds
+
+    def eval(self, script):
+        self.cmds._count("mel.eval")
+        self.cmds.mel_scripts.append(script)
+        self.cmds.quiet = True
+        try:
+            for line in script.splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    cmd, args, kwargs = parse_mel(line)
+                    getattr(self.cmds, cmd)(*args, **kwargs)
+                except Exception as e:
+                    self.cmds.mel_errors.append((line, repr(e)))
+        finally:
+            self.cmds.quiet = False
+
+
+def install():
+    """
+    Registers fake maya and maya.cmds modules, so 'import maya.cmds as cmds' resolves to them
+
+    Returns:
+        FakeCmds: the fake cmds object the tools will talk to, the same one if already installed
+    """
+    if isinstance(sys.modules.get("maya.cmds"), FakeCmds):
+        return sys.modules["maya.cmds"]
+    cmds = FakeCmds()
+    maya = types.ModuleType("maya")
+    maya.cmds = cmds
+    maya.mel = FakeMel(cmds)
+    sys.modules["maya"] = maya
+    sys.modules["maya.cmds"] = cmds
+    sys.modules["maya.mel"] = maya.mel
+    return cmds
@@ -0,0 +1,157 @@
+'''
+Benchmark harness over the fake scene. Benchmarks register with @benchmark, each run gets an empty scene,
+and results keep the best time and the scene calls of every size. Results save as JSON baselines,
+and compare() flags what got slower or makes more scene calls than its baseline.
+Scene calls are the number to read across versions, inside Maya each one dwarfs the Python around it.
+Fake times include the fake itself, e.g. replaying GraphBatch MEL in Python, so they only catch regressions.
+'''
+
+import fnmatch
+import json
+import platform
+import sys
+import time
+
+from bench_stuff import fake_maya
+
+cmds = fake_maya.install()
+
+BENCHMARKS = []
+
+
+class SkipBenchmark(Exception):
+    """
+    Raised by a benchmark's setup when it can't run here, e.g. PySide2 or numpy missing
+    """
+
+
+def benchmark(name, param, values, repeat=3):
+    """
+    Registers a benchmark. The function sets up the scene for one size and returns the operation to time,
+    so setup is never part of the time
+
+    Args:
+        name (str): "eyelid.mel_batch", group before the dot
+        param (str): what the values are, "spans"
+        values (list): sizes to run, smallest first
+        repeat (int): runs per size, the best one is kept
+
+    Example:
+        Time zero_out over 3 sizes ::
+
+            @benchmark("zero_out.bulk", "ctrls", [10, 100, 1000])
+            def zero_out_bulk(cmds, count):
+                ctrls = [cmds.add_control(f"ctrl_{i}") for i in range(count)]
+                return lambda: zero_out_controllers.zero_out(ctrls)
+    """
+    def register(func):
+        BENCHMARKS.append({"name": name, "param": param, "values": list(values), "repeat": repeat, "func": func})
+        return func
+    return register
+
+
+def result_key(result):
+    return f"{result['name']}[{result['param']}={result['value']}]"
+
+
+def run_one(bench, value):
+    """
+    Args:
+        bench (dict): registered benchmark
+        value: size to run
+
+    Returns:
+        dict: {"name", "param", "value", "seconds", "calls", "by_command"}, or with "skipped" and its reason
+    """
+    result = {"name": bench["name"], "param": bench["param"], "value": value}
+    best = None
+    for _ in range(bench["repeat"]):
+        cmds.reset()
+        try:
+            operation = bench["func"](cmds, value)
+        except SkipBenchmark as e:
+            result["skipped"] = str(e)
+            return result
+        cmds.reset_calls()
+        start = time.perf_counter()
+        operation()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+            result["by_command"] = dict(cmds.calls)
+    result["seconds"] = best
+    result["calls"] = sum(result["by_command"].values())
+    return result
+
+
+def run(pattern="*", quick=False, out=None):
+    """
+    Args:
+        pattern (str): fnmatch pattern of benchmark names to run
+        quick (bool): only run the smallest size of each
+        out (file): prints a line per result as it goes, None for silent
+
+    Returns:
+        list[dict]: results of run_one
+    """
+    results = []
+    for bench in BENCHMARKS:
+        if not fnmatch.fnmatch(bench["name"], pattern):
+            continue
+        for value in bench["values"][:1] if quick else bench["values"]:
+            result = run_one(bench, value)
+            results.append(result)
+            if out is not None:
+                out.write(format_result(result) + "\n")
+                out.flush()
+    return results
+
+
+def format_result(result):
+    if "skipped" in result:
+        return f"{result_key(result):<40} skipped: {result['skipped']}"
+    return f"{result_key(result):<40} {result['seconds'] * 1e3:10.3f} ms | {result['calls']:>7} scene calls"
+
+
+def save(results, path):
+    """
+    Args:
+        results (list[dict]): from run
+        path (str): JSON baseline to write
+    """
+    with open(path, "w") as f:
+        json.dump({"python": sys.version.split()[0], "platform": platform.platform(),
+                   "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, f, indent=2)
+
+
+def load(path):
+    with open(path, "r") as f:
+        return json.load(f)["results"]
+
+
+def compare(results, baseline, tolerance=0.25, floor=0.001):
+    """
+    Scene calls must not go up at all, they don't depend on the machine. Times may go up by tolerance,
+    and by at least floor seconds, so timer noise on tiny benchmarks doesn't fail a run
+
+    Args:
+        results (list[dict]): from run
+        baseline (list[dict]): from load
+        tolerance (float): allowed slow down, 0.25 is 25% slower
+        floor (float): slow downs under this many seconds are never regressions
+
+    Returns:
+        list[str]: one line per regression, empty if none
+    """
+    base = {result_key(r): r for r in baseline if "skipped" not in r}
+    regressions = []
+    for result in results:
+        old = base.get(result_key(result))
+        if old is None or "skipped" in result:
+            continue
+        if result["calls"] > old["calls"]:
+            regressions.append(f"{result_key(result)} scene calls {old['calls']} -> {result['calls']}")
+        if result["seconds"] > old["seconds"] * (1.0 + tolerance) and result["seconds"] - old["seconds"] > floor:
+            regressions.append(f"{result_key(result)} time {old['seconds'] * 1e3:.3f} ms -> "
+                               f"{result['seconds'] * 1e3:.3f} ms ({result['seconds'] / old['seconds']:.2f}x)")
+    return regressions
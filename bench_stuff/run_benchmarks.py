@@ -0,0 +1,44 @@
+'''
+Runs the benchmarks in bench_stuff/benchmarks.py on fake maya.cmds, saves baselines and fails on regressions
+
+Usage:
+    python bench_stuff/run_benchmarks.py --save baseline.json         # record a baseline
+    python bench_stuff/run_benchmarks.py --compare baseline.json      # exit 1 if slower or more scene calls
+    python bench_stuff/run_benchmarks.py -k "eyelid.*" --quick        # smallest size of matching benchmarks
+'''
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_stuff import harness  # noqa: E402
+from bench_stuff import benchmarks  # noqa: E402,F401 registers the benchmarks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the_pit tools on fake maya.cmds")
+    parser.add_argument("-k", "--filter", default="*", help="fnmatch pattern of benchmark names")
+    parser.add_argument("--quick", action="store_true", help="only the smallest size of each benchmark")
+    parser.add_argument("--save", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", help="JSON baseline to check the results against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slow down, 0.25 is 25%%")
+    parser.add_argument("--floor", type=float, default=0.001, help="slow downs under this many seconds pass")
+    args = parser.parse_args(argv)
+
+    results = harness.run(args.filter, quick=args.quick, out=sys.stdout)
+    if args.save:
+        harness.save(results, args.save)
+        print(f"Saved {len(results)} results to {args.save}")
+    if args.compare:
+        regressions = harness.compare(results, harness.load(args.compare), args.tolerance, args.floor)
+        for line in regressions:
+            print("REGRESSION " + line)
+        print(f"{len(regressions)} regressions against {args.compare}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,448 @@
-import maya.cmds as cmds
+from array import array
+from collections import OrderedDict
 
-def get_vtx_pos():
+from rig_stuff.lazy_cmds import cmds
+
+try:
+    import numpy as np
+except ImportError:  # Older mayapy builds don't ship numpy
+    np = None
+
+
+def get_vtx_pos(mesh="main"):
     """
     Gets positions of mesh's verticies the faster than loop
 
+    Args:
+        mesh (str): name of the mesh to query
+
     Returns:
        list[tuple]: [(x, y, z), (x, y, z)...]
     """
-    
-    # Query world space translation of each vertex of mesh main
-    vtx = cmds.xform('main.vtx[*]', q=True, ws=True, t=True)
 
-    # Zip xyz into tuple. Not good for non-manifold geo!
+    # Query world space translation of each vertex of mesh
+    vtx = cmds.xform(f'{mesh}.vtx[*]', q=True, ws=True, t=True)
+
+    # Zip xyz into tuple. Not good for non-manifold geo! Use get_mesh_topology for that
     pos = zip(vtx[0::3], vtx[1::3], vtx[2::3])
 
     return list(pos)
-  
+
+
+def vtx_components(mesh, ranges=None):
+    """
+    Builds the vertex component strings for one bulk query
+
+    Args:
+        mesh (str): name of the mesh
+        ranges (list[tuple]): inclusive (start, end) vertex index ranges, or None for every vertex
+
+    Returns:
+        list[str]: ['mesh.vtx[0:9]', 'mesh.vtx[20:29]'...]
+    """
+    if not ranges:
+        return [f"{mesh}.vtx[*]"]
+    return [f"{mesh}.vtx[{start}:{end}]" for start, end in ranges]
+
+
+def to_vtx_array(flat, as_numpy=True):
+    """
+    Packs a flat [x, y, z, x, y, z...] list into one contiguous buffer
+
+    Args:
+        flat (list[float]): flat list of coordinates as returned by cmds.xform
+        as_numpy (bool): if True and numpy is available, returns an (N, 3) float64 array
+
+    Returns:
+        numpy.ndarray or array.array: (N, 3) float64 array, or flat array('d') buffer
+    """
+    if as_numpy and np is not None:
+        return np.array(flat, dtype=np.float64).reshape(-1, 3)
+    return array('d', flat)
+
+
+def get_flat_positions(mesh, ranges=None, world_space=True):
+    """
+    Args:
+        mesh (str): name of the mesh to query
+        ranges (list[tuple]): inclusive (start, end) vertex index ranges, or None for every vertex
+        world_space (bool): if True, queries world space, otherwise object space
+
+    Returns:
+        list[float]: flat list [x, y, z, x, y, z...] straight from cmds.xform
+    """
+    components = vtx_components(mesh, ranges)
+    if world_space:
+        return cmds.xform(components, q=True, ws=True, t=True) or []
+    return cmds.xform(components, q=True, os=True, t=True) or []
+
+
+def get_vtx_positions(mesh, ranges=None, world_space=True, as_numpy=True):
+    """
+    Gets positions of any mesh's verticies with one bulk query, without a tuple per vertex
+
+    Args:
+        mesh (str): name of the mesh to query
+        ranges (list[tuple]): inclusive (start, end) vertex index ranges, or None for every vertex
+        world_space (bool): if True, queries world space, otherwise object space
+        as_numpy (bool): if True and numpy is available, returns an (N, 3) float64 array
+
+    Returns:
+        numpy.ndarray or array.array: (N, 3) float64 array, or flat array('d') buffer [x, y, z, x, y, z...]
+    """
+    return to_vtx_array(get_flat_positions(mesh, ranges, world_space), as_numpy=as_numpy)
+
+
+def get_vtx_count(mesh):
+    """
+    Args:
+        mesh (str): name of the mesh
+
+    Returns:
+        int: number of verticies on the mesh
+    """
+    return cmds.polyEvaluate(mesh, vertex=True)
+
+
+def iter_vtx_positions(mesh, chunk_size=100000, world_space=True, as_numpy=True):
+    """
+    Walks the mesh in chunks of mesh.vtx[a:b] so peak memory stays bounded by chunk_size.
+    One buffer is allocated up front and refilled for every chunk, so copy what you need to keep!
+
+    Args:
+        mesh (str): name of the mesh to query
+        chunk_size (int): number of verticies read per query
+        world_space (bool): if True, queries world space, otherwise object space
+        as_numpy (bool): if True and numpy is available, yields (n, 3) float64 array views
+
+    Yields:
+        tuple: (start index, buffer) where buffer is an (n, 3) array view or a flat memoryview of doubles
+    """
+    count = get_vtx_count(mesh)
+    use_numpy = as_numpy and np is not None
+    if use_numpy:
+        buf = np.empty((chunk_size, 3), dtype=np.float64)
+        flat_buf = buf.reshape(-1)
+    else:
+        buf = array('d', bytes(8 * 3 * chunk_size))
+        view = memoryview(buf)
+
+    for start in range(0, count, chunk_size):
+        end = min(start + chunk_size, count) - 1
+        n = end - start + 1
+        flat = get_flat_positions(mesh, [(start, end)], world_space)
+        if use_numpy:
+            flat_buf[:n * 3] = flat
+            yield start, buf[:n]
+        else:
+            buf[:n * 3] = array('d', flat)
+            yield start, view[:n * 3]
+
+
+def write_vtx_positions(mesh, path, chunk_size=100000, world_space=True):
+    """
+    Streams vertex positions straight to disk as float32, one chunk at a time.
+    A .npy path is written as a memory-mapped (N, 3) numpy file, anything else as raw float32 xyz
+
+    Args:
+        mesh (str): name of the mesh to query
+        path (str): output file path
+        chunk_size (int): number of verticies read per query
+        world_space (bool): if True, queries world space, otherwise object space
+
+    Returns:
+        str: path of the written file
+    """
+    if path.endswith(".npy"):
+        if np is None:
+            raise ImportError("numpy is needed to write .npy files, use a raw path instead")
+        out = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(get_vtx_count(mesh), 3))
+        for start, chunk in iter_vtx_positions(mesh, chunk_size, world_space):
+            out[start:start + len(chunk)] = chunk
+        out.flush()
+        del out
+        return path
+
+    with open(path, "wb") as f:
+        for start, chunk in iter_vtx_positions(mesh, chunk_size, world_space, as_numpy=False):
+            array('f', chunk).tofile(f)
+    return path
+
+
+def to_int_array(values, as_numpy=True):
+    """
+    Args:
+        values (iterable[int]): MIntArray or any sequence of ints
+        as_numpy (bool): if True and numpy is available, returns an int32 numpy array
+
+    Returns:
+        numpy.ndarray or array.array: flat int32 array
+    """
+    if as_numpy and np is not None:
+        return np.array(values, dtype=np.int32)
+    return array('i', values)
+
+
+def get_mesh_topology(mesh, world_space=True, uvs=False, uv_set=None, as_numpy=True):
+    """
+    Gets positions plus face-vertex topology as flat arrays, read in bulk through OpenMaya.
+    Shared and split (non-manifold) verticies keep their real indices, so solvers can rebuild the mesh.
+
+    Args:
+        mesh (str): name of the mesh to query
+        world_space (bool): if True, positions are in world space, otherwise object space
+        uvs (bool): if True, also returns per-face-vertex uv indices and the uv coordinates
+        uv_set (str): uv set to read, None for the current one
+        as_numpy (bool): if True and numpy is available, returns numpy arrays
+
+    Returns:
+        dict: {"positions": (N, 3) floats,
+               "face_counts": verticies per face,
+               "face_indices": vertex index per face-vertex,
+               "uv_counts": uvs per face, "uv_indices": uv index per face-vertex, "uvs": flat [u, v, u, v...]}
+    """
+    import maya.api.OpenMaya as om
+
+    sel = om.MSelectionList()
+    sel.add(mesh)
+    fn_mesh = om.MFnMesh(sel.getDagPath(0))
+
+    face_counts, face_indices = fn_mesh.getVertices()
+    topology = {
+        "positions": get_vtx_positions(mesh, world_space=world_space, as_numpy=as_numpy),
+        "face_counts": to_int_array(face_counts, as_numpy),
+        "face_indices": to_int_array(face_indices, as_numpy),
+    }
+
+    if uvs:
+        uv_set = uv_set or fn_mesh.currentUVSetName()
+        uv_counts, uv_indices = fn_mesh.getAssignedUVs(uv_set)
+        u, v = fn_mesh.getUVs(uv_set)
+        flat_uvs = [0.0] * (len(u) * 2)
+        flat_uvs[0::2] = u
+        flat_uvs[1::2] = v
+        topology["uv_counts"] = to_int_array(uv_counts, as_numpy)
+        topology["uv_indices"] = to_int_array(uv_indices, as_numpy)
+        if as_numpy and np is not None:
+            topology["uvs"] = np.array(flat_uvs, dtype=np.float64).reshape(-1, 2)
+        else:
+            topology["uvs"] = array('d', flat_uvs)
+
+    return topology
+
+
+def get_topology_signature(mesh):
+    """
+    Cheap signature that changes when verticies, edges or faces are added or removed
+
+    Args:
+        mesh (str): name of the mesh
+
+    Returns:
+        tuple: (vertex count, hash of vertex, edge and face counts)
+    """
+    counts = cmds.polyEvaluate(mesh, vertex=True, edge=True, face=True)
+    if isinstance(counts, dict):
+        counts = (counts.get("vertex"), counts.get("edge"), counts.get("face"))
+        return counts[0], hash(counts)
+    return counts, hash(counts)
+
+
+class VtxPosCache(object):
+    """
+    LRU cache of get_vtx_positions results keyed by the mesh's full DAG path, space and topology signature.
+    Entries are refreshed when flagged dirty, either by hand with mark_dirty or by the Maya
+    callbacks registered with add_callbacks.
+
+    Example:
+        Read the mesh once for many tool runs ::
+
+            cache = VtxPosCache(budget=512 * 1024 * 1024)
+            cache.add_callbacks()
+            pos = cache.get("body_geo")
+            print(cache.stats())
+    """
+    def __init__(self, budget=256 * 1024 * 1024):
+        """
+        Args:
+            budget (int): max bytes of positions to keep before least recently used meshes are evicted
+        """
+        self.budget = budget
+        self.entries = OrderedDict()
+        self.dirty = set()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.callback_ids = []
+        self.watched = {}  # node hash -> [MObjectHandle, callback ids, cached paths using it]
+        self.watching = {}  # cached path -> node hashes it watches, the mesh and every ancestor
+
+    def get(self, mesh, world_space=True, as_numpy=True):
+        """
+        Args:
+            mesh (str): name or DAG path of the mesh to query
+            world_space (bool): if True, queries world space, otherwise object space
+            as_numpy (bool): if True and numpy is available, returns an (N, 3) float64 array
+
+        Returns:
+            numpy.ndarray or array.array: cached positions, treat them as read only
+        """
+        path = full_path(mesh)
+        key = (path, world_space, as_numpy, get_topology_signature(path))
+        if path in self.dirty:
+            self.invalidate(path)
+        elif key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+
+        self.misses += 1
+        pos = get_vtx_positions(path, world_space=world_space, as_numpy=as_numpy)
+        self._drop_stale(key)
+        self.entries[key] = pos
+        self.size += _nbytes(pos)
+        if self.callback_ids:
+            self._watch(path)
+        self._evict()
+        return pos
+
+    def mark_dirty(self, mesh=None):
+        """
+        Flags cached meshes at, under or directly above mesh, so a moved group flags every mesh below it
+
+        Args:
+            mesh (str): name or DAG path of a node whose positions changed, or None to flag every cached mesh
+        """
+        if mesh is None:
+            self.dirty.update(key[0] for key in self.entries)
+            return
+        path = full_path(mesh)
+        for cached in {key[0] for key in self.entries}:
+            if cached == path or cached.startswith(path + "|") or path.startswith(cached + "|"):
+                self.dirty.add(cached)
+
+    def invalidate(self, mesh):
+        path = full_path(mesh)
+        for key in [k for k in self.entries if k[0] == path]:
+            self.size -= _nbytes(self.entries.pop(key))
+        self.dirty.discard(path)
+        self._unwatch(path)
+
+    def clear(self):
+        self.entries.clear()
+        self.dirty.clear()
+        self.size = 0
+        for path in list(self.watching):
+            self._unwatch(path)
+
+    def stats(self):
+        """
+        Returns:
+            dict: hit, miss and eviction counters plus entry count and bytes held
+        """
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": len(self.entries), "bytes": self.size}
+
+    def add_callbacks(self):
+        """
+        Flags everything dirty on scene open/new and undo/redo. Each cached mesh gets its shape and every
+        ancestor watched while it's cached, and is dropped when any of them is deleted
+        """
+        import maya.api.OpenMaya as om
+
+        for event in ("SceneOpened", "NewSceneOpened", "Undo", "Redo"):
+            self.callback_ids.append(om.MEventMessage.addEventCallback(event, lambda *args: self.mark_dirty()))
+        self.callback_ids.append(om.MDGMessage.addNodeRemovedCallback(self._node_removed, "dagNode"))
+        for path in {key[0] for key in self.entries}:
+            self._watch(path)
+
+    def remove_callbacks(self):
+        import maya.api.OpenMaya as om
+
+        for path in list(self.watching):
+            self._unwatch(path)
+        if self.callback_ids:
+            om.MMessage.removeCallbacks(self.callback_ids)
+        self.callback_ids = []
+
+    def _watch(self, path):
+        import maya.api.OpenMaya as om
+
+        if path in self.watching:
+            return
+        sel = om.MSelectionList()
+        sel.add(path)
+        dag = sel.getDagPath(0)
+        hashes = []
+        while dag.length() > 0:
+            handle = om.MObjectHandle(dag.node())
+            watched = self.watched.get(handle.hashCode())
+            if watched is None:
+                watched = self.watched[handle.hashCode()] = [handle, [om.MNodeMessage.addAttributeChangedCallback(
+                    dag.node(), self._attr_changed)], set()]
+            watched[2].add(path)
+            hashes.append(handle.hashCode())
+            dag.pop()
+        self.watching[path] = hashes
+
+    def _unwatch(self, path):
+        if path not in self.watching:
+            return
+        import maya.api.OpenMaya as om
+
+        for node_hash in self.watching.pop(path):
+            watched = self.watched.get(node_hash)
+            if watched is None:
+                continue
+            watched[2].discard(path)
+            if not watched[2]:
+                om.MMessage.removeCallbacks(watched[1])
+                del self.watched[node_hash]
+
+    def _attr_changed(self, msg, plug, *args):
+        import maya.api.OpenMaya as om
+
+        self.mark_dirty(om.MDagPath.getAPathTo(plug.node()).fullPathName())
+
+    def _node_removed(self, node, *args):
+        import maya.api.OpenMaya as om
+
+        watched = self.watched.get(om.MObjectHandle(node).hashCode())
+        if watched is None:
+            return
+        for path in list(watched[2]):  # Every mesh at or under the deleted node
+            self.invalidate(path)
+
+    def _drop_stale(self, key):
+        # Old topology or dirty entries of the same mesh and space can never hit again
+        for stale in [k for k in self.entries if k[:3] == key[:3]]:
+            self.size -= _nbytes(self.entries.pop(stale))
+
+    def _evict(self):
+        while self.size > self.budget and len(self.entries) > 1:
+            key, pos = self.entries.popitem(last=False)
+            self.size -= _nbytes(pos)
+            self.evictions += 1
+            if not any(k[0] == key[0] for k in self.entries):
+                self._unwatch(key[0])
+
+
+def full_path(mesh):
+    """
+    Args:
+        mesh (str): name or DAG path
+
+    Returns:
+        str: full DAG path, so every spelling of a node shares one cache key. mesh as is if it can't be found
+    """
+    if mesh.startswith("|"):
+        return mesh
+    found = cmds.ls(mesh, long=True)
+    return found[0] if found else mesh
+
+
+def _nbytes(pos):
+    if hasattr(pos, "nbytes"):
+        return pos.nbytes
+    return pos.itemsize * len(pos)
@@ -0,0 +1,615 @@
+'''
+Reads and writes Clip Studio Paint auto action sets (.laf, like CSP_AnimTools/AnimTools.laf) without Clip Studio.
+
+A .laf is one object. Objects and arrays are a header of named values (just "typename") followed by their
+entries, named in objects and not in arrays. Every value starts with a type byte:
+    0x06 string, 0x07 bytes        uint length, then the data
+    0x11 bool, 0x13 int, 0x14 int   uint value (0x14 is only seen in rgbcolor, read as an int too)
+    0x48 array, 0x49 object        4 byte big endian length, then header and entries
+uint is one byte giving the width, then that many big endian bytes, so 0 is just 00.
+
+Records read lazily over a memoryview of the file, an mmap for load(), and values are slices of it until
+decoded. Skipping a record is a jump over its length, so scans never copy or parse more than they touch.
+dumps() copies untouched records byte for byte and only encodes what was changed,
+splice() swaps values by offset, e.g. from scan() or other_stuff/laf_index.py, without building records.
+'''
+
+import bisect
+import mmap
+import struct
+
+TYPES = {0x06: "string", 0x07: "bytes", 0x11: "bool", 0x13: "int", 0x14: "int", 0x48: "array", 0x49: "object"}
+TAGS = {"string": 0x06, "bytes": 0x07, "bool": 0x11, "int": 0x13, "array": 0x48, "object": 0x49}
+STRING_TAGS = (0x06, 0x07)
+INT_TAGS = (0x11, 0x13, 0x14)
+RECORD_TAGS = (0x48, 0x49)
+UINT32 = struct.Struct(">I")  # unpack_from is several times faster than int.from_bytes on a slice
+
+
+def read_uint(buf, pos):
+    """
+    Args:
+        buf (memoryview): file data
+        pos (int): offset of the width byte
+
+    Returns:
+        tuple[int, int]: value, offset after it
+    """
+    width = buf[pos]
+    if width == 1:  # Nearly every length and count
+        return buf[pos + 1], pos + 2
+    end = pos + 1 + width
+    return int.from_bytes(buf[pos + 1:end], "big"), end
+
+
+def encode_uint(value):
+    width = (value.bit_length() + 7) // 8
+    return bytes((width,)) + value.to_bytes(width, "big")
+
+
+def read_key(buf, pos):
+    """
+    Returns:
+        tuple[memoryview, int]: key bytes, offset after it
+    """
+    if buf[pos] == 1:
+        end = pos + 2 + buf[pos + 1]
+        return buf[pos + 2:end], end
+    length, pos = read_uint(buf, pos)
+    return buf[pos:pos + length], pos + length
+
+
+def read_value(buf, pos):
+    """
+    Args:
+        buf (memoryview): file data
+        pos (int): offset of the type byte
+
+    Returns:
+        tuple[Value or Record, int]: the value, not decoded yet, and the offset after it
+    """
+    tag = buf[pos]
+    if tag in STRING_TAGS:
+        length, start = read_uint(buf, pos + 1)
+        end = start + length
+    elif tag in INT_TAGS:
+        end = pos + 2 + buf[pos + 1]
+    elif tag in RECORD_TAGS:
+        start = pos + 5
+        end = start + UINT32.unpack_from(buf, pos + 1)[0]
+        return Record(buf, tag, pos, start, end), end
+    else:
+        raise ValueError(f"Unknown .laf type {tag:#04x} at byte {pos}")
+    if end > len(buf):
+        raise ValueError(f".laf value at byte {pos} runs past the end of the data")
+    return Value(tag, buf, pos, end), end
+
+
+class Value(object):
+    """
+    A string, bytes, bool or int. Read ones are a slice of the file until .value decodes them,
+    new ones hold the Python value and are encoded by dumps
+
+    Attributes:
+        tag (int): type byte
+        offset (int): offset of the type byte in the file, None for new values
+    """
+    __slots__ = ("tag", "buf", "offset", "end", "_value")
+
+    def __init__(self, tag, buf=None, offset=None, end=None, value=None):
+        self.tag = tag
+        self.buf = buf
+        self.offset = offset
+        self.end = end
+        self._value = value
+
+    @classmethod
+    def new(cls, value, tag=None):
+        """
+        Args:
+            value (str, bytes, bool or int): Python value
+            tag (int or str): type byte or name from TAGS, defaults to the type of value
+
+        Returns:
+            Value: value to put in a Record
+        """
+        if tag is None:
+            tag = "bool" if isinstance(value, bool) else "int" if isinstance(value, int) else \
+                "bytes" if isinstance(value, (bytes, bytearray)) else "string"
+        return cls(TAGS.get(tag, tag), value=value)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.type}, {self.value!r})"
+
+    @property
+    def type(self):
+        return TYPES[self.tag]
+
+    @property
+    def value(self):
+        """
+        Returns:
+            str, bytes, bool or int: decoded value
+        """
+        if self.buf is None:
+            return self._value
+        if self.tag in STRING_TAGS:
+            _, start = read_uint(self.buf, self.offset + 1)
+            data = self.buf[start:self.end]
+            return str(data, "utf-8") if self.tag == 0x06 else bytes(data)
+        width = self.end - self.offset - 2
+        value = self.buf[self.offset + 2] if width == 1 else int.from_bytes(self.buf[self.offset + 2:self.end], "big")
+        return bool(value) if self.tag == 0x11 else value
+
+    def chunks(self):
+        """
+        Returns:
+            list: bytes like pieces of the encoded value, the file slice itself when unchanged
+        """
+        if self.buf is not None:
+            return [self.buf[self.offset:self.end]]
+        value = self._value
+        if self.tag in STRING_TAGS:
+            data = value.encode("utf-8") if isinstance(value, str) else bytes(value)
+            return [bytes((self.tag,)) + encode_uint(len(data)), data]
+        return [bytes((self.tag,)) + encode_uint(int(value))]
+
+
+class Record(Value):
+    """
+    An object or array, read lazily. Entries are parsed on each walk until something is set,
+    then the record keeps them in lists and it and the records above it are encoded again by dumps.
+    Parents keep the child records they hand out, so every read of an entry gives the same object and
+    edits made through any of them end up in the file
+
+    Example:
+        Print every action of a set and rename a layer ::
+
+            from other_stuff import laf
+
+            with laf.load("AnimTools.laf") as root:
+                for action in root["actionArray"].values():
+                    print(action["actionName"].value)
+                item = root["actionArray"][0]["actionItemArray"][1]["actionItemParameter"]
+                item["layername"] = "LN_main"
+                laf.dump(root, "AnimTools_renamed.laf")
+    """
+    __slots__ = ("start", "parent", "_header", "_entries", "_body", "_children", "_dirty")
+
+    def __init__(self, buf, tag, offset, start, end):
+        """
+        Args:
+            buf (memoryview): file data
+            tag (int): 0x48 for arrays, 0x49 for objects, None for the root object of a file
+            offset (int): offset of the type byte
+            start (int): offset of the header, after the type byte and length
+            end (int): offset after the record
+        """
+        super(Record, self).__init__(tag, buf, offset, end)
+        self.start = start
+        self._header = None  # [[key, value]] once set
+        self._entries = None
+        self._body = None  # Offset of the entries, after the header
+        self.parent = None
+        self._children = {}  # offset -> Record under this one, once read
+        self._dirty = buf is None
+
+    @classmethod
+    def new(cls, typename="", tag="object"):
+        """
+        Args:
+            typename (str): "typeActionItem", empty on most arrays and parameter objects
+            tag (str or int): "object", "array", or None for the root object of a new file
+
+        Returns:
+            Record: empty record to fill with set and append
+        """
+        record = cls(None, TAGS.get(tag, tag), None, None, None)
+        record._header = [["typename", Value.new(typename, "string")]]
+        record._entries = []
+        return record
+
+    def __repr__(self):
+        return f"Record({self.type}, {self.typename!r}, {len(self)} entries)"
+
+    @property
+    def type(self):
+        return "object" if self.tag is None else TYPES[self.tag]
+
+    @property
+    def value(self):
+        return self
+
+    @property
+    def keyed(self):
+        return self.tag != 0x48
+
+    def header(self):
+        """
+        Yields:
+            tuple[str, Value]: named header values, "typename" first
+        """
+        if self._header is not None:
+            yield from self._header
+            return
+        count, pos = read_uint(self.buf, self.start)
+        for _ in range(count):
+            key, pos = read_key(self.buf, pos)
+            value, pos = read_value(self.buf, pos)
+            yield str(key, "utf-8"), value
+        self._body = pos
+
+    def body(self):
+        """
+        Returns:
+            int: offset of the entry count, after the header
+        """
+        if self._body is None:
+            for _ in self.header():
+                pass
+        return self._body
+
+    def raw_items(self):
+        """
+        Yields:
+            tuple[memoryview or str or None, Value]: entries with their keys still as file slices, None in arrays.
+                Cheapest way to scan, compare keys against bytes
+        """
+        if self._entries is not None:
+            for key, value in self._entries:
+                yield key, value
+            return
+        buf, keyed, children = self.buf, self.keyed, self._children
+        count, pos = read_uint(buf, self.body())
+        key = None
+        for _ in range(count):
+            if keyed:
+                key, pos = read_key(buf, pos)
+            value, pos = read_value(buf, pos)
+            if value.tag in RECORD_TAGS:
+                value = children.setdefault(value.offset, value)
+                value.parent = self
+            yield key, value
+
+    def items(self):
+        """
+        Yields:
+            tuple[str or None, Value]: entries, keys are None in arrays
+        """
+        for key, value in self.raw_items():
+            yield (key if key is None or isinstance(key, str) else str(key, "utf-8")), value
+
+    def keys(self):
+        return [key for key, _ in self.items()]
+
+    def values(self):
+        for _, value in self.raw_items():
+            yield value
+
+    def __iter__(self):
+        return self.values() if not self.keyed else iter(self.keys())
+
+    def __len__(self):
+        if self._entries is not None:
+            return len(self._entries)
+        return read_uint(self.buf, self.body())[0]
+
+    @property
+    def typename(self):
+        for key, value in self.header():
+            if key == "typename":
+                return value.value
+        return None
+
+    def get(self, key, default=None):
+        """
+        Args:
+            key (str or int): entry name in objects, index in arrays
+
+        Returns:
+            Value or Record: the entry, default if it is missing
+        """
+        if isinstance(key, int):
+            for index, value in enumerate(self.values()):
+                if index == key:
+                    return value
+            return default
+        encoded = key.encode("utf-8")
+        for name, value in self.raw_items():
+            if name == encoded or name == key:
+                return value
+        return default
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def materialize(self):
+        """
+        Parses the header and entries into lists, the first set on a record does this.
+        Child records already read are kept, not parsed again
+        """
+        if self._entries is None:
+            self._header = [[key, value] for key, value in self.header()]
+            self._entries = [[key, value] for key, value in self.items()]
+            self._children.clear()  # The entries hold them now
+        self.touch()
+
+    def touch(self):
+        """
+        Marks this record and the ones above it to be encoded again
+        """
+        self._dirty = True
+        child, parent = self, self.parent
+        while parent is not None:
+            if parent._entries is None:
+                parent._children[child.offset] = child
+            if parent._dirty:
+                break
+            parent._dirty = True
+            child, parent = parent, parent.parent
+
+    def __setitem__(self, key, value):
+        """
+        Args:
+            key (str or int): entry name in objects, index in arrays
+            value (Value, Record, str, bytes, bool or int): Python values keep the type of the entry they replace
+        """
+        self.materialize()
+        for index, entry in enumerate(self._entries):
+            if entry[0] == key or (not self.keyed and index == key):
+                if not isinstance(value, Value):
+                    value = Value.new(value, entry[1].tag if entry[1].tag not in RECORD_TAGS else None)
+                entry[1] = self.adopt(value)
+                return
+        if not self.keyed:
+            raise IndexError(key)
+        self._entries.append([key, self.adopt(value if isinstance(value, Value) else Value.new(value))])
+
+    def append(self, value):
+        """
+        Args:
+            value (Value or Record): entry to add to an array
+        """
+        self.materialize()
+        self._entries.append([None, self.adopt(value if isinstance(value, Value) else Value.new(value))])
+
+    def adopt(self, value):
+        if isinstance(value, Record):
+            value.parent = self
+        return value
+
+    def chunks(self):
+        if not self._dirty:
+            return [self.buf[self.offset:self.end]] if self.tag is not None else [self.buf[self.start:self.end]]
+        header = list(self.header())
+        parts = [encode_uint(len(header))]
+        for key, value in header:
+            data = key.encode("utf-8")
+            parts += [encode_uint(len(data)), data] + value.chunks()
+        entries = list(self.items())
+        parts.append(encode_uint(len(entries)))
+        for key, value in entries:
+            if key is not None:
+                data = key.encode("utf-8")
+                parts += [encode_uint(len(data)), data]
+            parts += value.chunks()
+        if self.tag is None:
+            return parts
+        return [bytes((self.tag,)) + UINT32.pack(sum(len(part) for part in parts))] + parts
+
+
+class LafFile(object):
+    """
+    An open .laf, the root Record over an mmap of it. Values read from it are slices of the mmap,
+    keep them inside the with block or decode them
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty file
+            self.map = b""
+        self.view = memoryview(self.map)
+        self.root = loads(self.view)
+
+    def __enter__(self):
+        return self.root
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.root = None
+        self.view.release()
+        if isinstance(self.map, mmap.mmap):
+            try:
+                self.map.close()
+            except BufferError:  # Values still alive hold slices, the map closes once they are gone
+                pass
+        self.file.close()
+
+
+def loads(data):
+    """
+    Args:
+        data (bytes, bytearray, mmap or memoryview): whole .laf
+
+    Returns:
+        Record: root object, reading over data without copying it
+    """
+    buf = data if isinstance(data, memoryview) else memoryview(data)
+    return Record(buf, None, 0, 0, len(buf))
+
+
+def load(path):
+    """
+    Args:
+        path (str): .laf file
+
+    Returns:
+        LafFile: use as a context manager to get the root Record
+    """
+    return LafFile(path)
+
+
+def dumps(record):
+    """
+    Args:
+        record (Record): root object, or any record to encode on its own
+
+    Returns:
+        bytes: encoded record, the same bytes it was read from if nothing changed
+    """
+    return b"".join(record.chunks())
+
+
+def dump(record, path):
+    """
+    Writes record without joining it in memory first
+
+    Args:
+        record (Record): root object
+        path (str): .laf file to write
+    """
+    with open(path, "wb") as f:
+        for chunk in record.chunks():
+            f.write(chunk)
+
+
+def splice(data, edits):
+    """
+    Replaces values by offset, fixing the lengths of the records around them, without parsing any record
+    that holds no edit. The fast way to change a few values found by scan or an index
+
+    Args:
+        data (bytes, mmap or memoryview): whole .laf
+        edits (dict): offset of a value's type byte -> Value or encoded bytes to put there
+
+    Returns:
+        list: bytes like chunks of the new file, write them in order or join them
+    """
+    buf = data if isinstance(data, memoryview) else memoryview(data)
+    starts = sorted(edits)
+    patches = []  # (start, end, bytes) of every replaced stretch
+    growth = [0]  # Size change of the edits before each index of starts
+    for offset in starts:
+        new = edits[offset]
+        new = bytes(new) if isinstance(new, (bytes, bytearray, memoryview)) else b"".join(new.chunks())
+        end = read_value(buf, offset)[1]
+        patches.append((offset, end, new))
+        growth.append(growth[-1] + len(new) - (end - offset))
+
+    stack = [loads(buf)]
+    while stack:
+        for value in stack.pop().values():
+            if not isinstance(value, Record):
+                continue
+            first, last = bisect.bisect_right(starts, value.offset), bisect.bisect_left(starts, value.end)
+            if first == last:
+                continue
+            change = growth[last] - growth[first]
+            if change:
+                patches.append((value.offset + 1, value.start, UINT32.pack(value.end - value.start + change)))
+            stack.append(value)
+
+    chunks = []
+    pos = 0
+    for start, end, new in sorted(patches):
+        chunks += [buf[pos:start], new]
+        pos = end
+    chunks.append(buf[pos:])
+    return chunks
+
+
+def scan(data, start=0, end=None):
+    """
+    Flat stream of every value in a .laf, the fastest way through one. Nothing is decoded or copied,
+    keys are slices of data and values are offsets into it. Header values like "typename" come first in
+    each record, like in the file
+
+    Args:
+        data (bytes, mmap or memoryview): whole .laf, or any buffer holding a record
+        start (int): offset of the header of the record to scan, 0 for a file
+        end (int): offset after that record, the end of data by default
+
+    Yields:
+        tuple[int, memoryview or None, int, int, int]: depth, key (None in arrays), type byte,
+            offset of the type byte and offset after the value. Records come before their entries,
+            read them with read_value(data, offset) if needed
+    """
+    buf = data if isinstance(data, memoryview) else memoryview(data)
+    end = len(buf) if end is None else end
+    count, pos = read_uint(buf, start)
+    stack = [[count, True, True]]  # [values left, entries keyed, in header] per open record
+    while stack:
+        frame = stack[-1]
+        if not frame[0]:
+            if frame[2]:  # Header done, entries next
+                frame[0], pos = read_uint(buf, pos)
+                frame[2] = False
+            else:
+                stack.pop()
+            continue
+        frame[0] -= 1
+        key = None
+        if frame[1] or frame[2]:
+            key, pos = read_key(buf, pos)
+        tag = buf[pos]
+        if tag in RECORD_TAGS:
+            yield len(stack) - 1, key, tag, pos, pos + 5 + UINT32.unpack_from(buf, pos + 1)[0]
+            count, pos = read_uint(buf, pos + 5)
+            stack.append([count, tag == 0x49, True])
+            continue
+        if tag in STRING_TAGS:
+            length, value_end = read_uint(buf, pos + 1)
+            value_end += length
+        elif tag in INT_TAGS:
+            value_end = pos + 2 + buf[pos + 1]
+        else:
+            raise ValueError(f"Unknown .laf type {tag:#04x} at byte {pos}")
+        yield len(stack) - 1, key, tag, pos, value_end
+        pos = value_end
+    if pos != end:
+        raise ValueError(f".laf record ends at byte {pos}, expected {end}")
+
+
+def walk(record, path=()):
+    """
+    Depth first over every value under record, without decoding any of them
+
+    Args:
+        record (Record): where to start, usually the root
+        path (tuple): path of record, prefixed to the yielded paths
+
+    Yields:
+        tuple[tuple, Value]: path as keys and array indices, and the value, records before their entries
+    """
+    stack = [(path, enumerate(record.items()))]  # A stack rather than recursion, no generator per level
+    while stack:
+        path, items = stack[-1]
+        for index, (key, value) in items:
+            value_path = path + ((index if key is None else key),)
+            yield value_path, value
+            if isinstance(value, Record):
+                stack.append((value_path, enumerate(value.items())))
+                break
+        else:
+            stack.pop()
+
+
+def to_python(value):
+    """
+    Returns:
+        dict, list or scalar: value decoded fully, objects as dicts with their typename under "typename"
+    """
+    if not isinstance(value, Record):
+        return value.value
+    if not value.keyed:
+        return [to_python(v) for v in value.values()]
+    result = {key: v.value for key, v in value.header()}
+    result.update((key, to_python(v)) for key, v in value.items())
+    return result
@@ -0,0 +1,331 @@
+'''
+Persistent index of a library of CSP auto action sets (.laf), to find every action that uses a layer name,
+action item kind or palette color, and to rename a template layer across the whole library at once.
+Files are only scanned again when their mtime or size changes. Scans and rewrites run in worker processes.
+
+Usage:
+    python -m other_stuff.laf_index update ~/csp_actions //server/shared/actions
+    python -m other_stuff.laf_index find --layer LN_main
+    python -m other_stuff.laf_index layers
+    python -m other_stuff.laf_index rename LN_main LN_ink --dry-run
+
+Index:
+    {"version": 1, "roots": [folders],
+     "files": {path: {"mtime": ns, "size": bytes, "actions": [[start, end, name]],
+                      "kinds": {kind: [offsets]}, "layers": {name: [offsets]}, "colors": {"r,g,b": [offsets]}}}}
+
+    Offsets are of the value's type byte in the file, see other_stuff/laf.py.
+'''
+
+import argparse
+import bisect
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from other_stuff import laf
+
+INDEX = "laf_index.json"
+VERSION = 1
+TERMS = ("kinds", "layers", "colors")
+
+
+def index_file(path):
+    """
+    Scans one .laf without decoding more than the indexed values
+
+    Args:
+        path (str): .laf file
+
+    Returns:
+        dict: file entry of the index, with "error" instead of terms if the file can't be read
+    """
+    stat = os.stat(path)
+    entry = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "actions": [],
+             "kinds": {}, "layers": {}, "colors": {}}
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        buf = memoryview(data)
+        color = None  # [depth of its entries, offset, {"red", "green", "blue"}] while inside a palettecolor
+
+        def add_color():
+            rgb = color[2]
+            entry["colors"].setdefault(f"{rgb.get('red', 0)},{rgb.get('green', 0)},{rgb.get('blue', 0)}",
+                                       []).append(color[1])
+
+        for depth, key, tag, offset, end in laf.scan(buf):
+            if color is not None and depth < color[0]:
+                add_color()
+                color = None
+            if key is None:
+                if depth == 1 and tag == 0x49:  # An action, in the root's actionArray
+                    entry["actions"].append([offset, end, ""])
+                continue
+            if key == b"actionItemKind":
+                entry["kinds"].setdefault(laf.Value(tag, buf, offset, end).value, []).append(offset)
+            elif key == b"layername":
+                entry["layers"].setdefault(laf.Value(tag, buf, offset, end).value, []).append(offset)
+            elif key == b"palettecolor":
+                color = [depth + 1, offset, {}]
+            elif color is not None and depth == color[0] and tag in laf.INT_TAGS:
+                color[2][str(key, "utf-8")] = laf.Value(tag, buf, offset, end).value
+            elif key == b"actionName" and depth == 2 and entry["actions"]:
+                entry["actions"][-1][2] = laf.Value(tag, buf, offset, end).value
+        if color is not None:
+            add_color()
+        buf.release()
+    except (ValueError, IndexError) as e:
+        return {"mtime": stat.st_mtime_ns, "size": stat.st_size, "error": f"{type(e).__name__}: {e}"}
+    return entry
+
+
+def rename_file(path, old, new, offsets=None):
+    """
+    Rewrites layername parameters equal to old in place, only the records holding them are touched.
+    The file is replaced in one move once written
+
+    Args:
+        path (str): .laf file
+        old (str): layer name to replace
+        new (str): new layer name
+        offsets (list[int]): offsets of old from the index, found with a scan if None
+
+    Returns:
+        tuple[int, dict]: names replaced, and the file's new index entry
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    buf = memoryview(data)
+    if offsets is None:
+        offsets = [offset for _, key, tag, offset, end in laf.scan(buf)
+                   if key == b"layername" and laf.Value(tag, buf, offset, end).value == old]
+    for offset in offsets:
+        if laf.read_value(buf, offset)[0].value != old:
+            raise ValueError(f"{path} changed since it was indexed, no {old!r} at byte {offset}")
+    if offsets:
+        value = laf.Value.new(new, "string")
+        temp = f"{path}.{os.getpid()}.tmp"
+        with open(temp, "wb") as f:
+            for chunk in laf.splice(buf, {offset: value for offset in offsets}):
+                f.write(chunk)
+        os.replace(temp, path)
+    buf.release()
+    return len(offsets), index_file(path)
+
+
+def find_files(roots):
+    """
+    Args:
+        roots (list[str]): folders to search, or .laf files
+
+    Returns:
+        list[str]: absolute paths of every .laf under roots, sorted
+    """
+    paths = set()
+    for root in roots:
+        if os.path.isfile(root):
+            paths.add(os.path.abspath(root))
+            continue
+        paths.update(os.path.abspath(path) for path in glob.glob(os.path.join(root, "**", "*.laf"), recursive=True))
+    return sorted(paths)
+
+
+def run_parallel(func, args, workers):
+    """
+    Args:
+        func (callable): module level function, so worker processes can import it
+        args (list[tuple]): arguments of each call
+        workers (int): processes, 1 runs in this process
+
+    Returns:
+        list: results in the order of args
+    """
+    workers = min(workers or os.cpu_count() or 1, len(args))
+    if workers <= 1:
+        return [func(*a) for a in args]
+    with multiprocessing.get_context("spawn").Pool(workers) as pool:
+        return pool.starmap(func, args, chunksize=max(1, len(args) // (workers * 4)))
+
+
+class LafIndex(object):
+    """
+    The index file and the queries over it
+
+    Example:
+        Find every action that sets LN_main as the current layer ::
+
+            index = LafIndex("laf_index.json")
+            index.update(["~/csp_actions"])
+            for hit in index.find(layer="LN_main"):
+                print(hit["path"], hit["action"], hit["offset"])
+            index.save()
+    """
+    def __init__(self, path=INDEX):
+        """
+        Args:
+            path (str): index JSON, loaded if it exists
+        """
+        self.path = path
+        self.roots = []
+        self.files = {}
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                data = json.load(f)
+            if data.get("version") == VERSION:
+                self.roots = data["roots"]
+                self.files = data["files"]
+
+    def save(self):
+        temp = f"{self.path}.tmp"
+        with open(temp, "w") as f:
+            json.dump({"version": VERSION, "roots": self.roots, "files": self.files}, f)
+        os.replace(temp, self.path)
+
+    def update(self, roots=None, workers=None):
+        """
+        Scans new and changed files, and drops ones that are gone
+
+        Args:
+            roots (list[str]): folders or files to add to the index's roots
+            workers (int): processes, defaults to the core count
+
+        Returns:
+            dict: {"scanned", "unchanged", "removed", "errors"} counts
+        """
+        for root in roots or []:
+            root = os.path.abspath(os.path.expanduser(root))
+            if root not in self.roots:
+                self.roots.append(root)
+        paths = find_files(self.roots)
+        stale = []
+        for path in paths:
+            old = self.files.get(path)
+            stat = os.stat(path)
+            if old is None or old["mtime"] != stat.st_mtime_ns or old["size"] != stat.st_size:
+                stale.append(path)
+        for path, entry in zip(stale, run_parallel(index_file, [(path,) for path in stale], workers)):
+            self.files[path] = entry
+
+        removed = set(self.files) - set(paths)
+        for path in removed:
+            del self.files[path]
+        return {"scanned": len(stale), "unchanged": len(paths) - len(stale), "removed": len(removed),
+                "errors": sum("error" in entry for entry in self.files.values())}
+
+    def find(self, kind=None, layer=None, color=None):
+        """
+        Args:
+            kind (str): actionItemKind, "layeractionchangename"
+            layer (str): layername, "LN_main"
+            color (str): palettecolor as "red,green,blue"
+
+        Returns:
+            list[dict]: {"path", "term", "value", "offset", "action"} per hit, the action the offset is in
+        """
+        queries = [(term, value) for term, value in zip(TERMS, (kind, layer, color)) if value is not None]
+        hits = []
+        for path, entry in sorted(self.files.items()):
+            starts = [action[0] for action in entry.get("actions", [])]
+            for term, value in queries:
+                for offset in entry.get(term, {}).get(value, []):
+                    index = bisect.bisect_right(starts, offset) - 1
+                    action = entry["actions"][index][2] if index >= 0 and offset < entry["actions"][index][1] else None
+                    hits.append({"path": path, "term": term, "value": value, "offset": offset, "action": action})
+        return hits
+
+    def counts(self, term="layers"):
+        """
+        Args:
+            term (str): "kinds", "layers" or "colors"
+
+        Returns:
+            dict: value -> [uses, files], for auditing what a library relies on
+        """
+        counts = {}
+        for entry in self.files.values():
+            for value, offsets in entry.get(term, {}).items():
+                count = counts.setdefault(value, [0, 0])
+                count[0] += len(offsets)
+                count[1] += 1
+        return counts
+
+    def rename_layer(self, old, new, workers=None, dry_run=False):
+        """
+        Renames a layer in every indexed file that uses it, and updates their entries
+
+        Args:
+            old (str): layer name to replace
+            new (str): new layer name
+            workers (int): processes, defaults to the core count
+            dry_run (bool): only report what would change
+
+        Returns:
+            dict: path -> names replaced
+        """
+        self.update(workers=workers)  # Offsets must match the files being rewritten
+        paths = [path for path, entry in sorted(self.files.items()) if old in entry.get("layers", {})]
+        if dry_run:
+            return {path: len(self.files[path]["layers"][old]) for path in paths}
+        changed = {}
+        args = [(path, old, new, self.files[path]["layers"][old]) for path in paths]
+        for path, (count, entry) in zip(paths, run_parallel(rename_file, args, workers)):
+            changed[path] = count
+            self.files[path] = entry
+        return changed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index, search and rename layers across CSP .laf action sets")
+    parser.add_argument("--index", default=INDEX, help=f"index JSON, defaults to {INDEX}")
+    parser.add_argument("--workers", type=int, default=None, help="processes, defaults to the core count")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    update = commands.add_parser("update", help="scan new and changed files")
+    update.add_argument("roots", nargs="*", help="folders or .laf files to add, the index remembers them")
+    find = commands.add_parser("find", help="list actions using a kind, layer or color")
+    find.add_argument("--kind", help="actionItemKind, e.g. layeractionchangename")
+    find.add_argument("--layer", help="layername, e.g. LN_main")
+    find.add_argument("--color", help="palettecolor as red,green,blue")
+    counts = commands.add_parser("layers", help="every layer name with its uses and files")
+    counts.add_argument("--term", choices=TERMS, default="layers")
+    rename = commands.add_parser("rename", help="rename a layer in every file that uses it")
+    rename.add_argument("old")
+    rename.add_argument("new")
+    rename.add_argument("--dry-run", action="store_true", help="only list what would change")
+    args = parser.parse_args(argv)
+
+    index = LafIndex(args.index)
+    start = time.perf_counter()
+    if args.command == "update":
+        stats = index.update(args.roots, workers=args.workers)
+        print(f"{stats['scanned']} scanned, {stats['unchanged']} unchanged, {stats['removed']} removed, "
+              f"{stats['errors']} unreadable in {time.perf_counter() - start:.2f}s")
+        for path, entry in sorted(index.files.items()):
+            if "error" in entry:
+                print(f"  {path}: {entry['error']}")
+    elif args.command == "find":
+        if args.kind is None and args.layer is None and args.color is None:
+            parser.error("find needs --kind, --layer or --color")
+        hits = index.find(args.kind, args.layer, args.color)
+        for hit in hits:
+            print(f"{hit['path']}:{hit['offset']}  {hit['action'] or '-'}  {hit['term']}={hit['value']}")
+        print(f"{len(hits)} hits in {len({hit['path'] for hit in hits})} files")
+    elif args.command == "layers":
+        for value, (uses, files) in sorted(index.counts(args.term).items(), key=lambda item: -item[1][0]):
+            print(f"{uses:>7} uses {files:>5} files  {value}")
+    elif args.command == "rename":
+        changed = index.rename_layer(args.old, args.new, workers=args.workers, dry_run=args.dry_run)
+        for path, count in changed.items():
+            print(f"{path}: {count} {'to rename' if args.dry_run else 'renamed'}")
+        print(f"{sum(changed.values())} in {len(changed)} files{' (dry run)' if args.dry_run else ''} "
+              f"in {time.perf_counter() - start:.2f}s")
+    index.save()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
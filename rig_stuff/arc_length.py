@@ -0,0 +1,239 @@
+'''
+Arc length lookup tables for NURBS curves, to place joints, clusters and ribbon pins at equal distances
+along a curve instead of equal parameter steps, which bunch up on uneven curves
+'''
+
+import numpy as np
+
+from rig_stuff import nurbs_eval
+
+GAUSS_X, GAUSS_W = np.polynomial.legendre.leggauss(5)
+
+
+def segment_lengths(data, start, end):
+    """
+    Gauss-Legendre arc length of many parameter intervals in one curve evaluation
+
+    Args:
+        data (dict): curve data from nurbs_eval.get_curve_data
+        start (numpy.ndarray): (N,) interval start parameters
+        end (numpy.ndarray): (N,) interval end parameters
+
+    Returns:
+        numpy.ndarray: (N,) lengths
+    """
+    half = (end - start) / 2.0
+    params = ((start + end) / 2.0)[:, None] + half[:, None] * GAUSS_X[None, :]
+    speed = np.linalg.norm(nurbs_eval.eval_curve(data, params.ravel(), 1)[1], axis=1).reshape(params.shape)
+    return half * (speed @ GAUSS_W)
+
+
+def build_table(data, tolerance=1e-7, max_depth=16):
+    """
+    Splits every knot span in half until the two halves agree with the whole, all open intervals at once
+
+    Args:
+        data (dict): curve data from nurbs_eval.get_curve_data
+        tolerance (float): largest accepted difference per interval, relative to the curve's length
+        max_depth (int): most times an interval is halved
+
+    Returns:
+        dict: {"params": (M,) increasing parameters, "lengths": (M,) arc length from the start at each}
+    """
+    degree, knots = data["degree"], data["knots"]
+    edges = np.unique(knots[degree:len(knots) - degree])
+    start, end = edges[:-1], edges[1:]
+    whole = segment_lengths(data, start, end)
+    tolerance *= max(whole.sum(), 1e-12)
+
+    done = []
+    for depth in range(max_depth):
+        mid = (start + end) / 2.0
+        left = segment_lengths(data, start, mid)
+        right = segment_lengths(data, mid, end)
+        ok = np.abs(left + right - whole) <= tolerance
+        done += [(start[ok], mid[ok], left[ok]), (mid[ok], end[ok], right[ok])]
+        if ok.all():
+            break
+        bad = ~ok
+        start, end, whole = (np.concatenate([start[bad], mid[bad]]), np.concatenate([mid[bad], end[bad]]),
+                             np.concatenate([left[bad], right[bad]]))
+    else:
+        done.append((start, end, whole))
+
+    starts = np.concatenate([d[0] for d in done])
+    ends = np.concatenate([d[1] for d in done])
+    lengths = np.concatenate([d[2] for d in done])
+    order = np.argsort(starts)
+    return {"params": np.concatenate([starts[order][:1], ends[order]]),
+            "lengths": np.concatenate([[0.0], np.cumsum(lengths[order])])}
+
+
+def params_at_lengths(data, table, targets, newton=2):
+    """
+    Inverts the table by binary search, then polishes each parameter with Newton steps
+
+    Args:
+        data (dict): curve data from nurbs_eval.get_curve_data
+        table (dict): from build_table
+        targets (list[float]): (N,) arc lengths from the start of the curve
+        newton (int): Newton steps per parameter
+
+    Returns:
+        numpy.ndarray: (N,) curve parameters
+    """
+    params, lengths = table["params"], table["lengths"]
+    targets = np.clip(np.asarray(targets, dtype=np.float64), 0.0, lengths[-1])
+    i = np.clip(np.searchsorted(lengths, targets, side="right") - 1, 0, len(lengths) - 2)
+    span = lengths[i + 1] - lengths[i]
+    frac = np.divide(targets - lengths[i], span, out=np.zeros_like(targets), where=span > 0)
+    t = params[i] + frac * (params[i + 1] - params[i])
+    for step in range(newton):
+        error = lengths[i] + segment_lengths(data, params[i], t) - targets
+        speed = np.linalg.norm(nurbs_eval.eval_curve(data, t, 1)[1], axis=1)
+        t = np.clip(t - np.divide(error, speed, out=np.zeros_like(t), where=speed > 0), params[i], params[i + 1])
+    return t
+
+
+class ArcLengthCache(object):
+    """
+    Curve data and arc length table per curve, built once and reused until the curve is flagged dirty.
+    Tables remember the node they were built from, a new curve under an old name is read again.
+    add_callbacks flags a curve dirty whenever it or its history changes, drops it when it's deleted,
+    and drops every table on scene new, open and import.
+
+    Example:
+        Parameters for 10 equidistant joints ::
+
+            params = ArcLengthCache().equidistant_params("C_Spine_curveShape", 10)
+    """
+    def __init__(self, tolerance=1e-7):
+        self.tolerance = tolerance
+        self.tables = {}  # curve -> (MObjectHandle, curve data, table)
+        self.callback_ids = {}  # curve -> (MObjectHandle, [callback ids])
+        self.scene_callback_ids = []
+
+    def get(self, curve):
+        """
+        Args:
+            curve (str): curve shape or transform
+
+        Returns:
+            tuple: (curve data, arc length table)
+        """
+        handle = _node_handle(curve)
+        entry = self.tables.get(curve)
+        if entry is None or not _same_node(entry[0], handle):
+            data = nurbs_eval.get_curve_data(curve)
+            entry = self.tables[curve] = (handle, data, build_table(data, self.tolerance))
+        return entry[1], entry[2]
+
+    def length(self, curve):
+        return self.get(curve)[1]["lengths"][-1]
+
+    def equidistant_params(self, curve, count, closed=False):
+        """
+        Args:
+            curve (str): curve shape or transform
+            count (int): number of points
+            closed (bool): if True, the last point stops one step before the end, for curves that loop back
+
+        Returns:
+            numpy.ndarray: (count,) curve parameters, use with turnOnPercentage off
+        """
+        data, table = self.get(curve)
+        steps = count if closed else max(count - 1, 1)
+        targets = np.arange(count) * (table["lengths"][-1] / steps)
+        return params_at_lengths(data, table, targets)
+
+    def mark_dirty(self, curve=None):
+        """
+        Args:
+            curve (str): curve whose shape changed, or None to drop every table
+        """
+        if curve is None:
+            self.tables.clear()
+        else:
+            self.tables.pop(curve, None)
+
+    def add_callbacks(self, curve):
+        """
+        Flags the curve dirty when it's dirtied, by its own attributes (CVs included) or anything upstream of it,
+        and forgets it when it's deleted
+        """
+        import maya.api.OpenMaya as om
+
+        handle = _node_handle(curve)
+        watched = self.callback_ids.get(curve)
+        if watched is not None and _same_node(watched[0], handle):
+            return
+        self.forget(curve)
+        if not self.scene_callback_ids:
+            for event in ("SceneOpened", "NewSceneOpened"):
+                self.scene_callback_ids.append(om.MEventMessage.addEventCallback(event, lambda *args: self.reset()))
+            self.scene_callback_ids.append(om.MEventMessage.addEventCallback(
+                "SceneImported", lambda *args: self.mark_dirty()))
+
+        node = handle.object()
+        self.callback_ids[curve] = (handle, [
+            om.MNodeMessage.addNodeDirtyCallback(node, lambda *args: self.mark_dirty(curve)),
+            om.MNodeMessage.addNodeAboutToDeleteCallback(node, lambda *args: self.forget(curve))])
+
+    def forget(self, curve):
+        """
+        Drops the curve's table and its callbacks
+        """
+        import maya.api.OpenMaya as om
+
+        self.tables.pop(curve, None)
+        watched = self.callback_ids.pop(curve, None)
+        if watched is not None:
+            om.MMessage.removeCallbacks(watched[1])
+
+    def reset(self):
+        """
+        Drops every table and curve callback, the scene they came from is gone
+        """
+        for curve in list(self.callback_ids):
+            self.forget(curve)
+        self.tables.clear()
+
+    def remove_callbacks(self):
+        import maya.api.OpenMaya as om
+
+        self.reset()
+        if self.scene_callback_ids:
+            om.MMessage.removeCallbacks(self.scene_callback_ids)
+        self.scene_callback_ids = []
+
+
+def _node_handle(curve):
+    import maya.api.OpenMaya as om
+
+    return om.MObjectHandle(nurbs_eval.get_shape_path(curve).node())
+
+
+def _same_node(handle, current):
+    # A deleted node's handle goes invalid, a new node under the same name has another hash
+    return handle.isValid() and handle.hashCode() == current.hashCode()
+
+
+_cache = ArcLengthCache()
+
+
+def equidistant_params(curve, count, closed=False, watch=True):
+    """
+    Shared cache version of ArcLengthCache.equidistant_params
+
+    Args:
+        curve (str): curve shape or transform
+        count (int): number of points
+        closed (bool): if True, the last point stops one step before the end, for curves that loop back
+        watch (bool): if True, the table is rebuilt after the curve changes
+
+    Returns:
+        numpy.ndarray: (count,) curve parameters, use with turnOnPercentage off
+    """
+    if watch:
+        _cache.add_callbacks(curve)
+    return _cache.equidistant_params(curve, count, closed)
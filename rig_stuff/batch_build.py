@@ -0,0 +1,277 @@
+'''
+Runs the rig builds of many assets in parallel, one headless worker process per job so every asset gets a
+clean scene and a crash or hang only costs that job. Writes a JSON log with the result and timings of every try.
+
+Usage:
+    mayapy -m rig_stuff.batch_build nightly.json --workers 8 --log nightly_results.json
+    python -m rig_stuff.batch_build nightly.json --backend fake
+
+Manifest:
+    {"defaults": {"timeout": 600, "retries": 1},
+     "jobs": [{"asset": "hero", "scene": "hero_base.ma", "output": "hero_rig.ma",
+               "builds": [{"builder": "eyes", "spec": {"spans": 20}},
+                          {"builder": "combiners", "spec": "hero_spine.json"}]}]}
+
+    builder is a name from BUILDERS or the dotted path of any function that takes a spec.
+    A manifest can also be just the list of jobs.
+'''
+
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from collections import deque
+from multiprocessing.connection import wait
+
+BUILDERS = {
+    "eyes": "rig_stuff.re_build_eye.build_eyes",
+    "lips": "rig_stuff.re_build_mouth.build_mouth",
+    "combiners": "rig_stuff.re_jnt_nurb_combiners.build",  # Collar collision and rail spines
+}
+DEFAULTS = {"timeout": 600.0, "retries": 1}
+
+
+def load_manifest(manifest):
+    """
+    Args:
+        manifest (dict, list or str): manifest, list of jobs, or path to either as JSON
+
+    Returns:
+        list[dict]: jobs with defaults filled in, each with an "index" in manifest order
+    """
+    if isinstance(manifest, str):
+        with open(manifest, "r") as f:
+            manifest = json.load(f)
+    if isinstance(manifest, list):
+        manifest = {"jobs": manifest}
+    defaults = dict(DEFAULTS)
+    defaults.update(manifest.get("defaults", {}))
+
+    jobs = []
+    for index, job in enumerate(manifest["jobs"]):
+        filled = dict(defaults)
+        filled.update(job)
+        filled["index"] = index
+        filled.setdefault("asset", f"job_{index}")
+        jobs.append(filled)
+    return jobs
+
+
+def get_builder(builder):
+    """
+    Args:
+        builder (str): name from BUILDERS, or dotted path of a function
+
+    Returns:
+        callable: the build function
+    """
+    module, _, func = BUILDERS.get(builder, builder).rpartition(".")
+    if not module:
+        raise ValueError(f"Unknown builder {builder!r}. Use one of {sorted(BUILDERS)} or a dotted function path")
+    return getattr(importlib.import_module(module), func)
+
+
+def start_backend(backend):
+    """
+    Args:
+        backend (str): "maya" for maya.standalone, "fake" for bench_stuff.fake_maya
+
+    Returns:
+        FakeCmds or None: the fake cmds, to count scene calls with
+    """
+    if backend == "fake":
+        from bench_stuff import fake_maya
+
+        return fake_maya.install()
+    if backend == "maya":
+        import maya.standalone
+
+        maya.standalone.initialize(name="python")
+        return None
+    raise ValueError('Invalid backend. Enter either \"maya\" or \"fake\"')
+
+
+def run_job(job, backend):
+    """
+    Builds one asset in this process
+
+    Args:
+        job (dict): job from load_manifest
+        backend (str): see start_backend
+
+    Returns:
+        list[dict]: {"builder", "seconds"} per build, with "calls" on the fake backend
+    """
+    fake = start_backend(backend)
+    if backend == "maya":
+        import maya.cmds as cmds
+
+        if job.get("scene"):
+            cmds.file(job["scene"], open=True, force=True)
+        else:
+            cmds.file(new=True, force=True)
+
+    builds = []
+    for build in job.get("builds", []):
+        func = get_builder(build["builder"])
+        if fake is not None:
+            fake.reset_calls()
+        start = time.perf_counter()
+        func(build.get("spec"))
+        result = {"builder": build["builder"], "seconds": time.perf_counter() - start}
+        if fake is not None:
+            result["calls"] = fake.call_count()
+        builds.append(result)
+
+    if backend == "maya" and job.get("output"):
+        cmds.file(rename=job["output"])
+        cmds.file(save=True, force=True, type="mayaAscii" if job["output"].endswith(".ma") else "mayaBinary")
+    return builds
+
+
+def worker(job, backend, conn):
+    """
+    Process entry point, sends {"status", "builds", "error"} back through conn
+    """
+    try:
+        conn.send({"status": "ok", "builds": run_job(job, backend), "error": None})
+    except BaseException:
+        conn.send({"status": "failed", "builds": [], "error": traceback.format_exc()})
+    finally:
+        conn.close()
+
+
+class BatchRunner(object):
+    """
+    Schedules jobs over a fixed number of worker processes, killing tries that run past their timeout and
+    queueing failed tries again until their retries run out. Results keep manifest order.
+
+    Example:
+        Run a manifest on the fake backend ::
+
+            results = BatchRunner(load_manifest("nightly.json"), workers=4, backend="fake").run()
+    """
+    def __init__(self, jobs, workers=None, backend="maya", poll=0.05):
+        """
+        Args:
+            jobs (list[dict]): from load_manifest
+            workers (int): processes at once, defaults to the core count
+            backend (str): see start_backend
+            poll (float): seconds between timeout checks
+        """
+        self.jobs = jobs
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.backend = backend
+        self.poll = poll
+        self.context = multiprocessing.get_context("spawn")  # No forking a parent that may hold Maya state
+
+    def start(self, job):
+        recv, send = self.context.Pipe(duplex=False)
+        process = self.context.Process(target=worker, args=(job, self.backend, send), name=job["asset"],
+                                       daemon=True)
+        process.start()
+        send.close()  # Only the child writes, so a dead child reads as EOF
+        return {"job": job, "process": process, "conn": recv, "start": time.perf_counter()}
+
+    def finish(self, task):
+        """
+        Args:
+            task (dict): running task from start
+
+        Returns:
+            dict or None: the try's result, None while it is still running
+        """
+        elapsed = time.perf_counter() - task["start"]
+        result = None
+        if task["conn"].poll():
+            try:
+                result = task["conn"].recv()
+            except EOFError:  # Died before sending anything
+                task["process"].join()
+                result = {"status": "crashed", "builds": [],
+                          "error": f"Worker exited with code {task['process'].exitcode}"}
+        elif elapsed > task["job"]["timeout"]:
+            task["process"].terminate()
+            result = {"status": "timeout", "builds": [], "error": f"Killed after {task['job']['timeout']}s"}
+        if result is None:
+            return None
+
+        task["process"].join(5)
+        if task["process"].is_alive():
+            task["process"].kill()
+        task["conn"].close()
+        result["seconds"] = elapsed
+        return result
+
+    def run(self):
+        """
+        Returns:
+            list[dict]: per job {"asset", "status", "seconds", "attempts": [try results]}, in manifest order
+        """
+        results = [{"asset": job["asset"], "status": None, "seconds": 0.0, "attempts": []} for job in self.jobs]
+        pending = deque(self.jobs)
+        running = []
+        while pending or running:
+            while pending and len(running) < self.workers:
+                running.append(self.start(pending.popleft()))
+
+            wait([task["conn"] for task in running], timeout=self.poll)
+            for task in list(running):
+                attempt = self.finish(task)
+                if attempt is None:
+                    continue
+                running.remove(task)
+                job = task["job"]
+                result = results[job["index"]]
+                attempt["attempt"] = len(result["attempts"]) + 1
+                result["attempts"].append(attempt)
+                result["status"] = attempt["status"]
+                result["seconds"] += attempt["seconds"]
+                if attempt["status"] != "ok" and attempt["attempt"] <= job["retries"]:
+                    pending.append(job)  # Back of the queue, so one bad asset can't hog a worker
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build many rigs in parallel headless workers")
+    parser.add_argument("manifest", help="JSON manifest of jobs")
+    parser.add_argument("--workers", type=int, default=None, help="processes at once, defaults to the core count")
+    parser.add_argument("--backend", choices=("maya", "fake"), default="maya",
+                        help="maya.standalone, or the pure-Python fake cmds to test scheduling")
+    parser.add_argument("--timeout", type=float, default=None, help="seconds per try, overrides the manifest")
+    parser.add_argument("--retries", type=int, default=None, help="extra tries per job, overrides the manifest")
+    parser.add_argument("--log", default=None, help="JSON result log, defaults to <manifest>_results.json")
+    args = parser.parse_args(argv)
+
+    jobs = load_manifest(args.manifest)
+    for job in jobs:
+        if args.timeout is not None:
+            job["timeout"] = args.timeout
+        if args.retries is not None:
+            job["retries"] = args.retries
+
+    runner = BatchRunner(jobs, workers=args.workers, backend=args.backend)
+    started = time.strftime("%Y-%m-%dT%H:%M:%S")
+    start = time.perf_counter()
+    results = runner.run()
+    log = {"manifest": os.path.abspath(args.manifest), "backend": args.backend, "workers": runner.workers,
+           "seconds": time.perf_counter() - start, "started": started,
+           "ok": sum(r["status"] == "ok" for r in results), "failed": sum(r["status"] != "ok" for r in results),
+           "jobs": results}
+
+    log_path = args.log or os.path.splitext(args.manifest)[0] + "_results.json"
+    with open(log_path, "w") as f:
+        json.dump(log, f, indent=2)
+    for result in results:
+        print(f"{result['asset']:<24} {result['status']:<8} {result['seconds']:8.2f}s  "
+              f"{len(result['attempts'])} tr{'y' if len(result['attempts']) == 1 else 'ies'}")
+    print(f"{log['ok']} ok, {log['failed']} failed in {log['seconds']:.2f}s with {runner.workers} workers -> {log_path}")
+    return 1 if log["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
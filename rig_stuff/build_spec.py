@@ -0,0 +1,23 @@
+'''
+Loads the data specs that drive the rig builds, so names and spans live in data instead of at import
+'''
+
+import copy
+import json
+
+
+def load_spec(spec=None, default=None):
+    """
+    Args:
+        spec (dict or str): spec dict, path to a JSON file, or None for the default
+        default (dict): spec used when spec is None, keys missing from spec are filled in from it
+
+    Returns:
+        dict: the spec, safe to modify
+    """
+    if isinstance(spec, str):
+        with open(spec, "r") as f:
+            spec = json.load(f)
+    merged = copy.deepcopy(default or {})
+    merged.update(copy.deepcopy(spec or {}))
+    return merged
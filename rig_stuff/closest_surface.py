@@ -0,0 +1,202 @@
+'''
+Closest point on a NURBS surface for many points at once, from the surface's CV and knot data.
+Stands in for a closestPointOnSurface per point where the result only has to be solved once, like the
+uvPin coordinates of a ribbon's joints.
+'''
+
+import numpy as np
+
+from rig_stuff import nurbs_eval
+from rig_stuff.graph_batch import GraphBatch
+from rig_stuff.hierarchy import read_world_matrices
+from rig_stuff.lazy_cmds import cmds
+
+
+def param_ranges(data):
+    """
+    Args:
+        data (dict): from nurbs_eval.get_surface_data
+
+    Returns:
+        tuple: ((u min, u max), (v min, v max)) the surface is defined over
+    """
+    ranges = []
+    for side in ("u", "v"):
+        knots, degree = data[f"knots_{side}"], data[f"degree_{side}"]
+        ranges.append((float(knots[degree]), float(knots[-degree - 1])))
+    return tuple(ranges)
+
+
+def surface_to_world(data, matrix):
+    """
+    Args:
+        data (dict): from nurbs_eval.get_surface_data, CVs in object space
+        matrix (list[float]): 16 floats, the surface's world matrix
+
+    Returns:
+        dict: the same data with world space CVs
+    """
+    world = dict(data)
+    # Homogeneous CVs transform as they are, [x*w, y*w, z*w, w] @ M is w times the moved point
+    world["cvs"] = data["cvs"] @ np.asarray(matrix, dtype=np.float64).reshape(4, 4)
+    return world
+
+
+def get_world_surface_data(surface):
+    """
+    Args:
+        surface (str): surface shape or transform
+
+    Returns:
+        dict: nurbs_eval.get_surface_data in world space, what closestPointOnSurface sees through worldSpace[0]
+    """
+    data = nurbs_eval.get_surface_data(surface)
+    return surface_to_world(data, list(nurbs_eval.get_shape_path(surface).inclusiveMatrix()))
+
+
+def seed_params(data, points, samples=4):
+    """
+    Nearest of a grid of samples, a few per knot span, so Newton starts in the right basin
+
+    Args:
+        data (dict): from nurbs_eval.get_surface_data
+        points (numpy.ndarray): (N, 3)
+        samples (int): samples per knot span in each direction
+
+    Returns:
+        tuple[numpy.ndarray, numpy.ndarray]: (N,) u and v
+    """
+    grids = []
+    for side, (lo, hi) in zip(("u", "v"), param_ranges(data)):
+        spans = max(len(np.unique(data[f"knots_{side}"])) - 1, 1)
+        grids.append(np.linspace(lo, hi, spans * samples + 1))
+    grid_u, grid_v = (grid.ravel() for grid in np.meshgrid(*grids, indexing="ij"))
+    positions = nurbs_eval.eval_surface(data, grid_u, grid_v, derivs=0)["position"]
+
+    nearest = np.empty(len(points), dtype=np.int64)
+    chunk = max(1, 2 ** 22 // len(positions))  # Keeps the distance matrix to a few million floats
+    for start in range(0, len(points), chunk):
+        block = points[start:start + chunk]
+        distances = (np.einsum("ij,ij->i", block, block)[:, None] - 2 * block @ positions.T
+                     + np.einsum("ij,ij->i", positions, positions)[None, :])
+        nearest[start:start + chunk] = distances.argmin(axis=1)
+    return grid_u[nearest], grid_v[nearest]
+
+
+def closest_params(data, points, iterations=12, samples=4, tolerance=1e-10):
+    """
+    Newton on the squared distance, for every point together. Points whose step gets under the tolerance drop out,
+    steps that would leave the surface slide along its edge instead
+
+    Args:
+        data (dict): from nurbs_eval.get_surface_data, in the same space as points
+        points (list[list[float]]): (N, 3)
+        iterations (int): Newton steps at most
+        samples (int): seed samples per knot span, see seed_params
+        tolerance (float): parameter step counted as converged
+
+    Returns:
+        dict: {"u", "v", "position", "distance"} (N,) each, position (N, 3)
+
+    Example:
+        Parameters of a few world positions on a ribbon ::
+
+            data = get_world_surface_data("spine_ribbon")
+            hit = closest_params(data, [[0, 10, 0], [0, 12, 1]])
+            print(hit["u"], hit["v"], hit["distance"])
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    (u_lo, u_hi), (v_lo, v_hi) = param_ranges(data)
+    u, v = seed_params(data, points, samples)
+    active = np.arange(len(points))
+
+    for _ in range(iterations):
+        if not len(active):
+            break
+        e = nurbs_eval.eval_surface(data, u[active], v[active], derivs=2)
+        r = e["position"] - points[active]
+        su, sv = e["du"], e["dv"]
+        gu, gv = np.einsum("ij,ij->i", r, su), np.einsum("ij,ij->i", r, sv)
+        guu, guv, gvv = (np.einsum("ij,ij->i", a, b) for a, b in ((su, su), (su, sv), (sv, sv)))
+        huu = guu + np.einsum("ij,ij->i", r, e["duu"])
+        huv = guv + np.einsum("ij,ij->i", r, e["duv"])
+        hvv = gvv + np.einsum("ij,ij->i", r, e["dvv"])
+
+        # Far from a tight curve the full Hessian can stop being positive definite, Gauss-Newton still heads downhill
+        det = huu * hvv - huv * huv
+        flat = (det <= 1e-12 * (guu * gvv + 1e-30)) | (huu <= 0)
+        huu, huv, hvv = np.where(flat, guu, huu), np.where(flat, guv, huv), np.where(flat, gvv, hvv)
+        det = huu * hvv - huv * huv
+        ok = det > 0
+        step_u = np.divide(huv * gv - hvv * gu, det, out=np.zeros_like(det), where=ok)
+        step_v = np.divide(huv * gu - huu * gv, det, out=np.zeros_like(det), where=ok)
+
+        # A step out past an edge keeps that parameter on it and redoes the other one on its own
+        cu, cv = u[active], v[active]
+        pinned_u = ((cu <= u_lo) & (step_u < 0)) | ((cu >= u_hi) & (step_u > 0))
+        pinned_v = ((cv <= v_lo) & (step_v < 0)) | ((cv >= v_hi) & (step_v > 0))
+        step_u = np.where(pinned_v, np.divide(-gu, huu, out=np.zeros_like(gu), where=huu > 0), step_u)
+        step_v = np.where(pinned_u, np.divide(-gv, hvv, out=np.zeros_like(gv), where=hvv > 0), step_v)
+        step_u[pinned_u] = 0.0
+        step_v[pinned_v] = 0.0
+
+        new_u = np.clip(cu + step_u, u_lo, u_hi)
+        new_v = np.clip(cv + step_v, v_lo, v_hi)
+        u[active], v[active] = new_u, new_v
+        moving = (np.abs(new_u - cu) > tolerance) | (np.abs(new_v - cv) > tolerance)
+        active = active[moving]
+
+    position = nurbs_eval.eval_surface(data, u, v, derivs=0)["position"]
+    return {"u": u, "v": v, "position": position, "distance": np.linalg.norm(position - points, axis=1)}
+
+
+def solve_pin_coordinates(surface, nodes, **kwargs):
+    """
+    Closest surface parameters of each node's world position, what a closestPointOnSurface fed by the node's
+    worldMatrix through a decomposeMatrix gives at the current pose
+
+    Args:
+        surface (str): surface shape or transform
+        nodes (list[str]): transforms or joints
+        kwargs: passed to closest_params
+
+    Returns:
+        dict: closest_params result
+    """
+    matrices = np.array(read_world_matrices(nodes), dtype=np.float64).reshape(-1, 16)
+    return closest_params(get_world_surface_data(surface), matrices[:, 12:15], **kwargs)
+
+
+def bake_uv_pin(uv_pin, surface, nodes, delete=True, **kwargs):
+    """
+    Swaps the closestPointOnSurface and decomposeMatrix setup_ribbon_base makes per joint for static coordinates
+    solved at the current pose, in one GraphBatch
+
+    Args:
+        uv_pin (str): uvPin whose coordinate[i] follows nodes[i]
+        surface (str): surface driving the uvPin
+        nodes (list[str]): joints, in coordinate order
+        delete (bool): delete each node's f"{node}_closestPointOnSurface" and f"{node}_decomposeMatrix"
+        kwargs: passed to closest_params
+
+    Returns:
+        dict: closest_params result
+
+    Example:
+        Bake a ribbon made with follow_jnts=True ::
+
+            grps, ribbon, crv = setup_ribbon_base(j="spine_01_jnt", name="spine")
+            bake_uv_pin(f"{ribbon}_uvPin", ribbon, get_jnt_heirarchy("spine_01_jnt"))
+    """
+    hit = solve_pin_coordinates(surface, nodes, **kwargs)
+    batch = GraphBatch("bake_uv_pin")
+    if delete:
+        network = [f"{node}_{suffix}" for node in nodes for suffix in ("closestPointOnSurface", "decomposeMatrix")]
+        network = [node for node in network if cmds.objExists(node)]
+        if network:
+            batch.call("delete", *network)
+    for index, (u, v) in enumerate(zip(hit["u"].tolist(), hit["v"].tolist())):
+        batch.set_attr(f"{uv_pin}.coordinate[{index}].coordinateU", u)
+        batch.set_attr(f"{uv_pin}.coordinate[{index}].coordinateV", v)
+    batch.commit()
+    return hit
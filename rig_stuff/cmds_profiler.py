@@ -0,0 +1,225 @@
+'''
+Opt-in profiler for every maya.cmds and mel call made through rig_stuff.lazy_cmds.
+Calls go in a fixed size ring buffer with their argument shape, wall time and call site,
+then come out as a top N report or a Chrome trace (chrome://tracing, ui.perfetto.dev) to view as a flame chart.
+Off, lazy_cmds hands out the plain commands, so it costs nothing per call.
+'''
+
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+from rig_stuff import lazy_cmds
+
+
+def arg_shape(args, kwargs):
+    """
+    Args:
+        args (tuple): positional arguments of a call
+        kwargs (dict): flags of a call
+
+    Returns:
+        str: types and lengths without the values, "str, list[120], q, ws, t"
+    """
+    parts = [f"{type(arg).__name__}[{len(arg)}]" if isinstance(arg, (list, tuple)) else type(arg).__name__
+             for arg in args]
+    return ", ".join(parts + list(kwargs))
+
+
+class CmdsProfiler(object):
+    """
+    Records calls into a ring buffer, so a long build keeps its newest calls at a fixed memory cost
+
+    Example:
+        Profile a build and see the most expensive commands ::
+
+            from rig_stuff import cmds_profiler
+
+            with cmds_profiler.profile() as profiler:
+                build_eyes()
+            print(profiler.report(top=10))
+            profiler.export_chrome_trace("build_eyes_trace.json")
+    """
+    def __init__(self, size=65536):
+        """
+        Args:
+            size (int): calls kept, older ones are overwritten
+        """
+        self.size = size
+        self.records = [None] * size  # (name, args, kwargs, start, seconds, (file, line, function))
+        self.count = 0
+        self.spans = []  # (name, start, seconds)
+        self.origin = time.perf_counter()
+        self._wrapped = {}
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def wrap(self, func, name):
+        """
+        Args:
+            func (callable): command to profile
+            name (str): name to record it under
+
+        Returns:
+            callable: func, recording each call. Made once per command
+        """
+        wrapped = self._wrapped.get(name)
+        if wrapped is None or wrapped.__wrapped__ is not func:
+            def wrapped(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    seconds = time.perf_counter() - start
+                    caller = sys._getframe(1)
+                    self.records[self.count % self.size] = (
+                        name, args, kwargs, start, seconds,
+                        (caller.f_code.co_filename, caller.f_lineno, caller.f_code.co_name))
+                    self.count += 1
+            wrapped.__wrapped__ = func
+            self._wrapped[name] = wrapped
+        return wrapped
+
+    def calls(self):
+        """
+        Returns:
+            list[dict]: recorded calls, oldest first, {"name", "shape", "start", "seconds", "site"}.
+                Shapes are worked out here rather than while recording, to keep recording cheap
+        """
+        if self.count <= self.size:
+            records = self.records[:self.count]
+        else:
+            head = self.count % self.size
+            records = self.records[head:] + self.records[:head]
+        return [{"name": name, "shape": arg_shape(args, kwargs), "start": start - self.origin, "seconds": seconds,
+                 "site": f"{os.path.basename(site[0])}:{site[1]} {site[2]}"}
+                for name, args, kwargs, start, seconds, site in records]
+
+    def top(self, top=20, by="name"):
+        """
+        Args:
+            top (int): rows to keep
+            by (str): "name" to group by command, "site" by call site, "shape" by command and argument shape
+
+        Returns:
+            list[dict]: {"key", "count", "seconds", "mean", "max"}, most total time first
+        """
+        groups = {}
+        for call in self.calls():
+            key = f"{call['name']}({call['shape']})" if by == "shape" else call[by]
+            group = groups.setdefault(key, {"key": key, "count": 0, "seconds": 0.0, "max": 0.0})
+            group["count"] += 1
+            group["seconds"] += call["seconds"]
+            group["max"] = max(group["max"], call["seconds"])
+        for group in groups.values():
+            group["mean"] = group["seconds"] / group["count"]
+        return sorted(groups.values(), key=lambda g: g["seconds"], reverse=True)[:top]
+
+    def report(self, top=20, by="name"):
+        """
+        Returns:
+            str: table of top(), with totals, and how many calls fell out of the buffer
+        """
+        rows = self.top(top, by)
+        total = sum(call["seconds"] for call in self.calls())
+        lines = [f"{'ms':>9} {'%':>5} {'calls':>7} {'mean us':>9} {'max us':>9}  {by}"]
+        for row in rows:
+            lines.append(f"{row['seconds'] * 1e3:9.3f} {100.0 * row['seconds'] / (total or 1.0):5.1f} "
+                         f"{row['count']:>7} {row['mean'] * 1e6:9.1f} {row['max'] * 1e6:9.1f}  {row['key']}")
+        lines.append(f"{total * 1e3:9.3f} ms in {len(self)} calls")
+        if self.count > self.size:
+            lines.append(f"{self.count - self.size} older calls dropped, raise size to keep them")
+        return "\n".join(lines)
+
+    def chrome_trace(self):
+        """
+        Returns:
+            dict: Chrome trace event format, complete events in microseconds, spans wrapping their calls
+        """
+        pid = os.getpid()
+        events = [{"name": name, "cat": "span", "ph": "X", "pid": pid, "tid": 0,
+                   "ts": (start - self.origin) * 1e6, "dur": seconds * 1e6}
+                  for name, start, seconds in self.spans]
+        events += [{"name": call["name"], "cat": "cmds", "ph": "X", "pid": pid, "tid": 0,
+                    "ts": call["start"] * 1e6, "dur": call["seconds"] * 1e6,
+                    "args": {"shape": call["shape"], "site": call["site"]}}
+                   for call in self.calls()]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path):
+        """
+        Args:
+            path (str): JSON file to write
+
+        Returns:
+            str: path
+        """
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+        return path
+
+    def clear(self):
+        self.records = [None] * self.size
+        self.count = 0
+        self.spans = []
+
+
+def enable(size=65536):
+    """
+    Starts recording every command looked up through rig_stuff.lazy_cmds from now on
+
+    Args:
+        size (int): calls kept in the ring buffer
+
+    Returns:
+        CmdsProfiler: the profiler recording
+    """
+    lazy_cmds.profiler = CmdsProfiler(size)
+    lazy_cmds.clear_cache()
+    return lazy_cmds.profiler
+
+
+def disable():
+    """
+    Returns:
+        CmdsProfiler or None: the profiler that was recording
+    """
+    profiler, lazy_cmds.profiler = lazy_cmds.profiler, None
+    return profiler
+
+
+@contextmanager
+def profile(size=65536):
+    """
+    Profiles the block, then turns profiling back off. The profiler keeps its records after the block
+
+    Yields:
+        CmdsProfiler: the profiler recording
+    """
+    previous = lazy_cmds.profiler
+    profiler = enable(size)
+    try:
+        yield profiler
+    finally:
+        lazy_cmds.profiler = previous
+        lazy_cmds.clear_cache()
+
+
+@contextmanager
+def span(name):
+    """
+    Marks a stretch of work, "chain" or "ribbon", as a parent bar over its calls in the trace.
+    Does nothing while profiling is off
+    """
+    profiler = lazy_cmds.profiler
+    if profiler is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.spans.append((name, start, time.perf_counter() - start))
@@ -0,0 +1,201 @@
+'''
+Index of which controls belong to which character's controls set, so selection driven tools can
+filter objects in O(1) instead of rebuilding the member lists every run
+'''
+
+from rig_stuff.lazy_cmds import cmds
+
+
+class ControlSetIndex(object):
+    """
+    Maps every member of every "*Controls_Set" (namespaced ones included) to the sets it belongs to.
+    Sets are re-read only when flagged dirty, which add_callbacks does when membership changes.
+
+    Example:
+        Zero only the selected objects that are controls ::
+
+            index = get_index()
+            ctrls = index.filter(cmds.ls(sl=True, v=True))
+    """
+    def __init__(self, set_name="Controls_Set"):
+        """
+        Args:
+            set_name (str): name of the controls set, without namespace
+        """
+        self.set_name = set_name
+        self.sets = {}      # set -> list of members
+        self.owner = {}     # member -> set of the sets holding it, a control can be in more than one
+        self.dirty = set()
+        self.rescan = True
+        self.callback_ids = []
+        self._watched = {}  # set -> its members modified callback id
+
+    def find_sets(self):
+        """
+        Returns:
+            list[str]: every controls set in the scene, in any namespace depth
+        """
+        return cmds.ls(self.set_name, recursive=True, type="objectSet") or []
+
+    def refresh(self):
+        """
+        Picks up added or removed sets and re-reads the members of dirty sets only
+        """
+        if self.rescan:
+            found = self.find_sets()
+            for gone in (set(self.sets) | set(self._watched)) - set(found):
+                self._forget(gone)
+            self.dirty.update(s for s in found if s not in self.sets)
+            self.rescan = False
+            if self.callback_ids:
+                self._watch_sets()
+
+        for set_node in list(self.dirty):
+            self._drop(set_node)
+            members = cmds.listConnections(f"{set_node}.dagSetMembers") or []
+            self.sets[set_node] = members
+            for member in members:
+                self.owner.setdefault(member, set()).add(set_node)
+        self.dirty.clear()
+
+    def character_set(self, obj):
+        """
+        Args:
+            obj (str): node name
+
+        Returns:
+            str: controls set obj belongs to, the first by name if it is in several, or None if it is not a control
+        """
+        self.refresh()
+        owners = self.owner.get(obj)
+        return min(owners) if owners else None
+
+    def is_control(self, obj):
+        return self.character_set(obj) is not None
+
+    def filter(self, objs):
+        """
+        Args:
+            objs (list[str]): node names, usually the selection
+
+        Returns:
+            list[str]: only the objs that are controls, in the same order
+        """
+        self.refresh()
+        return [obj for obj in objs if obj in self.owner]
+
+    def members(self, set_node=None):
+        """
+        Args:
+            set_node (str): controls set to list, or None for every character's controls
+
+        Returns:
+            list[str]: controls in the set
+        """
+        self.refresh()
+        if set_node is not None:
+            return list(self.sets.get(set_node, []))
+        return list(self.owner)
+
+    def mark_dirty(self, set_node=None):
+        """
+        Args:
+            set_node (str): set whose membership changed, or None to rescan the scene for sets
+        """
+        if set_node is None:
+            self.rescan = True
+            self.dirty.update(self.sets)
+        else:
+            self.dirty.add(set_node)
+
+    def add_callbacks(self):
+        """
+        Flags sets dirty when members are added or removed, rescans on new controls sets,
+        scene open and reference loads, and drops deleted sets
+        """
+        import maya.api.OpenMaya as om
+
+        def node_added(node, *args):
+            # Every shadingEngine is an objectSet too, only controls sets need a rescan
+            if self._is_controls_set(node):
+                self.mark_dirty()
+
+        def node_removed(node, *args):
+            if self._is_controls_set(node):
+                self._forget(om.MFnDependencyNode(node).name())
+
+        for event in ("SceneOpened", "NewSceneOpened"):
+            self.callback_ids.append(om.MEventMessage.addEventCallback(event, lambda *args: self.mark_dirty()))
+        self.callback_ids.append(om.MSceneMessage.addCallback(om.MSceneMessage.kAfterLoadReference,
+                                                              lambda *args: self.mark_dirty()))
+        self.callback_ids.append(om.MDGMessage.addNodeAddedCallback(node_added, "objectSet"))
+        self.callback_ids.append(om.MDGMessage.addNodeRemovedCallback(node_removed, "objectSet"))
+        self._watch_sets()
+
+    def remove_callbacks(self):
+        import maya.api.OpenMaya as om
+
+        if self.callback_ids:
+            om.MMessage.removeCallbacks(self.callback_ids)
+        if self._watched:
+            om.MMessage.removeCallbacks(list(self._watched.values()))
+        self.callback_ids = []
+        self._watched = {}
+
+    def _watch_sets(self):
+        import maya.api.OpenMaya as om
+
+        for set_node in self.find_sets():
+            if set_node in self._watched:
+                continue
+            sel = om.MSelectionList()
+            sel.add(set_node)
+            self._watched[set_node] = om.MObjectSetMessage.addSetMembersModifiedCallback(
+                sel.getDependNode(0), lambda *args, s=set_node: self.mark_dirty(s))
+
+    def _is_controls_set(self, node):
+        import maya.api.OpenMaya as om
+
+        return om.MFnDependencyNode(node).name().rpartition(":")[2] == self.set_name
+
+    def _forget(self, set_node):
+        self._drop(set_node)
+        self.dirty.discard(set_node)
+        callback_id = self._watched.pop(set_node, None)
+        if callback_id is not None:
+            import maya.api.OpenMaya as om
+
+            om.MMessage.removeCallback(callback_id)
+
+    def _drop(self, set_node):
+        for member in self.sets.pop(set_node, []):
+            owners = self.owner.get(member)
+            if owners is not None:
+                owners.discard(set_node)
+                if not owners:
+                    del self.owner[member]
+
+
+_index = None
+
+
+def get_index(set_name="Controls_Set"):
+    """
+    Shared index for every tool in the session, callbacks keep it current
+
+    Args:
+        set_name (str): name of the controls set, without namespace
+
+    Returns:
+        ControlSetIndex: the session's index
+    """
+    global _index
+    if _index is None or _index.set_name != set_name:
+        if _index is not None:
+            _index.remove_callbacks()
+        _index = ControlSetIndex(set_name)
+        try:
+            _index.add_callbacks()
+        except ImportError:  # No OpenMaya, e.g. fake cmds. Call mark_dirty by hand
+            pass
+    return _index
@@ -0,0 +1,285 @@
+'''
+Collects the nodes, attributes and connections of a build, then commits them in one pass.
+By default the batch becomes one generated MEL script, so the whole build is one scene call and one undo chunk.
+'''
+
+from rig_stuff.lazy_cmds import cmds, mel
+
+
+def mel_value(value):
+    """
+    Args:
+        value: python value of a command argument or flag
+
+    Returns:
+        str: value written as MEL
+    """
+    if type(value) is float:  # Most values of a batch, checked first
+        return repr(value)
+    if isinstance(value, str):
+        return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (list, tuple)):
+        return " ".join(mel_value(v) for v in value)
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def mel_command(cmd, args, kwargs):
+    """
+    Writes a maya.cmds style call as a line of MEL. True flags are written bare, False and None flags are dropped,
+    so flags that take a boolean value, like addAttr -k, need 1 or 0.
+
+    Args:
+        cmd (str): command name, "createNode"
+        args (tuple): positional arguments
+        kwargs (dict): flags, long or short names
+
+    Returns:
+        str: 'createNode "pointOnCurveInfo" -name "poc";'
+    """
+    if not kwargs:
+        return " ".join([cmd] + [mel_value(arg) for arg in args]) + ";"
+    parts = [cmd]
+    for flag, value in kwargs.items():
+        if value is None or value is False:
+            continue
+        parts.append(f"-{flag}" if value is True else f"-{flag} {mel_value(value)}")
+    parts.extend(mel_value(arg) for arg in args)
+    return " ".join(parts) + ";"
+
+
+class GraphBatch(object):
+    """
+    Records a node graph build and commits it all at once
+
+    Example:
+        Build and commit a small network ::
+
+            batch = GraphBatch("eyelid")
+            poc = batch.create_node("pointOnCurveInfo", "Lf_eyelid_upp_pointOnCurveInfo_01")
+            batch.connect("Lf_eyelid_upp_curveShape.local", f"{poc}.inputCurve")
+            batch.set_attr(f"{poc}.parameter", 0.5)
+            batch.commit()
+    """
+    def __init__(self, name="graph_batch"):
+        """
+        Args:
+            name (str): name of the undo chunk
+        """
+        self.name = name
+        self.ops = []
+
+    def __len__(self):
+        return len(self.ops)
+
+    def call(self, cmd, *args, **kwargs):
+        """
+        Records any maya.cmds command
+
+        Args:
+            cmd (str): command name, "aimConstraint"
+        """
+        self.ops.append((cmd, args, kwargs))
+
+    def create_node(self, node_type, name, parent=None):
+        """
+        Args:
+            node_type (str): type of node to create
+            name (str): name of the node, later ops refer to it by this name
+            parent (str): parent transform for DAG nodes
+
+        Returns:
+            str: name of the node
+        """
+        self.call("createNode", node_type, name=name, parent=parent, skipSelect=True)
+        return name
+
+    def set_attr(self, plug, *values):
+        self.call("setAttr", plug, *values)
+
+    def connect(self, src, dst):
+        self.call("connectAttr", src, dst)
+
+    def to_mel(self):
+        """
+        Returns:
+            str: MEL script that runs every recorded op in order
+        """
+        return "\n".join(mel_command(cmd, args, kwargs) for cmd, args, kwargs in self.ops)
+
+    def commit(self, mode="mel"):
+        """
+        Runs the recorded ops in one undo chunk, then clears them
+
+        Args:
+            mode (str): "mel" runs one generated script, "cmds" replays every op through maya.cmds
+
+        Returns:
+            int: number of scene calls made for the ops
+        """
+        if not self.ops:
+            return 0
+        cmds.undoInfo(openChunk=True, chunkName=self.name)
+        try:
+            if mode == "mel":
+                mel.eval(self.to_mel())
+                calls = 1
+            elif mode == "cmds":
+                for cmd, args, kwargs in self.ops:
+                    getattr(cmds, cmd)(*args, **{k: v for k, v in kwargs.items() if v is not None})
+                calls = len(self.ops)
+            else:
+                raise ValueError('Invalid mode. Enter either \"mel\" or \"cmds\"')
+        finally:
+            cmds.undoInfo(closeChunk=True)
+        self.ops = []
+        return calls
+
+
+class GraphTransaction(GraphBatch):
+    """
+    GraphBatch that stays open for a whole build. Recorded ops are flushed as one MEL script whenever the build
+    needs the scene (run, read), all inside one undo chunk that commit closes and rollback undoes.
+
+    Example:
+        Anything raised inside the block rolls the whole build back ::
+
+            with GraphTransaction("C_Spine_rail_spine") as tx:
+                grp = tx.create_node("transform", "C_Spine_grp")
+                crv = tx.run("curve", n="C_Spine_curve", d=1, p=[(0, 0, 0), (0, 1, 0)])
+                tx.call("parent", crv, grp)
+    """
+    def __init__(self, name="graph_transaction"):
+        """
+        Args:
+            name (str): name of the undo chunk
+        """
+        super(GraphTransaction, self).__init__(name)
+        self.nodes = []  # Every node made, for rollback without undo
+        self.connections = []
+        self.recorded = 0  # Ops recorded so far, flushed or not
+        self.calls = 0  # Scene calls made so far, flushes included
+        self.is_open = False
+        self.committed = False
+
+    def __enter__(self):
+        self.begin()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.rollback()
+        elif not self.committed:
+            self.commit()
+        return False
+
+    def call(self, cmd, *args, **kwargs):
+        self.recorded += 1
+        super(GraphTransaction, self).call(cmd, *args, **kwargs)
+
+    def create_node(self, node_type, name, parent=None):
+        self.nodes.append(name)
+        return super(GraphTransaction, self).create_node(node_type, name, parent)
+
+    def connect(self, src, dst):
+        self.connections.append((src, dst))
+        super(GraphTransaction, self).connect(src, dst)
+
+    def add_node(self, name):
+        """
+        Tracks a node made by a command other than create_node, "circle", "loft"...
+
+        Args:
+            name (str): name of the node
+        """
+        self.nodes.append(name)
+
+    def begin(self):
+        cmds.undoInfo(openChunk=True, chunkName=self.name)
+        self.is_open = True
+        self.committed = False
+
+    def flush(self):
+        """
+        Runs the ops recorded since the last flush as one MEL script
+
+        Returns:
+            int: scene calls made, 1 or 0 if nothing was recorded
+        """
+        if not self.ops:
+            return 0
+        script = self.to_mel()
+        self.ops = []
+        mel.eval(script)
+        self.calls += 1
+        return 1
+
+    def run(self, cmd, *args, **kwargs):
+        """
+        Flushes, then runs a maya.cmds command right away, for commands whose result the build needs
+
+        Args:
+            cmd (str): command name, "ikHandle"
+
+        Returns:
+            whatever the command returns
+        """
+        self.flush()
+        self.calls += 1
+        return getattr(cmds, cmd)(*args, **kwargs)
+
+    def read(self, func, *args, **kwargs):
+        """
+        Flushes, then calls a function that reads the scene, so reads see every recorded op
+
+        Args:
+            func (callable): reader, read_world_matrices
+
+        Returns:
+            whatever func returns
+        """
+        self.flush()
+        self.calls += 1
+        return func(*args, **kwargs)
+
+    def commit(self, mode="mel"):
+        """
+        Flushes what is left and closes the undo chunk
+
+        Returns:
+            int: scene calls made over the whole transaction
+        """
+        if mode != "mel":
+            raise ValueError('A transaction only commits as \"mel\"')
+        try:
+            self.flush()
+        except Exception:
+            self.rollback()
+            raise
+        if self.is_open:
+            cmds.undoInfo(closeChunk=True)
+            self.is_open = False
+        self.committed = True
+        return self.calls
+
+    def rollback(self):
+        """
+        Drops unflushed ops and takes back everything already run, with undo when it is on,
+        else by deleting the nodes the transaction made. Attribute edits on older nodes are only undone by undo.
+        Does nothing once committed.
+        """
+        self.ops = []
+        undo = cmds.undoInfo(q=True, state=True)
+        if self.is_open:
+            cmds.undoInfo(closeChunk=True)
+            self.is_open = False
+        if self.committed or not self.calls:
+            return
+        if undo:
+            cmds.undo()
+        else:
+            existing = cmds.ls(self.nodes)
+            if existing:
+                cmds.delete(existing)
+        self.calls = 0
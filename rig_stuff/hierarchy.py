@@ -0,0 +1,127 @@
+'''
+Snapshot of a joint hierarchy read with one descendant query and one bulk matrix read,
+shared by every combiner function of a build instead of walking the scene again each time
+'''
+
+from contextlib import contextmanager
+
+from rig_stuff.lazy_cmds import cmds
+
+# root -> JointHierarchy while a hierarchy_scope is open, None otherwise
+_hierarchies = None
+
+
+class JointHierarchy(object):
+    """
+    Joints under a root in depth first order, with parent indices and world matrices.
+    Never touches the selection.
+
+    Attributes:
+        paths (list[str]): full DAG paths, depth first, root first
+        names (list[str]): short names in the same order
+        parents (list[int]): index of each joint's parent, -1 for the root
+        matrices (list[list[float]]): world matrix of each joint, 16 floats row by row
+        positions (list[list[float]]): world translation of each joint
+    """
+    def __init__(self, root):
+        """
+        Args:
+            root (str): top joint
+        """
+        self.root = root
+        root_path = (cmds.ls(root, long=True) or [root])[0]
+        descendants = cmds.listRelatives(root, allDescendents=True, type="joint", fullPath=True) or []
+
+        # Descendants come back deepest and last sibling first, reversed they keep sibling order
+        children = {}
+        for path in reversed(descendants):
+            children.setdefault(path.rpartition("|")[0], []).append(path)
+
+        self.paths = []
+        self.parents = []
+        stack = [(root_path, -1)]
+        while stack:
+            path, parent = stack.pop()
+            index = len(self.paths)
+            self.paths.append(path)
+            self.parents.append(parent)
+            stack.extend((child, index) for child in reversed(children.get(path, [])))
+
+        self.names = [path.rpartition("|")[2] for path in self.paths]
+        self.matrices = read_world_matrices(self.paths)
+        self.positions = [m[12:15] for m in self.matrices]
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def children(self, index):
+        """
+        Args:
+            index (int): joint index
+
+        Returns:
+            list[int]: indices of its child joints
+        """
+        return [i for i, parent in enumerate(self.parents) if parent == index]
+
+
+def read_world_matrices(paths):
+    """
+    Args:
+        paths (list[str]): DAG paths
+
+    Returns:
+        list[list[float]]: world matrix of each, 16 floats row by row
+    """
+    if not paths:
+        return []
+    try:
+        import maya.api.OpenMaya as om
+    except ImportError:  # No OpenMaya, e.g. fake cmds
+        flat = cmds.xform(paths, q=True, ws=True, m=True)
+        return [flat[i:i + 16] for i in range(0, len(flat), 16)]
+
+    sel = om.MSelectionList()
+    for path in paths:
+        sel.add(path)
+    return [list(sel.getDagPath(i).inclusiveMatrix()) for i in range(sel.length())]
+
+
+@contextmanager
+def hierarchy_scope():
+    """
+    Caches one JointHierarchy per root until the outermost scope closes, so a build reads each root once
+
+    Example:
+        Share the snapshot across a build ::
+
+            with hierarchy_scope():
+                setup_ribbon_base(j="C_Spine_0", name="C_Spine")
+    """
+    global _hierarchies
+    outer = _hierarchies is None
+    if outer:
+        _hierarchies = {}
+    try:
+        yield
+    finally:
+        if outer:
+            _hierarchies = None
+
+
+def get_hierarchy(root):
+    """
+    Args:
+        root (str): top joint
+
+    Returns:
+        JointHierarchy: cached one inside a hierarchy_scope, a fresh one outside
+    """
+    if _hierarchies is None:
+        return JointHierarchy(root)
+    if root not in _hierarchies:
+        _hierarchies[root] = JointHierarchy(root)
+    return _hierarchies[root]
@@ -0,0 +1,558 @@
+'''
+Offline keep-out collision, the baked alternative to cMuscleKeepOut nodes in crv_collide_with_geo.
+The collider is read once as triangles into a bounding volume hierarchy (BVH), then every point of every
+frame is pushed out of it in NumPy batches, and the offsets are baked to keys on the cluster handles.
+A deforming collider refits the same hierarchy each frame instead of building it again.
+'''
+
+import time
+
+import numpy as np
+
+from rig_stuff.graph_batch import GraphBatch
+from rig_stuff.hierarchy import read_world_matrices
+from rig_stuff.lazy_cmds import cmds
+
+
+def triangulate(face_counts, face_indices):
+    """
+    Fans every polygon from its first vertex
+
+    Args:
+        face_counts (list[int]): vertices per face, from get_vtx_pos.get_mesh_topology
+        face_indices (list[int]): vertex index per face-vertex
+
+    Returns:
+        numpy.ndarray: (T, 3) vertex indices of each triangle
+    """
+    face_counts = np.asarray(face_counts, dtype=np.int64)
+    face_indices = np.asarray(face_indices, dtype=np.int64)
+    starts = np.concatenate([[0], np.cumsum(face_counts)[:-1]])
+    tris_per_face = np.maximum(face_counts - 2, 0)
+    face = np.repeat(np.arange(len(face_counts)), tris_per_face)
+    corner = np.arange(len(face)) - np.repeat(np.cumsum(tris_per_face) - tris_per_face, tris_per_face)
+    first = starts[face]
+    return np.stack([face_indices[first], face_indices[first + corner + 1], face_indices[first + corner + 2]], axis=1)
+
+
+def closest_on_triangles(p, a, b, c):
+    """
+    Closest point on each triangle to each point, by Voronoi region (Ericson, Real-Time Collision Detection 5.1.5)
+
+    Args:
+        p (numpy.ndarray): (N, 3) points
+        a (numpy.ndarray): (N, 3) first corner of the triangle paired with each point
+        b (numpy.ndarray): (N, 3) second corners
+        c (numpy.ndarray): (N, 3) third corners
+
+    Returns:
+        numpy.ndarray: (N, 3) barycentric weights of a, b and c at the closest points
+    """
+    ab, ac = b - a, c - a
+    ap, bp, cp = p - a, p - b, p - c
+    d1, d2 = np.einsum("ij,ij->i", ab, ap), np.einsum("ij,ij->i", ac, ap)
+    d3, d4 = np.einsum("ij,ij->i", ab, bp), np.einsum("ij,ij->i", ac, bp)
+    d5, d6 = np.einsum("ij,ij->i", ab, cp), np.einsum("ij,ij->i", ac, cp)
+    va, vb, vc = d3 * d6 - d5 * d4, d5 * d2 - d1 * d6, d1 * d4 - d3 * d2
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        denom = va + vb + vc
+        v, w = vb / denom, vc / denom  # Inside the face
+        bary = np.stack([1.0 - v - w, v, w], axis=1)
+        edge_ab = d1 / (d1 - d3)
+        edge_ac = d2 / (d2 - d6)
+        edge_bc = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+
+    # Later regions win, so they go in reverse order of Ericson's tests
+    regions = [
+        (va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0), lambda: np.stack([0.0 * edge_bc, 1.0 - edge_bc, edge_bc], 1),
+        (vb <= 0) & (d2 >= 0) & (d6 <= 0), lambda: np.stack([1.0 - edge_ac, 0.0 * edge_ac, edge_ac], 1),
+        (d6 >= 0) & (d5 <= d6), lambda: np.array([0.0, 0.0, 1.0]),
+        (vc <= 0) & (d1 >= 0) & (d3 <= 0), lambda: np.stack([1.0 - edge_ab, edge_ab, 0.0 * edge_ab], 1),
+        (d3 >= 0) & (d4 <= d3), lambda: np.array([0.0, 1.0, 0.0]),
+        (d1 <= 0) & (d2 <= 0), lambda: np.array([1.0, 0.0, 0.0]),
+    ]
+    for mask, weights in zip(regions[0::2], regions[1::2]):
+        if mask.any():
+            bary = np.where(mask[:, None], weights(), bary)
+    return bary
+
+
+def nearest_per_item(items, values):
+    """
+    Args:
+        items (numpy.ndarray): (M,) item of each candidate, may repeat
+        values (numpy.ndarray): (M,) distance of each candidate
+
+    Returns:
+        numpy.ndarray: index of each distinct item's smallest value
+    """
+    order = np.lexsort((values, items))
+    lead = np.ones(len(order), dtype=bool)
+    lead[1:] = items[order[1:]] != items[order[:-1]]
+    return order[lead]
+
+
+class TriangleBvh(object):
+    """
+    Bounding volume hierarchy over a triangle mesh, queried with whole batches of points or rays at once.
+    Every (point, node) pair still able to beat its point's best hit goes down a level at a time,
+    so a whole batch walks the tree in a few NumPy passes.
+
+    Example:
+        Closest points on a collider for a batch of collar CVs ::
+
+            bvh = TriangleBvh(positions, triangulate(topology["face_counts"], topology["face_indices"]))
+            hit = bvh.closest(points)
+            print(hit["point"], hit["distance"])
+
+    Attributes:
+        positions (numpy.ndarray): (N, 3) vertex positions
+        triangles (numpy.ndarray): (T, 3) vertex indices
+        order (numpy.ndarray): (T,) triangle indices, each leaf owns a contiguous run
+        lo, hi (numpy.ndarray): (nodes, 3) bounds of each node
+        left, right (numpy.ndarray): (nodes,) child nodes, -1 for leaves
+        first, count (numpy.ndarray): (nodes,) run of order owned by each leaf
+    """
+    def __init__(self, positions, triangles, leaf_size=8):
+        """
+        Args:
+            positions (numpy.ndarray): (N, 3) vertex positions
+            triangles (numpy.ndarray): (T, 3) vertex indices, see triangulate
+            leaf_size (int): most triangles per leaf
+        """
+        self.positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        self.triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+        self.leaf_size = leaf_size
+        self.build()
+
+    def __len__(self):
+        return len(self.triangles)
+
+    def triangle_bounds(self):
+        corners = self.positions[self.triangles]
+        return corners.min(axis=1), corners.max(axis=1), corners.mean(axis=1)
+
+    def build(self):
+        """
+        Splits at the median centroid on the longest axis until leaves hold leaf_size triangles
+        """
+        tri_lo, tri_hi, centroids = self.triangle_bounds()
+        self.tri_lo, self.tri_hi = tri_lo, tri_hi
+        count = len(self.triangles)
+        self.order = np.arange(count)
+        nodes = {"lo": [], "hi": [], "left": [], "right": [], "first": [], "count": [], "depth": []}
+
+        def add(start, end, depth):
+            for key, value in zip(nodes, (None, None, -1, -1, start, end - start, depth)):
+                nodes[key].append(value)
+            return len(nodes["left"]) - 1
+
+        stack = [add(0, count, 0)]
+        while stack:
+            node = stack.pop()
+            start = nodes["first"][node]
+            end = start + nodes["count"][node]
+            run = self.order[start:end]
+            nodes["lo"][node] = tri_lo[run].min(axis=0) if len(run) else np.zeros(3)
+            nodes["hi"][node] = tri_hi[run].max(axis=0) if len(run) else np.zeros(3)
+            if end - start <= self.leaf_size:
+                continue
+            spread = centroids[run].max(axis=0) - centroids[run].min(axis=0)
+            axis = int(np.argmax(spread))
+            mid = (end - start) // 2
+            self.order[start:end] = run[np.argpartition(centroids[run, axis], mid)]
+            depth = nodes["depth"][node] + 1
+            nodes["left"][node] = add(start, start + mid, depth)
+            nodes["right"][node] = add(start + mid, end, depth)
+            nodes["count"][node] = 0  # Only leaves own triangles
+            stack += [nodes["right"][node], nodes["left"][node]]
+
+        self.lo = np.array(nodes["lo"], dtype=np.float64)
+        self.hi = np.array(nodes["hi"], dtype=np.float64)
+        self.left = np.array(nodes["left"], dtype=np.int64)
+        self.right = np.array(nodes["right"], dtype=np.int64)
+        self.first = np.array(nodes["first"], dtype=np.int64)
+        self.count = np.array(nodes["count"], dtype=np.int64)
+        self.depth = np.array(nodes["depth"], dtype=np.int64)
+        self.update_normals()
+
+    def refit(self, positions):
+        """
+        New positions on the same topology, e.g. the next frame of a skinned collider.
+        Bounds are recomputed a tree level at a time, the split order is kept
+
+        Args:
+            positions (numpy.ndarray): (N, 3) vertex positions
+        """
+        self.positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        tri_lo, tri_hi, _ = self.triangle_bounds()
+        self.tri_lo, self.tri_hi = tri_lo, tri_hi
+        leaves = np.flatnonzero(self.left < 0)
+        starts = self.first[leaves]
+        self.lo[leaves] = np.minimum.reduceat(tri_lo[self.order], starts, axis=0)
+        self.hi[leaves] = np.maximum.reduceat(tri_hi[self.order], starts, axis=0)
+        for depth in range(int(self.depth.max()) - 1, -1, -1):
+            inner = np.flatnonzero((self.depth == depth) & (self.left >= 0))
+            self.lo[inner] = np.minimum(self.lo[self.left[inner]], self.lo[self.right[inner]])
+            self.hi[inner] = np.maximum(self.hi[self.left[inner]], self.hi[self.right[inner]])
+        self.update_normals()
+
+    def update_normals(self):
+        """
+        Area weighted vertex normals, blended at hits so inside tests hold on edges and corners too
+        """
+        corners = self.positions[self.triangles]
+        face = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        corner = self.triangles.ravel()
+        normals = np.stack([np.bincount(corner, np.repeat(face[:, axis], 3), len(self.positions))
+                            for axis in range(3)], axis=1)
+        length = np.linalg.norm(normals, axis=1, keepdims=True)
+        self.normals = normals / np.where(length > 0, length, 1.0)
+
+    def closest(self, points):
+        """
+        Args:
+            points (numpy.ndarray): (P, 3) query points
+
+        Returns:
+            dict: {"point": (P, 3) closest points on the mesh, "distance": (P,), "triangle": (P,) index,
+                   "normal": (P, 3) blended vertex normal there}
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        best = np.full(len(points), np.inf)
+        triangle = np.zeros(len(points), dtype=np.int64)
+        bary = np.zeros((len(points), 3))
+        hits = best, triangle, bary
+
+        # Each point first walks down to its nearest looking leaf, the exact distance there prunes the real search
+        node = np.zeros(len(points), dtype=np.int64)
+        inner = np.flatnonzero(self.left[node] >= 0)
+        while len(inner):
+            left, right = self.left[node[inner]], self.right[node[inner]]
+            near_left = self.box_distance(points[inner], left) <= self.box_distance(points[inner], right)
+            node[inner] = np.where(near_left, left, right)
+            inner = inner[self.left[node[inner]] >= 0]
+        self.test_triangles(points, np.arange(len(points)), self.leaf_triangles(node), hits)
+
+        # Then every (point, node) pair still able to beat its point's best goes down a level at a time
+        pair_point, pair_node = np.arange(len(points)), np.zeros(len(points), dtype=np.int64)
+        while len(pair_point):
+            keep = self.box_distance(points[pair_point], pair_node) < best[pair_point]
+            pair_point, pair_node = pair_point[keep], pair_node[keep]
+            leaf = self.left[pair_node] < 0
+            if leaf.any():
+                self.test_triangles(points, pair_point[leaf], self.leaf_triangles(pair_node[leaf]), hits)
+            pair_point, pair_node = self.descend(pair_point[~leaf], pair_node[~leaf])
+
+        corners = self.positions[self.triangles[triangle]]
+        normal = np.einsum("ij,ijk->ik", bary, self.normals[self.triangles[triangle]])
+        return {"point": np.einsum("ij,ijk->ik", bary, corners), "distance": np.sqrt(best), "triangle": triangle,
+                "normal": normal / np.maximum(np.linalg.norm(normal, axis=1, keepdims=True), 1e-12)}
+
+    def box_distance(self, points, nodes):
+        """
+        Returns:
+            numpy.ndarray: squared distance of each point to the bounds of its node, 0 inside
+        """
+        gap = np.maximum(np.maximum(self.lo[nodes] - points, points - self.hi[nodes]), 0.0)
+        return np.einsum("ij,ij->i", gap, gap)
+
+    def leaf_triangles(self, nodes):
+        """
+        Returns:
+            numpy.ndarray: (M, leaf_size) triangles of each leaf, padded with -1
+        """
+        slots = self.first[nodes][:, None] + np.arange(self.leaf_size)
+        valid = slots < (self.first + self.count)[nodes][:, None]
+        return np.where(valid, self.order[np.minimum(slots, len(self.order) - 1)], -1)
+
+    def descend(self, pair_item, pair_node):
+        """
+        Returns:
+            tuple[numpy.ndarray, numpy.ndarray]: each (item, inner node) pair as two pairs, one per child
+        """
+        children = np.stack([self.left[pair_node], self.right[pair_node]], axis=1).ravel()
+        return np.repeat(pair_item, 2), children
+
+    def test_triangles(self, points, idx, tris, hits):
+        """
+        Keeps the closer of each point's best hit so far and its closest point on a row of triangles
+
+        Args:
+            points (numpy.ndarray): (P, 3) query points
+            idx (numpy.ndarray): (M,) points to test, may repeat
+            tris (numpy.ndarray): (M, K) triangles for each, -1 to skip
+            hits (tuple): best squared distance, triangle and barycentric weights of all points, updated in place
+        """
+        best, triangle, bary = hits
+        width = tris.shape[1]
+        pair_point = np.repeat(idx, width)
+        pair_tri = tris.ravel()
+        gap = np.maximum(np.maximum(self.tri_lo[pair_tri] - points[pair_point],
+                                    points[pair_point] - self.tri_hi[pair_tri]), 0.0)
+        near = (pair_tri >= 0) & (np.einsum("ij,ij->i", gap, gap) < best[pair_point])  # Cheap box test first
+        pair_point, pair_tri = pair_point[near], pair_tri[near]
+        corners = self.positions[self.triangles[pair_tri]]
+        weights = closest_on_triangles(points[pair_point], corners[:, 0], corners[:, 1], corners[:, 2])
+        on_mesh = np.einsum("ij,ijk->ik", weights, corners)
+        dist = np.sum((on_mesh - points[pair_point]) ** 2, axis=1)
+        rows = nearest_per_item(pair_point, dist)
+        better = dist[rows] < best[pair_point[rows]]
+        rows = rows[better]
+        won = pair_point[rows]
+        best[won] = dist[rows]
+        triangle[won] = pair_tri[rows]
+        bary[won] = weights[rows]
+
+    def raycast(self, origins, directions, epsilon=1e-9):
+        """
+        Every crossing of each ray with the mesh, Moller-Trumbore per leaf
+
+        Args:
+            origins (numpy.ndarray): (R, 3) ray starts
+            directions (numpy.ndarray): (R, 3) ray directions, any length, t is in multiples of it
+            epsilon (float): smallest t counted as a hit
+
+        Returns:
+            dict: {"t": (R,) first hit, inf when none, "triangle": (R,) first triangle hit, -1 when none,
+                   "hits": (R,) crossings past the origin, odd inside a closed mesh}
+        """
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+        directions = np.asarray(directions, dtype=np.float64).reshape(-1, 3)
+        with np.errstate(divide="ignore"):
+            inverse = 1.0 / np.where(directions == 0.0, 1e-30, directions)
+        first = np.full(len(origins), np.inf)
+        triangle = np.full(len(origins), -1, dtype=np.int64)
+        hits = np.zeros(len(origins), dtype=np.int64)
+
+        # Every crossing counts for the inside test, so rays only drop nodes their line misses
+        pair_ray, pair_node = np.arange(len(origins)), np.zeros(len(origins), dtype=np.int64)
+        while len(pair_ray):
+            t1 = (self.lo[pair_node] - origins[pair_ray]) * inverse[pair_ray]
+            t2 = (self.hi[pair_node] - origins[pair_ray]) * inverse[pair_ray]
+            near = np.minimum(t1, t2).max(axis=1)
+            far = np.maximum(t1, t2).min(axis=1)
+            keep = far >= np.maximum(near, 0.0)
+            pair_ray, pair_node = pair_ray[keep], pair_node[keep]
+            leaf = self.left[pair_node] < 0
+            if leaf.any():
+                tris = self.leaf_triangles(pair_node[leaf])
+                ray = np.repeat(pair_ray[leaf], tris.shape[1])
+                tri = tris.ravel()
+                ray, tri = ray[tri >= 0], tri[tri >= 0]
+                corners = self.positions[self.triangles[tri]]
+                e1, e2 = corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0]
+                pvec = np.cross(directions[ray], e2)
+                det = np.einsum("ij,ij->i", e1, pvec)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    inv_det = 1.0 / det
+                    tvec = origins[ray] - corners[:, 0]
+                    u = np.einsum("ij,ij->i", tvec, pvec) * inv_det
+                    qvec = np.cross(tvec, e1)
+                    v = np.einsum("ij,ij->i", directions[ray], qvec) * inv_det
+                    t = np.einsum("ij,ij->i", e2, qvec) * inv_det
+                hit = (np.abs(det) > 1e-14) & (u >= 0.0) & (v >= 0.0) & (u + v < 1.0) & (t > epsilon)
+                ray, tri, t = ray[hit], tri[hit], t[hit]
+                hits += np.bincount(ray, minlength=len(origins))
+                rows = nearest_per_item(ray, t)
+                closer = t[rows] < first[ray[rows]]
+                rows = rows[closer]
+                first[ray[rows]] = t[rows]
+                triangle[ray[rows]] = tri[rows]
+            pair_ray, pair_node = self.descend(pair_ray[~leaf], pair_node[~leaf])
+        return {"t": first, "triangle": triangle, "hits": hits}
+
+
+def resolve_keep_out(bvh, points, directions=None, offset=0.0):
+    """
+    Pushes points out of the collider, what a keepOut does to its driven transform
+
+    Args:
+        bvh (TriangleBvh): collider
+        points (numpy.ndarray): (..., 3) points, any batch shape
+        directions (numpy.ndarray): (..., 3) push direction per point like keepOut.inDirection,
+            None to push to the closest point on the surface instead
+        offset (float): distance kept from the surface, along the push
+
+    Returns:
+        tuple[numpy.ndarray, numpy.ndarray]: resolved points in the shape of points, and a mask of the moved ones
+    """
+    points = np.asarray(points, dtype=np.float64)
+    flat = points.reshape(-1, 3)
+    resolved = flat.copy()
+    if directions is None:
+        hit = bvh.closest(flat)
+        side = np.einsum("ij,ij->i", flat - hit["point"], hit["normal"])
+        moved = side < offset
+        resolved[moved] = hit["point"][moved] + hit["normal"][moved] * offset
+    else:
+        directions = np.broadcast_to(np.asarray(directions, dtype=np.float64), points.shape).reshape(-1, 3)
+        directions = directions / np.maximum(np.linalg.norm(directions, axis=1, keepdims=True), 1e-12)
+        hit = bvh.raycast(flat, directions)
+        moved = hit["hits"] % 2 == 1  # Inside a closed collider
+        resolved[moved] += directions[moved] * (hit["t"][moved] + offset)[:, None]
+    return resolved.reshape(points.shape), moved.reshape(points.shape[:-1])
+
+
+def keep_out_directions(positions, tolerance=1e-6):
+    """
+    The inDirection crv_collide_with_geo gives each cluster's keepOut, from its position at build time.
+    Out to its side and a little down, straight back for centre clusters. The directions are in the keepOut's
+    space, they turn with the cluster group from then on, see bake_keep_out
+
+    Args:
+        positions (numpy.ndarray): (..., 3) cluster positions at rest
+        tolerance (float): distance from x=0 still counted as a centre cluster
+
+    Returns:
+        numpy.ndarray: (..., 3) directions
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    centre = np.abs(positions[..., 0]) <= tolerance
+    directions = np.zeros_like(positions)
+    directions[..., 0] = np.where(centre, 0.0, np.sign(positions[..., 0]))
+    directions[..., 1] = -0.5
+    directions[..., 2] = np.where(centre, -1.0, 0.0)
+    return directions
+
+
+def solve_frames(bvh, points, directions=None, offset=0.0, collider=None):
+    """
+    Resolves a whole frame range, refitting the BVH first on frames where the collider moved
+
+    Args:
+        bvh (TriangleBvh): collider at its first frame
+        points (numpy.ndarray): (F, P, 3) points per frame
+        directions (numpy.ndarray or str): (F, P, 3) or (P, 3) push directions, "cmuscle" for
+            keep_out_directions of the first frame's points, held for every frame, None for closest point
+        offset (float): distance kept from the surface
+        collider (numpy.ndarray): (F, N, 3) collider vertices per frame, None for a static collider
+
+    Returns:
+        dict: {"points": (F, P, 3) resolved, "moved": (F, P) mask, "seconds": (F,) solve time of each frame}
+    """
+    points = np.asarray(points, dtype=np.float64)
+    resolved = np.empty_like(points)
+    moved = np.zeros(points.shape[:2], dtype=bool)
+    seconds = np.zeros(len(points))
+    if isinstance(directions, str):
+        directions = keep_out_directions(points[0])
+    for frame in range(len(points)):
+        start = time.perf_counter()
+        if collider is not None:
+            bvh.refit(collider[frame])
+        frame_dirs = directions
+        if directions is not None and np.ndim(directions) == 3:
+            frame_dirs = directions[frame]
+        resolved[frame], moved[frame] = resolve_keep_out(bvh, points[frame], frame_dirs, offset)
+        seconds[frame] = time.perf_counter() - start
+    return {"points": resolved, "moved": moved, "seconds": seconds}
+
+
+def get_collider(collider):
+    """
+    Args:
+        collider (str or tuple): mesh, or (positions, triangles) arrays of one already read
+
+    Returns:
+        tuple[numpy.ndarray, numpy.ndarray]: (N, 3) world positions, (T, 3) triangles
+    """
+    if not isinstance(collider, str):
+        return np.asarray(collider[0], dtype=np.float64), np.asarray(collider[1], dtype=np.int64)
+    from get_vtx_pos import get_mesh_topology
+
+    topology = get_mesh_topology(collider)
+    return topology["positions"], triangulate(topology["face_counts"], topology["face_indices"])
+
+
+def sample_frames(nodes, frames, collider=None):
+    """
+    Steps the scene through frames, reading every node's world matrix in one call per frame
+
+    Args:
+        nodes (list[str]): transforms to sample, the cluster groups
+        frames (list[float]): frames to sample
+        collider (str): deforming mesh to sample too, None for a static collider
+
+    Returns:
+        dict: {"matrices": (F, P, 4, 4) world matrices, "collider": (F, N, 3) or None}
+    """
+    from get_vtx_pos import get_vtx_positions
+
+    current = cmds.currentTime(q=True)
+    matrices = np.empty((len(frames), len(nodes), 4, 4))
+    vertices = [] if collider else None
+    try:
+        for index, frame in enumerate(frames):
+            cmds.currentTime(frame, e=True)
+            matrices[index] = np.asarray(read_world_matrices(nodes), dtype=np.float64).reshape(-1, 4, 4)
+            if collider:
+                vertices.append(np.asarray(get_vtx_positions(collider), dtype=np.float64).reshape(-1, 3))
+    finally:
+        cmds.currentTime(current, e=True)
+    return {"matrices": matrices, "collider": np.stack(vertices) if collider else None}
+
+
+def bake_keep_out(clusters, collider, frames=None, directions="cmuscle", offset=0.0, deforming=False):
+    """
+    Baked replacement for crv_collide_with_geo. Samples the cluster groups over frames, resolves them all
+    against the collider, and keys each cluster handle's translate, its rest value plus the push, one animCurve
+    per moved axis, in one GraphBatch
+
+    Args:
+        clusters (list[str]): cluster groups from crv_to_clusters, "Collar_cluster_00_grp"
+        collider (str or tuple): collider mesh, or (positions, triangles) for a static one already read
+        frames (list[float]): frames to bake, the playback range if None
+        directions: see solve_frames. "cmuscle" matches the keepOut directions of crv_collide_with_geo, set once
+            from each group's translateX now and turned with the group every frame
+        offset (float): distance kept from the surface
+        deforming (bool): if True, the collider is sampled and the BVH refit every frame
+
+    Returns:
+        dict: {"frames", "moved": keys that push, "curves": animCurves made,
+               "build_seconds", "sample_seconds", "seconds": (F,) solve time per frame}
+    """
+    if frames is None:
+        frames = list(range(int(cmds.playbackOptions(q=True, min=True)),
+                            int(cmds.playbackOptions(q=True, max=True)) + 1))
+    start = time.perf_counter()
+    bvh = TriangleBvh(*get_collider(collider))
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    samples = sample_frames(clusters, frames, collider if deforming and isinstance(collider, str) else None)
+    sample_seconds = time.perf_counter() - start
+    matrices = samples["matrices"]
+    if isinstance(directions, str):
+        rest = np.array([[cmds.getAttr(f"{grp}.translateX"), 0.0, 0.0] for grp in clusters])
+        directions = np.einsum("pj,fpjk->fpk", keep_out_directions(rest), matrices[:, :, :3, :3])
+    solved = solve_frames(bvh, matrices[:, :, 3, :3], directions, offset, samples["collider"])
+
+    # Row vectors, world = local @ rotation, so the handle's local offset is world offset @ inverse rotation
+    world = solved["points"] - matrices[:, :, 3, :3]
+    local = np.einsum("fpj,fpjk->fpk", world, np.linalg.inv(matrices[:, :, :3, :3]))
+
+    batch = GraphBatch("bake_keep_out")
+    times = np.asarray(frames, dtype=np.float64)
+    curves = 0
+    for index, grp in enumerate(clusters):
+        handle = f"{grp[:-len('_grp')]}Handle"
+        rest = None
+        for axis, name in enumerate("XYZ"):
+            values = local[:, index, axis]
+            if not values.any():
+                continue
+            if rest is None:
+                # Parenting under the group kept the handle's world position, its translate isn't 0
+                rest = cmds.getAttr(f"{handle}.translate")[0]
+            values = values + rest[axis]
+            curve = batch.create_node("animCurveTL", f"{handle}_keepOut_translate{name}")
+            keys = np.stack([times, values], axis=1).ravel().tolist()
+            batch.set_attr(f"{curve}.keyTimeValue[0:{len(frames) - 1}]", *keys)
+            batch.connect(f"{curve}.output", f"{handle}.translate{name}")
+            curves += 1
+    if curves:
+        batch.commit()
+    return {"frames": list(frames), "moved": int(solved["moved"].sum()), "curves": curves,
+            "build_seconds": build_seconds, "sample_seconds": sample_seconds, "seconds": solved["seconds"]}
@@ -0,0 +1,56 @@
+'''
+maya.cmds stand-in that only imports Maya the first time a command is used,
+so rig_stuff modules can be imported for a single helper without paying for Maya startup
+'''
+
+import importlib
+
+# CmdsProfiler set by rig_stuff.cmds_profiler.enable, None when profiling is off
+profiler = None
+_instances = []
+
+
+class LazyCmds(object):
+    """
+    Forwards attribute access to maya.cmds, imported on first use. Commands are kept on the instance after
+    their first lookup, so later ones cost a plain attribute read. While a profiler is enabled,
+    commands come back wrapped instead, so every call is recorded.
+
+    Example:
+        Use it exactly like maya.cmds ::
+
+            from rig_stuff.lazy_cmds import cmds
+            cmds.createNode("transform")
+    """
+    def __init__(self, module="maya.cmds", prefix=""):
+        """
+        Args:
+            module (str): module to forward to
+            prefix (str): put before command names in profiles, "mel."
+        """
+        self._name = module
+        self._prefix = prefix
+        self._module = None
+        _instances.append(self)
+
+    def __getattr__(self, name):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        func = getattr(self._module, name)
+        if profiler is not None:
+            return profiler.wrap(func, self._prefix + name)
+        setattr(self, name, func)
+        return func
+
+
+def clear_cache():
+    """
+    Forgets the commands kept on every LazyCmds, so the next lookups see a newly enabled profiler
+    """
+    for instance in _instances:
+        for name in [name for name in vars(instance) if not name.startswith("_")]:
+            delattr(instance, name)
+
+
+cmds = LazyCmds()
+mel = LazyCmds("maya.mel", prefix="mel.")
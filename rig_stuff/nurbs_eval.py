@@ -0,0 +1,251 @@
+'''
+Evaluates NURBS curves and surfaces from their CV and knot data with NumPy, many parameters per call,
+so layout and solvers don't need a live pointOnCurveInfo/pointOnSurfaceInfo per sample
+'''
+
+import numpy as np
+
+
+def full_knots(knots):
+    """
+    Maya stores numCVs + degree - 1 knots, textbook evaluation wants the end knots one more time
+
+    Args:
+        knots (list[float]): knots as returned by MFnNurbsCurve.knots or MFnNurbsSurface.knotsInU
+
+    Returns:
+        numpy.ndarray: numCVs + degree + 1 knots
+    """
+    knots = np.asarray(knots, dtype=np.float64)
+    return np.concatenate([knots[:1], knots, knots[-1:]])
+
+
+def get_shape_path(node):
+    """
+    Args:
+        node (str): shape, or transform with a shape under it
+
+    Returns:
+        MDagPath: path to the shape
+    """
+    import maya.api.OpenMaya as om
+
+    sel = om.MSelectionList()
+    sel.add(node)
+    path = sel.getDagPath(0)
+    if path.hasFn(om.MFn.kTransform):
+        path.extendToShape()
+    return path
+
+
+def get_curve_data(curve):
+    """
+    Reads a nurbsCurve once through OpenMaya
+
+    Args:
+        curve (str): curve shape or transform
+
+    Returns:
+        dict: {"cvs": (n, 4) homogeneous [x*w, y*w, z*w, w], "knots": full knots, "degree": int}
+    """
+    import maya.api.OpenMaya as om
+
+    fn_curve = om.MFnNurbsCurve(get_shape_path(curve))
+    cvs = np.array([(p.x * p.w, p.y * p.w, p.z * p.w, p.w) for p in fn_curve.cvPositions(om.MSpace.kObject)])
+    return {"cvs": cvs, "knots": full_knots(fn_curve.knots()), "degree": fn_curve.degree}
+
+
+def get_surface_data(surface):
+    """
+    Reads a nurbsSurface once through OpenMaya
+
+    Args:
+        surface (str): surface shape or transform
+
+    Returns:
+        dict: {"cvs": (nu, nv, 4) homogeneous, "knots_u", "knots_v": full knots, "degree_u", "degree_v": int}
+    """
+    import maya.api.OpenMaya as om
+
+    fn_surface = om.MFnNurbsSurface(get_shape_path(surface))
+    cvs = np.array([(p.x * p.w, p.y * p.w, p.z * p.w, p.w) for p in fn_surface.cvPositions(om.MSpace.kObject)])
+    # CVs come out with V changing fastest
+    cvs = cvs.reshape(fn_surface.numCVsInU, fn_surface.numCVsInV, 4)
+    return {"cvs": cvs,
+            "knots_u": full_knots(fn_surface.knotsInU()), "knots_v": full_knots(fn_surface.knotsInV()),
+            "degree_u": fn_surface.degreeInU, "degree_v": fn_surface.degreeInV}
+
+
+def find_spans(params, degree, knots):
+    """
+    Args:
+        params (numpy.ndarray): (N,) parameters
+        degree (int): degree of the curve in this direction
+        knots (numpy.ndarray): full knots
+
+    Returns:
+        numpy.ndarray: (N,) knot span index of each parameter
+    """
+    n = len(knots) - degree - 2  # last CV index
+    spans = np.searchsorted(knots, params, side="right") - 1
+    return np.clip(spans, degree, n)
+
+
+def basis_derivs(params, spans, degree, knots, derivs=1):
+    """
+    Non-zero B-spline basis functions and their derivatives for many parameters at once
+    (The NURBS Book, algorithm A2.3, vectorized over the parameters)
+
+    Args:
+        params (numpy.ndarray): (N,) parameters
+        spans (numpy.ndarray): (N,) spans from find_spans
+        degree (int): degree in this direction
+        knots (numpy.ndarray): full knots
+        derivs (int): highest derivative wanted
+
+    Returns:
+        numpy.ndarray: (N, derivs + 1, degree + 1) basis values, [:, k, j] is the kth derivative of basis spans - degree + j
+    """
+    count = len(params)
+    p = degree
+    ndu = np.zeros((count, p + 1, p + 1))
+    ndu[:, 0, 0] = 1.0
+    left = np.zeros((count, p + 1))
+    right = np.zeros((count, p + 1))
+    for j in range(1, p + 1):
+        left[:, j] = params - knots[spans + 1 - j]
+        right[:, j] = knots[spans + j] - params
+        saved = np.zeros(count)
+        for r in range(j):
+            ndu[:, j, r] = right[:, r + 1] + left[:, j - r]
+            temp = ndu[:, r, j - 1] / ndu[:, j, r]
+            ndu[:, r, j] = saved + right[:, r + 1] * temp
+            saved = left[:, j - r] * temp
+        ndu[:, j, j] = saved
+
+    ders = np.zeros((count, derivs + 1, p + 1))
+    ders[:, 0, :] = ndu[:, :, p]
+    for r in range(p + 1):
+        a = np.zeros((2, count, p + 1))
+        a[0, :, 0] = 1.0
+        s1, s2 = 0, 1
+        for k in range(1, derivs + 1):
+            d = np.zeros(count)
+            rk, pk = r - k, p - k
+            if r >= k:
+                a[s2, :, 0] = a[s1, :, 0] / ndu[:, pk + 1, rk]
+                d = a[s2, :, 0] * ndu[:, rk, pk]
+            j1 = 1 if rk >= -1 else -rk
+            j2 = k - 1 if r - 1 <= pk else p - r
+            for j in range(j1, j2 + 1):
+                a[s2, :, j] = (a[s1, :, j] - a[s1, :, j - 1]) / ndu[:, pk + 1, rk + j]
+                d = d + a[s2, :, j] * ndu[:, rk + j, pk]
+            if r <= pk:
+                a[s2, :, k] = -a[s1, :, k - 1] / ndu[:, pk + 1, r]
+                d = d + a[s2, :, k] * ndu[:, r, pk]
+            ders[:, k, r] = d
+            s1, s2 = s2, s1
+
+    factor = p
+    for k in range(1, derivs + 1):
+        ders[:, k, :] *= factor
+        factor *= p - k
+    return ders
+
+
+def eval_curve(data, params, derivs=1):
+    """
+    Args:
+        data (dict): from get_curve_data
+        params (list[float]): (N,) curve parameters
+        derivs (int): highest derivative wanted, up to 2
+
+    Returns:
+        list[numpy.ndarray]: [positions (N, 3), first derivatives (N, 3), ...]
+    """
+    params = np.asarray(params, dtype=np.float64)
+    degree, knots = data["degree"], data["knots"]
+    spans = find_spans(params, degree, knots)
+    ders = basis_derivs(params, spans, degree, knots, derivs)
+    index = spans[:, None] - degree + np.arange(degree + 1)
+    cw = np.einsum("nkj,njc->knc", ders, data["cvs"][index])  # homogeneous derivatives
+
+    a, w = cw[..., :3], cw[..., 3:]
+    out = [a[0] / w[0]]
+    if derivs >= 1:
+        out.append((a[1] - w[1] * out[0]) / w[0])
+    if derivs >= 2:
+        out.append((a[2] - 2 * w[1] * out[1] - w[2] * out[0]) / w[0])
+    return out
+
+
+def eval_surface(data, u, v, derivs=1):
+    """
+    Args:
+        data (dict): from get_surface_data
+        u (list[float]): (N,) U parameters
+        v (list[float]): (N,) V parameters
+        derivs (int): highest derivative wanted, up to 2
+
+    Returns:
+        dict: {"position", "du", "dv"} and with derivs=2 {"duu", "duv", "dvv"}, each (N, 3)
+    """
+    u = np.asarray(u, dtype=np.float64)
+    v = np.asarray(v, dtype=np.float64)
+    pu, pv = data["degree_u"], data["degree_v"]
+    spans_u = find_spans(u, pu, data["knots_u"])
+    spans_v = find_spans(v, pv, data["knots_v"])
+    nu = basis_derivs(u, spans_u, pu, data["knots_u"], derivs)
+    nv = basis_derivs(v, spans_v, pv, data["knots_v"], derivs)
+    iu = spans_u[:, None] - pu + np.arange(pu + 1)
+    iv = spans_v[:, None] - pv + np.arange(pv + 1)
+    cvs = data["cvs"][iu[:, :, None], iv[:, None, :]]  # (N, pu + 1, pv + 1, 4)
+
+    def skl(k, l):
+        return np.einsum("ni,nj,nijc->nc", nu[:, k], nv[:, l], cvs)
+
+    s00 = skl(0, 0)
+    w = s00[:, 3:]
+    result = {"position": s00[:, :3] / w}
+    if derivs >= 1:
+        s10, s01 = skl(1, 0), skl(0, 1)
+        result["du"] = (s10[:, :3] - s10[:, 3:] * result["position"]) / w
+        result["dv"] = (s01[:, :3] - s01[:, 3:] * result["position"]) / w
+    if derivs >= 2:
+        s20, s11, s02 = skl(2, 0), skl(1, 1), skl(0, 2)
+        pos, du, dv = result["position"], result["du"], result["dv"]
+        result["duu"] = (s20[:, :3] - 2 * s10[:, 3:] * du - s20[:, 3:] * pos) / w
+        result["dvv"] = (s02[:, :3] - 2 * s01[:, 3:] * dv - s02[:, 3:] * pos) / w
+        result["duv"] = (s11[:, :3] - s10[:, 3:] * dv - s01[:, 3:] * du - s11[:, 3:] * pos) / w
+    return result
+
+
+def normalize(vectors):
+    """
+    Args:
+        vectors (numpy.ndarray): (N, 3)
+
+    Returns:
+        numpy.ndarray: (N, 3) unit vectors, zero vectors stay zero
+    """
+    length = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(vectors, length, out=np.zeros_like(vectors), where=length > 0)
+
+
+def matrix_to_euler_xyz(matrices):
+    """
+    Rotation of Maya style (row vector) matrices as decomposeMatrix would give it, shear and scale removed
+
+    Args:
+        matrices (numpy.ndarray): (N, 4, 4) or (N, 3, 3), rows are the X, Y, Z axes
+
+    Returns:
+        numpy.ndarray: (N, 3) XYZ euler angles in degrees
+    """
+    x = normalize(matrices[:, 0, :3])
+    y = normalize(matrices[:, 1, :3] - np.sum(matrices[:, 1, :3] * x, axis=1, keepdims=True) * x)
+    z = np.cross(x, y)
+    rx = np.arctan2(y[:, 2], z[:, 2])
+    ry = np.arcsin(np.clip(-x[:, 2], -1.0, 1.0))
+    rz = np.arctan2(x[:, 1], x[:, 0])
+    return np.degrees(np.stack([rx, ry, rz], axis=1))
@@ -0,0 +1,313 @@
+'''
+Capture, save, restore and blend whole character poses, built on the same keyable attribute walk
+as zero_out_controllers.
+'''
+
+import struct
+import sys
+from array import array
+from collections import OrderedDict
+
+from rig_stuff.graph_batch import GraphBatch
+from rig_stuff.lazy_cmds import cmds
+from rig_stuff.scene_callbacks import clear_on_scene_change
+
+from rig_stuff.zero_out_controllers import COMPOUNDS, get_keyable_values
+
+MAGIC = b"PITPOSE1"
+HEADER = struct.Struct("<8sII")  # magic, plug count, byte length of the name table
+
+# tuple(objs) -> [(obj, [attrs])], the attribute walk only runs once per set of controls.
+# The least recently used go past MAX_LAYOUTS, every one goes on scene new and open
+MAX_LAYOUTS = 32
+_layouts = OrderedDict()
+
+
+def clear_layout_cache():
+    _layouts.clear()
+
+
+class Pose(object):
+    """
+    Columnar pose: one name table of "obj.attr" plugs and one array('d') of values in the same order
+    """
+    def __init__(self, names, values):
+        """
+        Args:
+            names (list[str]): plug names, "ctrl.translateX"
+            values (array.array): values of the plugs as doubles
+        """
+        self.names = list(names)
+        self.values = array('d', values)
+        self._lookup = None
+        self._setters = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def index(self):
+        """
+        Returns:
+            dict: {plug: position in values}
+        """
+        if self._lookup is None:
+            self._lookup = {name: i for i, name in enumerate(self.names)}
+        return self._lookup
+
+    def setters(self):
+        """
+        Returns:
+            list[tuple]: [(plug, [positions in values])...] one setAttr each, full translate/rotate/scale
+                triples as their compound plug
+        """
+        if self._setters is None:
+            by_obj = OrderedDict()
+            for i, name in enumerate(self.names):
+                obj, _, attr = name.rpartition(".")
+                by_obj.setdefault(obj, OrderedDict())[attr] = i
+            self._setters = []
+            for obj, attrs in by_obj.items():
+                for compound, children in COMPOUNDS.items():
+                    if all(child in attrs for child in children):
+                        self._setters.append((f"{obj}.{compound}", [attrs.pop(child) for child in children]))
+                self._setters.extend((f"{obj}.{attr}", [i]) for attr, i in attrs.items())
+        return self._setters
+
+    def subset(self, objs=None, attrs=None):
+        """
+        Args:
+            objs (list[str]): only keep plugs of these nodes, None keeps every node
+            attrs (list[str]): only keep these attributes, None keeps every attribute
+
+        Returns:
+            Pose: new pose with the matching plugs
+        """
+        objs = set(objs) if objs else None
+        attrs = set(attrs) if attrs else None
+        keep = []
+        for i, name in enumerate(self.names):
+            obj, _, attr = name.rpartition(".")
+            if (objs is None or obj in objs) and (attrs is None or attr in attrs):
+                keep.append(i)
+        return Pose([self.names[i] for i in keep], array('d', [self.values[i] for i in keep]))
+
+    def blend(self, other, weight):
+        """
+        Linear blend towards other, plugs only in self are kept as they are
+
+        Args:
+            other (Pose): pose to blend towards
+            weight (float): 0 is self, 1 is other
+
+        Returns:
+            Pose: blended pose
+        """
+        lookup = other.index()
+        values = array('d', self.values)
+        for i, name in enumerate(self.names):
+            j = lookup.get(name)
+            if j is not None:
+                values[i] += (other.values[j] - values[i]) * weight
+        return Pose(self.names, values)
+
+    def save(self, path):
+        """
+        Writes the pose as header, utf-8 name table and little endian doubles
+
+        Args:
+            path (str): file to write
+        """
+        table = "\n".join(self.names).encode("utf-8")
+        values = array('d', self.values)
+        if sys.byteorder != "little":
+            values.byteswap()
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, len(self.names), len(table)))
+            f.write(table)
+            values.tofile(f)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """
+        Args:
+            path (str): file written by Pose.save
+
+        Returns:
+            Pose: the stored pose
+        """
+        with open(path, "rb") as f:
+            magic, count, table_len = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a pose file")
+            table = f.read(table_len).decode("utf-8")
+            values = array('d')
+            values.fromfile(f, count)
+        if sys.byteorder != "little":
+            values.byteswap()
+        return cls(table.split("\n") if count else [], values)
+
+
+def get_layout(objs, refresh=False):
+    """
+    Keyable, unlocked, settable attributes of each control, walked once and cached
+
+    Args:
+        objs (list[str]): controls, a control listed twice is kept once
+        refresh (bool): if True, walks the attributes again, e.g. after adding attributes to a control
+
+    Returns:
+        list[tuple]: [(obj, [attrs])...]
+    """
+    key = tuple(OrderedDict.fromkeys(objs))
+    if refresh or key not in _layouts:
+        clear_on_scene_change(clear_layout_cache)
+        _layouts[key] = [(obj, cmds.listAttr(obj, keyable=1, unlocked=1, settable=1) or []) for obj in key]
+        while len(_layouts) > MAX_LAYOUTS:
+            _layouts.popitem(last=False)
+    else:
+        _layouts.move_to_end(key)
+    return _layouts[key]
+
+
+def get_plugs(objs):
+    """
+    OpenMaya plugs for the layout of objs, with the unit to convert each one to. Looked up with one selection list
+    per call and not kept, a kept MPlug outlives deletes, renames and scene changes
+
+    Args:
+        objs (list[str]): controls
+
+    Returns:
+        list[tuple]: [(MPlug, unit)...] where unit is "angle", "distance" or None, or None without OpenMaya
+    """
+    try:
+        import maya.api.OpenMaya as om
+    except ImportError:
+        return None
+
+    sel = om.MSelectionList()
+    plugs = []
+    count = 0
+    for obj, keyable in get_layout(objs):
+        for attr in keyable:
+            sel.add(f"{obj}.{attr}")
+            count += 1
+    if sel.length() != count:
+        # The selection list merges plugs it has already seen, e.g. one control by short and long name,
+        # which would pair every value after it with the wrong name
+        raise ValueError(f"{count - sel.length()} plugs of {objs} are the same plug under another name")
+    for i in range(sel.length()):
+        plug = sel.getPlug(i)
+        unit = None
+        if plug.attribute().hasFn(om.MFn.kUnitAttribute):
+            unit_type = om.MFnUnitAttribute(plug.attribute()).unitType()
+            if unit_type == om.MFnUnitAttribute.kAngle:
+                unit = "angle"
+            elif unit_type == om.MFnUnitAttribute.kDistance:
+                unit = "distance"
+        plugs.append((plug, unit))
+    return plugs
+
+
+def read_plugs(plugs):
+    """
+    Args:
+        plugs (list[tuple]): [(MPlug, unit)...] from get_plugs
+
+    Returns:
+        array.array: plug values in ui units, same as getAttr would return
+    """
+    import maya.api.OpenMaya as om
+
+    angle_unit = om.MAngle.uiUnit()
+    distance_unit = om.MDistance.uiUnit()
+    values = array('d')
+    for plug, unit in plugs:
+        if unit == "angle":
+            values.append(plug.asMAngle().asUnits(angle_unit))
+        elif unit == "distance":
+            values.append(plug.asMDistance().asUnits(distance_unit))
+        else:
+            values.append(plug.asDouble())
+    return values
+
+
+def capture_pose(objs):
+    """
+    Reads through OpenMaya plugs inside Maya, or compound getAttr calls without it
+
+    Args:
+        objs (list[str]): controls to capture
+
+    Returns:
+        Pose: current values of every keyable attribute of objs
+    """
+    layout = get_layout(objs)
+    names = [f"{obj}.{attr}" for obj, keyable in layout for attr in keyable]
+
+    plugs = get_plugs(objs)
+    if plugs is not None:
+        return Pose(names, read_plugs(plugs))
+
+    values = array('d')
+    for obj, keyable in layout:
+        current = get_keyable_values(obj, keyable)
+        values.extend(current[attr] for attr in keyable)
+    return Pose(names, values)
+
+
+def restore_pose(pose, objs=None, attrs=None, current=None, mode="mel"):
+    """
+    Sets the pose back as one GraphBatch, so one scene call and one undo chunk.
+    Full translate/rotate/scale triples are set with one setAttr each.
+
+    Args:
+        pose (Pose): pose to apply
+        objs (list[str]): partial restore, only these controls
+        attrs (list[str]): partial restore, only these attributes
+        current (Pose): pose captured right before, plugs already at their stored value in it are skipped.
+            None sets every plug without reading the scene
+        mode (str): see GraphBatch.commit
+
+    Returns:
+        int: number of setAttr commands in the batch
+    """
+    if objs or attrs:
+        pose = pose.subset(objs, attrs)
+    names, values = pose.names, pose.values
+    unchanged = set()
+    if current is not None:
+        now = current.index()
+        unchanged = {i for i, name in enumerate(names) if name in now and current.values[now[name]] == values[i]}
+
+    batch = GraphBatch("restore_pose")
+    for plug, indices in pose.setters():
+        changed = [i for i in indices if i not in unchanged]
+        if len(changed) == len(indices):
+            batch.set_attr(plug, *[values[i] for i in indices])
+        else:  # Part of a triple, set the children that moved on their own
+            for i in changed:
+                batch.set_attr(names[i], values[i])
+    count = len(batch)
+    batch.commit(mode)
+    return count
+
+
+def blend_poses(pose_a, pose_b, weight, objs=None, attrs=None):
+    """
+    Sets the blend of two poses on the controls
+
+    Args:
+        pose_a (Pose): pose at weight 0
+        pose_b (Pose): pose at weight 1
+        weight (float): blend amount
+        objs (list[str]): partial blend, only these controls
+        attrs (list[str]): partial blend, only these attributes
+
+    Returns:
+        Pose: the blended pose that was applied
+    """
+    blended = pose_a.blend(pose_b, weight)
+    restore_pose(blended, objs=objs, attrs=attrs)
+    return blended
@@ -0,0 +1,348 @@
+'''
+Rail spine builder. Alignments that setup_rail_spine gets from throwaway constraints and worldUp groups are
+computed from cached matrices instead, and the whole build is one GraphTransaction with per stage timings.
+'''
+
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from rig_stuff import cmds_profiler, nurbs_eval
+from rig_stuff.arc_length import ArcLengthCache
+from rig_stuff.graph_batch import GraphTransaction
+from rig_stuff.hierarchy import JointHierarchy, read_world_matrices
+from rig_stuff.lazy_cmds import cmds
+
+
+def aim_frames(positions, targets, ups):
+    """
+    Rotation an aimConstraint with aim X and up Z gives, without making one
+
+    Args:
+        positions (numpy.ndarray): (N, 3) world positions
+        targets (numpy.ndarray): (N, 3) world positions to aim X at
+        ups (numpy.ndarray): (N, 3) world up vectors for Z
+
+    Returns:
+        numpy.ndarray: (N, 3, 3) rotations, rows are the X, Y, Z axes
+    """
+    x = nurbs_eval.normalize(np.asarray(targets, dtype=np.float64) - positions)
+    y = nurbs_eval.normalize(np.cross(ups, x))
+    z = np.cross(x, y)
+    return np.stack([x, y, z], axis=1)
+
+
+def local_transforms(rotations, positions):
+    """
+    Translate and jointOrient of a chain where each joint is the child of the one before it, rotate left at zero
+
+    Args:
+        rotations (numpy.ndarray): (N, 3, 3) world rotations
+        positions (numpy.ndarray): (N, 3) world positions
+
+    Returns:
+        tuple[numpy.ndarray]: (N, 3) translates and (N, 3) jointOrients in degrees
+    """
+    parent_rotations = np.concatenate([np.eye(3)[None], rotations[:-1]])
+    parent_positions = np.concatenate([np.zeros((1, 3)), positions[:-1]])
+    # Row vectors, world = local @ parent, parent rotations are orthonormal so their inverse is their transpose
+    translates = np.einsum("nj,nij->ni", positions - parent_positions, parent_rotations)
+    orients = nurbs_eval.matrix_to_euler_xyz(np.einsum("nij,nkj->nik", rotations, parent_rotations))
+    return translates, orients
+
+
+class RailSpineBuilder(object):
+    """
+    Builds the same rig as setup_rail_spine. Every node and connection goes in one GraphTransaction,
+    so a failed build leaves nothing behind, and each stage's time and scene calls are kept in self.stages.
+
+    Example:
+        Build a tail and see where the time went ::
+
+            builder = RailSpineBuilder(j="C_Tail_0", name="C_Tail", stretch=True).build()
+            print(builder.report())
+    """
+    def __init__(self, j="", name="", neck="", stretch=True, width=4, up_vector=(0, 0, -1), hide_grp="DO_NOT_TOUCH"):
+        """
+        Args:
+            j (str): top spine joint in hierarchy. Best if its children are only the joints you want on the surface
+            name (str): name of the chain
+            neck (str): specify if there is a neck joint
+            stretch (bool): if you would like to add stretch, via translate
+            width (float): width of the resulting ribbon curve
+            up_vector (tuple): world up of the chain's Z axes, what the old worldUp groups gave joints with zero rotate
+            hide_grp (str): hidden group the rig internals go under, reused if it already exists
+        """
+        self.j = j
+        self.name = name
+        self.neck = neck
+        self.stretch = stretch
+        self.width = width
+        self.up_vector = up_vector
+        self.hide_grp = hide_grp
+        self.tx = None
+        self.stages = []  # [{"stage", "seconds", "calls", "ops"}]
+
+        self.joints = []
+        self.positions = None
+        self.rotations = None
+        self.curve = ""
+        self.curve_length = 0.0
+        self.surface = ""
+        self.grps = []
+        self.ctrls = []
+        self.ctrl_grps = []
+        self.ik = ""
+        self.rails = []
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Times a build stage and counts its scene calls and recorded ops. Flushes at the end,
+        so the time of running a stage's ops lands on that stage
+        """
+        calls, ops = self.tx.calls, self.tx.recorded
+        start = time.perf_counter()
+        try:
+            with cmds_profiler.span(name):
+                yield
+                self.tx.flush()
+        finally:
+            self.stages.append({"stage": name, "seconds": time.perf_counter() - start,
+                                "calls": self.tx.calls - calls, "ops": self.tx.recorded - ops})
+
+    def build(self):
+        """
+        Returns:
+            RailSpineBuilder: self, built
+        """
+        self.stages = []
+        self.tx = GraphTransaction(f"{self.name}_rail_spine")
+        with self.tx:
+            with self.stage("read"):
+                hierarchy = self.tx.read(JointHierarchy, self.j)
+            with self.stage("curve"):
+                self.make_curve(hierarchy)
+            with self.stage("chain"):
+                self.align_chain(hierarchy)
+            with self.stage("ribbon"):
+                self.make_ribbon()
+            with self.stage("pins"):
+                self.make_pins()
+            with self.stage("ik"):
+                self.make_ik()
+            with self.stage("rails"):
+                self.make_rails()
+            if self.stretch:
+                with self.stage("stretch"):
+                    self.make_stretch()
+            with self.stage("cleanup"):
+                self.cleanup()
+            with self.stage("commit"):
+                self.tx.commit()
+        return self
+
+    def make_curve(self, hierarchy):
+        """
+        Smooth curve through the joints, then joint positions equal arc length apart along it
+        """
+        self.joints = list(hierarchy.names)
+        crv = self.tx.run("curve", n=f"{self.name}_curve", d=1, p=[list(pos) for pos in hierarchy.positions])
+        shape = self.tx.run("listRelatives", crv, c=True, shapes=True)[0]
+        self.tx.run("rename", shape, f"{self.name}_curveShape")
+        self.tx.run("rebuildCurve", crv, rt=0, s=len(self.joints) - 1, kr=0, ch=0)
+        self.curve = crv
+
+        arc_lengths = ArcLengthCache()
+        params = self.tx.read(arc_lengths.equidistant_params, crv, len(self.joints))
+        data, table = arc_lengths.get(crv)
+        self.positions = nurbs_eval.eval_curve(data, params, 0)[0]
+        self.curve_length = float(table["lengths"][-1])
+
+    def align_chain(self, hierarchy):
+        """
+        Puts the joints on the curve as one chain, X down the chain and Z to up_vector, orients baked
+        """
+        ups = np.tile(np.asarray(self.up_vector, dtype=np.float64), (len(self.joints) - 1, 1))
+        frames = aim_frames(self.positions[:-1], self.positions[1:], ups)
+        self.rotations = np.concatenate([frames, frames[-1:]])  # Last joint keeps its parent's orient
+        translates, orients = local_transforms(self.rotations, self.positions)
+
+        for index, joint in enumerate(self.joints):
+            if index == 0:
+                if hierarchy.paths[0].count("|") > 1:
+                    self.tx.call("parent", joint, w=True)
+            elif hierarchy.parents[index] != index - 1:
+                self.tx.call("parent", joint, self.joints[index - 1])
+            self.tx.set_attr(f"{joint}.translate", *translates[index].tolist())
+            self.tx.set_attr(f"{joint}.rotate", 0, 0, 0)
+            self.tx.set_attr(f"{joint}.jointOrient", *orients[index].tolist())
+
+    def make_ribbon(self):
+        """
+        Lofts the curve offset by half the width each side
+        """
+        sides = []
+        for side, offset in (("B", -self.width / 2.0), ("A", self.width / 2.0)):
+            dup = f"{self.name}_ribbon{side}_curve"
+            self.tx.call("duplicate", self.curve, n=dup)
+            self.tx.set_attr(f"{dup}.translateX", offset)
+            sides.append(dup)
+
+        ribbon = self.tx.run("loft", *sides, ch=0, ar=1, d=3, u=1, ss=1, rsn=True, name=f"{self.name}_ribbon")[0]
+        self.tx.add_node(ribbon)
+        shape = self.tx.run("listRelatives", ribbon, c=True, shapes=True)[0]
+        self.surface = self.tx.run("rename", shape, f"{self.name}_ribbonShape")
+        self.tx.call("rebuildSurface", self.surface, ch=0, rpo=1, rt=0, end=1, kr=0, kcp=1, kc=0, su=4, du=3,
+                     tol=0.01, fr=0, dir=0)
+        self.tx.call("delete", *sides)
+
+    def make_pins(self):
+        """
+        Group per joint pinned to the ribbon where the joint is closest
+        """
+        uv_pin = self.tx.create_node("uvPin", f"{self.surface}_uvPin")
+        self.tx.connect(f"{self.surface}.worldSpace[0]", f"{uv_pin}.deformedGeometry")
+
+        self.grps = []
+        for index, joint in enumerate(self.joints):
+            loc = self.tx.create_node("transform", f"{joint}_loc")
+            self.tx.set_attr(f"{loc}.rotateY", -90)
+            self.tx.set_attr(f"{loc}.rotateZ", 180)
+            self.grps.append(self.tx.create_node("transform", f"{joint}_grp", parent=loc))
+
+            closest_pos = self.tx.create_node("closestPointOnSurface", f"{joint}_closestPointOnSurface")
+            self.tx.connect(f"{self.surface}.worldSpace[0]", f"{closest_pos}.inputSurface")
+            decomp_matrix = self.tx.create_node("decomposeMatrix", f"{joint}_decomposeMatrix")
+            self.tx.connect(f"{joint}.worldMatrix[0]", f"{decomp_matrix}.inputMatrix")
+            self.tx.connect(f"{decomp_matrix}.outputTranslate", f"{closest_pos}.inPosition")
+
+            self.tx.connect(f"{closest_pos}.result.parameterU", f"{uv_pin}.coordinate[{index}].coordinateU")
+            self.tx.connect(f"{closest_pos}.result.parameterV", f"{uv_pin}.coordinate[{index}].coordinateV")
+            self.tx.connect(f"{uv_pin}.outputMatrix[{index}]", f"{loc}.offsetParentMatrix")
+
+    def make_ik(self):
+        """
+        Spline IK down the chain, and a control with an IK joint at the start, middle and end joints
+        """
+        start, _, end = self.ik_indices()
+        ik = self.tx.run("ikHandle", sol="ikSplineSolver", c=self.curve, ccv=False, roc=True, pcv=True,
+                         sj=self.joints[start], ee=self.joints[end], n=f"{self.name}_ikSplineHandle")
+        self.ik = ik[0]
+        self.tx.add_node(self.ik)
+        self.tx.call("rename", ik[1], f"{self.joints[end]}_effector")
+        self.tx.set_attr(f"{self.ik}.visibility", 0)
+
+        orients = nurbs_eval.matrix_to_euler_xyz(self.rotations)
+        self.ctrls = []
+        self.ctrl_grps = []
+        for index in self.ik_indices():  # 3 Joints that will tweak the spine
+            clone = self.tx.create_node("joint", f"{self.joints[index]}_IK")
+            self.tx.set_attr(f"{clone}.radius", 2.5)
+            self.tx.set_attr(f"{clone}.jointOrient", *orients[index].tolist())
+
+            ctrl = f"{clone}_ctrl"
+            self.tx.call("circle", normal=(0, 1, 0), radius=self.width * 5, name=ctrl)
+            self.tx.add_node(ctrl)
+            grp = self.tx.create_node("transform", f"{clone}_grp")
+            self.tx.call("parent", ctrl, grp)
+            self.tx.call("parent", clone, ctrl)
+            self.tx.set_attr(f"{grp}.translate", *self.positions[index].tolist())  # Everything sat at the origin till now
+            self.ctrls.append(ctrl)
+            self.ctrl_grps.append(grp)
+
+    def make_rails(self):
+        """
+        Rail joint per pinned group, aimed down the groups. Rest orients come from one read of the group matrices
+        """
+        matrices = np.array(self.tx.read(read_world_matrices, self.grps), dtype=np.float64).reshape(-1, 4, 4)
+        positions = matrices[:, 3, :3]
+        frames = aim_frames(positions[:-1], positions[1:], matrices[:-1, 2, :3])
+        translates, orients = local_transforms(np.concatenate([frames, frames[-1:]]), positions)
+
+        end = len(self.joints) - 1
+        self.rails = []
+        for index, joint in enumerate(self.joints):
+            self.tx.set_attr(f"{joint}.drawStyle", 2)
+            rail = self.tx.create_node("joint", f"{self.name}Rail_{index}",
+                                       parent=self.rails[-1] if self.rails else None)
+            self.tx.set_attr(f"{rail}.translate", *translates[index].tolist())
+            self.tx.set_attr(f"{rail}.jointOrient", *orients[index].tolist())
+            self.tx.call("pointConstraint", self.grps[index], rail)
+            if index != end:
+                self.tx.call("aimConstraint", self.grps[index + 1], rail, aim=(1, 0, 0), u=(0, 0, 1),
+                             wut="objectrotation", wu=(0, 0, 1), wuo=self.grps[index])
+            else:  # End of spine connects to neck, so make it follow the orient of chest control
+                self.tx.call("orientConstraint", f"{self.joints[end]}_IK", rail, mo=True)
+            self.rails.append(rail)
+
+    def ik_indices(self):
+        """
+        Returns:
+            tuple[int]: start, middle and end joint, the ones with an IK joint and control
+        """
+        end = len(self.joints) - 1
+        return 0, int(end / 2), end
+
+    def make_stretch(self):
+        """
+        Scales the chain by the curve's length over its rest length, blended by a Stretch attr on the controls
+        """
+        curve_info = self.tx.create_node("curveInfo", f"{self.name}_stretch_curveInfo")
+        self.tx.connect(f"{self.curve}.worldSpace[0]", f"{curve_info}.inputCurve")
+
+        multi_div = self.tx.create_node("multiplyDivide", f"{self.name}_stretch_multiplyDivide")
+        self.tx.set_attr(f"{multi_div}.operation", 2)  # Divide
+        self.tx.connect(f"{curve_info}.arcLength", f"{multi_div}.input1X")
+        self.tx.set_attr(f"{multi_div}.input2X", self.curve_length)  # Rest length, already known
+
+        end_ctrl = self.ctrls[-1]
+        self.tx.call("addAttr", end_ctrl, ln="Stretch", at="float", min=0, max=1, keyable=1)
+        for ctrl in self.ctrls[:-1]:
+            self.tx.call("addAttr", ctrl, ln="Stretch", proxy=f"{end_ctrl}.Stretch", at="float", min=0, max=1,
+                         keyable=1)
+
+        blend = self.tx.create_node("blendColors", f"{self.name}_stretch_blendColors")
+        self.tx.connect(f"{end_ctrl}.Stretch", f"{blend}.blender")
+        self.tx.connect(f"{multi_div}.output.outputX", f"{blend}.color1.color1R")
+        self.tx.connect(f"{multi_div}.input2.input2Y", f"{blend}.color2.color2R")
+
+        for joint in self.joints[:-1]:
+            self.tx.connect(f"{blend}.output.outputR", f"{joint}.scale.scaleX")
+
+    def cleanup(self):
+        """
+        Skins the curve and ribbon to the IK joints and hides the rig internals
+        """
+        ik_joints = [f"{self.joints[index]}_IK" for index in self.ik_indices()]
+        ribbon = f"{self.name}_ribbon"
+        self.tx.call("skinCluster", *ik_joints, self.curve, n=f"{self.curve}Shape_skinCluster")
+        self.tx.call("skinCluster", *ik_joints, ribbon, n=f"{self.surface}_skinCluster")
+
+        # Every spine shares the group, a second one named DO_NOT_TOUCH1 would leave this spine's internals visible
+        hide = self.hide_grp
+        if not self.tx.read(cmds.objExists, hide):
+            self.tx.create_node("transform", hide)
+            self.tx.set_attr(f"{hide}.visibility", 0)
+        locs = [f"{joint}_loc" for joint in self.joints]
+        self.tx.call("parent", self.curve, ribbon, self.ik, *locs, hide)
+        for obj in [self.curve, ribbon, self.ik] + self.grps + locs:
+            self.tx.set_attr(f"{obj}.visibility", 0)
+
+        if self.neck != "":
+            self.tx.call("parent", self.neck, self.rails[-1])
+        grp = self.tx.create_node("transform", f"{self.name}Rail_grp")
+        self.tx.call("parent", self.rails[0], *self.ctrl_grps, grp)
+
+    def report(self):
+        """
+        Returns:
+            str: one line per stage with its time, scene calls and recorded ops, then the totals
+        """
+        lines = [f"{'stage':<8} {'seconds':>9} {'calls':>6} {'ops':>6}"]
+        for stage in self.stages:
+            lines.append(f"{stage['stage']:<8} {stage['seconds']:9.4f} {stage['calls']:>6} {stage['ops']:>6}")
+        lines.append(f"{'total':<8} {sum(s['seconds'] for s in self.stages):9.4f} "
+                     f"{sum(s['calls'] for s in self.stages):>6} {sum(s['ops'] for s in self.stages):>6}")
+        return "\n".join(lines)
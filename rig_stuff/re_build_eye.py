@@ -1,48 +1,138 @@
-import maya.cmds as cmds
+from rig_stuff.build_spec import load_spec
+from rig_stuff.graph_batch import GraphBatch
 
+# Default build, any key can be overridden by a spec dict or JSON file passed to build_eyes()
+SPEC = {
+    "spans": 14,
+    "radius": 4,
+    "compact": False,
+    "lids": [{"name": "Lf_eyelid_upp"}, {"name": "Lf_eyelid_low"},
+             {"name": "Rt_eyelid_upp"}, {"name": "Rt_eyelid_low"}],
+}
 
-def make_eyelid_joints(spans=14, name="", parent=None):
+
+def make_eyelid_joints(spans=14, name="", parent=None, batch=None, radius=4, compact=False):
+    """
+    Makes a joint per span that slides along the lid curve, aimed back at the eye's origin.
+    Nodes, attributes and connections are recorded in a GraphBatch and committed in one pass.
+
+    Args:
+        spans (int): number of spans on the lid curve, one joint is made per inner span
+        name (str): name of the lid, "Lf_eyelid_upp"
+        parent (str): group at the eye's origin, defaults to "Lf_eyelid_grp" style name from the lid name
+        batch (GraphBatch): batch to record into. If None, a batch is made and committed right away
+        radius (float): distance of the joints from the eye's origin
+        compact (bool): if True, builds the compact network, see make_eyelid_joint_compact
+
+    Returns:
+        list[str]: joints made
+    """
     parent_grp = parent
     if parent is None:
         parent_grp = name[:-3].strip() + "grp"
 
+    commit = batch is None
+    if commit:
+        batch = GraphBatch(f"{name}_eyelid_joints")
+
+    radius_attr = None
+    if compact:
+        # One radius on the eye group drives every joint of the lid, "uppRadius"
+        radius_attr = f"{parent_grp}.{name.rpartition('_')[2]}Radius"
+        batch.call("addAttr", parent_grp, ln=radius_attr.rpartition(".")[2], at="double", dv=radius, k=1)
+
+    joints = []
     for i in range(1, spans):
         z_padded = str(i).rjust(2, '0')
         curve = f"{name}_curveShape"
         jnt = f"{name}_jnt_{z_padded}"
         poc_info = f"{name}_pointOnCurveInfo_{z_padded}"
-        vctr_prod = f"{name}_vectorProduct_{z_padded}"
-        multi_div = f"{name}_multiplyDivide_{z_padded}"
 
-        cmds.joint(name=jnt, radius=0.25)
-        cmds.parent(jnt, parent_grp)
+        batch.create_node('joint', jnt, parent=parent_grp)
+        batch.set_attr(f"{jnt}.radius", 0.25)
 
-        cmds.createNode('pointOnCurveInfo', name=poc_info)
+        batch.create_node('pointOnCurveInfo', poc_info)
 
-        cmds.connectAttr(f"{curve}.local", f"{poc_info}.inputCurve")
+        batch.connect(f"{curve}.local", f"{poc_info}.inputCurve")
 
         parameter = float(i) / float(spans)
-        cmds.setAttr(f"{poc_info}.parameter", parameter)
-        cmds.setAttr(f"{poc_info}.turnOnPercentage", 1)
+        batch.set_attr(f"{poc_info}.parameter", parameter)
+        batch.set_attr(f"{poc_info}.turnOnPercentage", 1)
+
+        if compact:
+            make_eyelid_joint_compact(batch, jnt, poc_info, radius_attr, f"{name}_aimMatrix_{z_padded}")
+        else:
+            make_eyelid_joint_legacy(batch, jnt, poc_info, parent_grp, radius, name, z_padded)
+        joints.append(jnt)
+
+    if commit:
+        batch.commit()
+    return joints
+
+
+def make_eyelid_joint_legacy(batch, jnt, poc_info, parent_grp, radius, name, z_padded):
+    """
+    Normalizes the curve position, scales it by radius, then aims the joint back at the origin.
+    3 nodes per joint on top of the pointOnCurveInfo
+    """
+    vctr_prod = f"{name}_vectorProduct_{z_padded}"
+    multi_div = f"{name}_multiplyDivide_{z_padded}"
+
+    batch.create_node('vectorProduct', vctr_prod)
+    batch.set_attr(f"{vctr_prod}.operation", 0)
+    batch.set_attr(f"{vctr_prod}.normalizeOutput", 1)
+
+    batch.create_node('multiplyDivide', multi_div)
+    batch.set_attr(f"{multi_div}.input2", radius, radius, radius)
+
+    batch.connect(f"{poc_info}.result.position", f"{vctr_prod}.input1")
+    batch.connect(f"{vctr_prod}.output", f"{multi_div}.input1")
+    batch.connect(f"{multi_div}.output", f"{jnt}.translate")  # Joints same distance from parent origin
+
+    # aim at parent origin (without pointing backward relative to world)
+    batch.call("aimConstraint", parent_grp, jnt, aim=[0, 0, -1], wut="objectrotation", wuo=parent_grp)
+
+
+def make_eyelid_joint_compact(batch, jnt, poc_info, radius_attr, aim_matrix):
+    """
+    One aimMatrix at the eye's origin aligns +Z with the curve position and keeps Y up to the eye group.
+    The joint sits radius down that +Z, so it ends up where the legacy network puts it, already facing the origin.
+    1 node per joint on top of the pointOnCurveInfo, needs Maya 2020+
+    """
+    batch.create_node('aimMatrix', aim_matrix)
+    batch.set_attr(f"{aim_matrix}.primaryInputAxis", 0, 0, 1)
+    batch.set_attr(f"{aim_matrix}.primaryMode", 2)  # Align
+    batch.set_attr(f"{aim_matrix}.secondaryInputAxis", 0, 1, 0)
+    batch.set_attr(f"{aim_matrix}.secondaryMode", 2)
+    batch.set_attr(f"{aim_matrix}.secondaryTargetVector", 0, 1, 0)
+
+    # Eye origin is the parent's origin, so the curve position is also the direction to aim along
+    batch.connect(f"{poc_info}.result.position", f"{aim_matrix}.primaryTargetVector")
+    batch.connect(f"{aim_matrix}.outputMatrix", f"{jnt}.offsetParentMatrix")
+    batch.connect(radius_attr, f"{jnt}.translateZ")
 
-        cmds.createNode('vectorProduct', name=vctr_prod)
-        cmds.setAttr(f"{vctr_prod}.operation", 0)
-        cmds.setAttr(f"{vctr_prod}.normalizeOutput", 1)
 
-        cmds.createNode('multiplyDivide', name=multi_div)
-        cmds.setAttr(f"{multi_div}.input2X", 4)
-        cmds.setAttr(f"{multi_div}.input2Y", 4)
-        cmds.setAttr(f"{multi_div}.input2Z", 4)
+def build_eyes(spec=None):
+    """
+    Builds the joints of every lid in the spec in one GraphBatch commit
 
-        cmds.connectAttr(f"{poc_info}.result.position", f"{vctr_prod}.input1")
-        cmds.connectAttr(f"{vctr_prod}.output", f"{multi_div}.input1")
-        cmds.connectAttr(f"{multi_div}.output", f"{jnt}.translate")  # Joints same distance from parent origin
+    Args:
+        spec (dict or str): {"spans", "radius", "compact", "lids": [make_eyelid_joints kwargs]},
+            or a path to the same as JSON. Lids can override spans, radius and compact. Missing keys fall back to SPEC
 
-        # aim at parent origin (without pointing backward relative to world)
-        cmds.aimConstraint(parent_grp, jnt, mo=False, aim=[0, 0, -1], wut="objectrotation", wuo=parent_grp)
+    Returns:
+        list[str]: joints made
+    """
+    spec = load_spec(spec, SPEC)
+    batch = GraphBatch("eyelid_joints")
+    joints = []
+    for lid in spec["lids"]:
+        kwargs = {"spans": spec["spans"], "radius": spec["radius"], "compact": spec["compact"]}
+        kwargs.update(lid)
+        joints += make_eyelid_joints(batch=batch, **kwargs)
+    batch.commit()
+    return joints
 
 
-make_eyelid_joints(name="Lf_eyelid_upp")
-make_eyelid_joints(name="Lf_eyelid_low")
-make_eyelid_joints(name="Rt_eyelid_upp")
-make_eyelid_joints(name="Rt_eyelid_low")
+if __name__ == "__main__":
+    build_eyes()
@@ -1,11 +1,37 @@
-import maya.cmds as cmds
+from rig_stuff.build_spec import load_spec
+from rig_stuff.lazy_cmds import cmds
+
+# Default build, any key can be overridden by a spec dict or JSON file passed to build_mouth()
+SPEC = {
+    "surface": "my_surfaceShape",
+    "lips": [
+        {"name": "lip_Rt_corner_07", "z_padding": False},
+        {"name": "upp_lip_Rt", "spans": 6},
+        {"name": "upp_lip_mid_00", "z_padding": False},
+        {"name": "upp_lip_Lf", "spans": 6},
+        {"name": "lip_Lf_corner_07", "z_padding": False},
+        {"name": "low_lip_Rt", "spans": 6},
+        {"name": "low_lip_mid_00", "z_padding": False},
+        {"name": "low_lip_Lf", "spans": 6},
+    ],
+}
 
 
 # TODO: function to initializes locators, user manually places them then runs the following function
 
-def make_lip_joints(spans=1,name="", surface="my_surfaceShape", z_padding=True):
+def make_lip_joints(spans=1,name="", surface="my_surfaceShape", z_padding=True, keep=None):
+    """
+    Args:
+        spans (int): number of lip joints
+        name (str): name of the lip, "upp_lip_Rt"
+        surface (str): NURBS surface shape the joints ride on
+        z_padding (bool): if False, names have no number, for single joints like corners
+        keep (list[int]): only build these joints, numbered from 1. Pick them with solve_lip_frames first
+    """
 
     for i in range(1, spans+1):
+        if keep is not None and i not in keep:
+            continue
         if z_padding is False:
             z_padded = ""
         else:
@@ -13,6 +39,7 @@ def make_lip_joints(spans=1,name="", surface="my_surfaceShape", z_padding=True):
 
         pma_add = cmds.createNode('plusMinusAverage', name=f"{name}_pma_add{z_padded}")
         pos_info = cmds.createNode('pointOnSurfaceInfo', name=f"{name}_vectorProduct{z_padded}")
+        cmds.connectAttr(f"{surface}.local", f"{pos_info}.inputSurface")
         cmds.connectAttr(f"{pma_add}.output2Dx", f"{pos_info}.parameterU")
         cmds.connectAttr(f"{pma_add}.output2Dy", f"{pos_info}.parameterV")
 
@@ -53,17 +80,83 @@ def make_lip_joints(spans=1,name="", surface="my_surfaceShape", z_padding=True):
         cmds.connectAttr(f"{decomp_matrx}.outputRotateY", f"{lip_jnt}.rotateY")
         cmds.connectAttr(f"{decomp_matrx}.outputRotateZ", f"{lip_jnt}.rotateZ")
 
-make_lip_joints(name="lip_Rt_corner_07", z_padding=False)
 
-make_lip_joints(spans=6, name="upp_lip_Rt")
-make_lip_joints(name="upp_lip_mid_00", z_padding=False)
-make_lip_joints(spans=6, name="upp_lip_Lf")
+def solve_lip_frames(surface, u, v, data=None):
+    """
+    Offline version of the lip joint network for layout and previews. Evaluates every (u, v) on the surface
+    in one NumPy batch, giving the same frame the pointOnSurfaceInfo -> fourByFourMatrix -> decomposeMatrix
+    chain would, without making any nodes.
+
+    Args:
+        surface (str): NURBS surface shape
+        u (list[float]): (N,) U parameters, same as pointOnSurfaceInfo.parameterU
+        v (list[float]): (N,) V parameters
+        data (dict): surface data from nurbs_eval.get_surface_data, saves reading the surface again
+
+    Returns:
+        dict: {"position": (N, 3), "matrix": (N, 4, 4) fourByFourMatrix outputs, "rotate": (N, 3) euler degrees}
+    """
+    import numpy as np
+
+    from rig_stuff import nurbs_eval
+
+    data = data or nurbs_eval.get_surface_data(surface)
+    frame = nurbs_eval.eval_surface(data, u, v)
+
+    matrix = np.zeros((len(frame["position"]), 4, 4))
+    matrix[:, 0, :3] = nurbs_eval.normalize(frame["du"])  # Normalized Tangent U Corresponds to X-axis
+    matrix[:, 1, :3] = nurbs_eval.normalize(frame["dv"])  # Normalized Tangent V Corresponds to Y-axis
+    matrix[:, 2, :3] = nurbs_eval.normalize(np.cross(frame["du"], frame["dv"]))  # Normal to Z-axis
+    matrix[:, 3, :3] = frame["position"]
+    matrix[:, 3, 3] = 1.0
+    return {"position": frame["position"], "matrix": matrix, "rotate": nurbs_eval.matrix_to_euler_xyz(matrix)}
+
+
+def check_lip_frames(surface, u, v, frames=None):
+    """
+    Compares solve_lip_frames against a live pointOnSurfaceInfo, reusing one temporary node for every sample
+
+    Args:
+        surface (str): NURBS surface shape
+        u (list[float]): (N,) U parameters
+        v (list[float]): (N,) V parameters
+        frames (dict): result of solve_lip_frames, solved here if None
+
+    Returns:
+        dict: largest {"position", "tangentU", "tangentV", "normal"} difference over the samples
+    """
+    frames = frames or solve_lip_frames(surface, u, v)
+    pos_info = cmds.createNode('pointOnSurfaceInfo', name="check_lip_frames_pointOnSurfaceInfo")
+    cmds.connectAttr(f"{surface}.local", f"{pos_info}.inputSurface")
+    rows = {"position": 3, "tangentU": 0, "tangentV": 1, "normal": 2}
+    attrs = {"position": "position", "tangentU": "normalizedTangentU",
+             "tangentV": "normalizedTangentV", "normal": "normalizedNormal"}
+    error = dict.fromkeys(rows, 0.0)
+    try:
+        for index, (param_u, param_v) in enumerate(zip(u, v)):
+            cmds.setAttr(f"{pos_info}.parameterU", param_u)
+            cmds.setAttr(f"{pos_info}.parameterV", param_v)
+            for key, attr in attrs.items():
+                live = cmds.getAttr(f"{pos_info}.{attr}")[0]
+                offline = frames["matrix"][index, rows[key], :3]
+                error[key] = max(error[key], max(abs(a - b) for a, b in zip(live, offline)))
+    finally:
+        cmds.delete(pos_info)
+    return error
+
+
+def build_mouth(spec=None):
+    """
+    Builds the lip joints of every lip in the spec on the spec's surface
+
+    Args:
+        spec (dict or str): {"surface": str, "lips": [make_lip_joints kwargs]}, or a path to the same as JSON.
+            Missing keys fall back to SPEC
+    """
+    spec = load_spec(spec, SPEC)
+    for lip in spec["lips"]:
+        make_lip_joints(surface=spec["surface"], **lip)
 
-make_lip_joints(name="lip_Lf_corner_07", z_padding=False)
-
-make_lip_joints(spans=6, name="low_lip_Rt")
-make_lip_joints(name="low_lip_mid_00", z_padding=False)
-make_lip_joints(spans=6, name="low_lip_Lf")
 
 # TODO: constrain lip joints to the jaw, set up guide node. Then delete locators
 
@@ -71,3 +164,6 @@ make_lip_joints(spans=6, name="low_lip_Lf")
 #for joint in cmds.ls(selection=True):
     #cmds.parentConstraint('low_jnt', 'jaw_jnt', joint, maintainOffset=True)
 
+
+if __name__ == "__main__":
+    build_mouth()
@@ -1,4 +1,15 @@
-import maya.cmds as cmds
+from rig_stuff.build_spec import load_spec
+from rig_stuff.graph_batch import GraphBatch
+from rig_stuff.hierarchy import get_hierarchy, hierarchy_scope
+from rig_stuff.lazy_cmds import cmds, mel
+
+# Default build, any key can be overridden by a spec dict or JSON file passed to build()
+SPEC = {
+    "collars": [{"crv": "Collar_curve", "collider": "Neck_collusion_geo", "exclude": "front", "jnt": True}],
+    "rail_spines": [{"j": "C_Spine_0", "name": "C_Spine", "neck": "C_Neck", "stretch": True, "width": 4}],
+    "builder": False,  # True builds rail spines with RailSpineBuilder, one transaction with stage timings.
+    # It has only been run on the fake cmds so far, keep setup_rail_spine as the default until checked in Maya
+}
 
 
 def get_jnt_children(j):
@@ -7,12 +18,14 @@ def get_jnt_children(j):
 
 
 def get_jnt_heirarchy(j):
-    cmds.select(cl=True)
-    cmds.select(j, toggle=True)
-    joints = [j] + cmds.listRelatives(allDescendents=True, type='joint')
-    cmds.select(cl=True)
-    joints.sort()
-    return joints
+    """
+    Args:
+        j: top joint in hierarchy
+
+    Returns:
+        list[str]: j and every joint under it, depth first. Cached for the build inside a hierarchy_scope
+    """
+    return list(get_hierarchy(j).names)
 
 
 def clear_orients(j):
@@ -22,60 +35,98 @@ def clear_orients(j):
 
 
 def jnt_chain_pos(j):
-    pos = [cmds.xform(j, q=True, t=True, ws=True)]
-    children = get_jnt_children(j)
-    for child in children:
-        pos.extend(jnt_chain_pos(child))
-    return pos
+    """
+    Args:
+        j: top joint in hierarchy
+
+    Returns:
+        list[list[float]]: world position of j and every joint under it, depth first
+    """
+    return [list(pos) for pos in get_hierarchy(j).positions]
+
+
+def get_excluded_cvs(positions, exclude):
+    """
+    Resolves exclude to CV indices from one read of the CV positions, no scene calls
+
+    Args:
+        positions (list[tuple]): local CV positions in CV order
+        exclude: "front" or "back" for the centre CV (x == 0) with the highest or lowest z,
+            list of CV indices, or a single CV index. Negative indices count from the end
+
+    Returns:
+        set[int]: CV indices to skip
+    """
+    if not exclude and exclude != 0:
+        return set()
+    if isinstance(exclude, str):
+        if exclude not in ("front", "back"):
+            raise ValueError('Invalid string. Enter either \"front\" or  \"back\" to exclude')
+        center_cvs = [i for i, pos in enumerate(positions) if pos[0] == 0.0]
+        if not center_cvs:
+            return set()
+        pick = max if exclude == "front" else min
+        return {pick(center_cvs, key=lambda i: positions[i][2])}  # Excluding front or back CV
+    if isinstance(exclude, int):
+        exclude = [exclude]
+    if isinstance(exclude, list):
+        count = len(positions)
+        for e in exclude:
+            if not -count <= e < count:  # Negative counts from the end, like a list index
+                raise IndexError(f"Can't exclude CV {e}, the curve has {count} CVs")
+        return {e % count for e in exclude}
+    raise ValueError('Use str \"front\", \"back\", or list of CVs as ints, or single cv as an int')
 
 
 def crv_to_clusters(crv="", exclude=None):
-    clusters = []
-    cvs = cmds.ls(f'{crv}.cv[:]', fl=True)  # Get all CVs from curve
-
-    if exclude:  # CVs you want to ignore
-        if isinstance(exclude, str):
-            center_cvs = [cv for cv in cvs if cmds.getAttr(cv)[0][0] == 0.0]
-            center_cvs_z = [cmds.getAttr(cv)[0][2] for cv in center_cvs]
-
-            if exclude == "front" or exclude == "back":
-                if exclude == "front":
-                    cvs.remove(center_cvs[center_cvs_z.index(max(center_cvs_z))])  # Excluding front CV
-
-                elif exclude == "back":
-                    cvs.remove(center_cvs[center_cvs_z.index(min(center_cvs_z))])  # Excluding back CV
-
-                else:
-                    raise ValueError('Invalid string. Enter either \"front\" or  \"back\" to exclude')
-        elif isinstance(exclude, list):
-            for e in exclude:
-                cvs.remove(cvs[e])
-        elif isinstance(exclude, int):
-            cvs.remove(exclude)
-        else:
-            raise ValueError('Use str \"front\", \"back\", or list of CVs as ints, or single cv as an int')
-
-    if cvs:  # Check if we found any cvs
-        padding = len(str(cvs.index(cvs[-1])))
-        for cv in cvs:
-            z_padded = f"{str(cvs.index(cv)).rjust(padding, '0')}"
-            n = f"{str(crv.partition('_')[0])}_cluster_{z_padded}"
-            clust = cmds.cluster(cv, name=f"{n}")  # Create cluster on a cv
-            grp = cmds.group(em=True, name=f"{n}_grp")
-            cmds.matchTransform(grp, clust)
-            cmds.parent(clust, grp)
-            clusters.append(grp)
-        grp = cmds.group(em=True, name=f"{crv.partition('_')[0]}_cluster_grp")
-        cmds.parent(clusters, grp)
-        clusters.sort()
-    else:
+    """
+    Makes a cluster per CV, each under a group at its CV, all under one "<prefix>_cluster_grp".
+    CVs are read with one bulk query and every cluster and group is made in one GraphBatch commit.
+
+    Args:
+        crv (str): curve to cluster, named "<prefix>_..."
+        exclude: CVs to skip, see get_excluded_cvs
+
+    Returns:
+        list[str]: groups of the clusters, sorted
+    """
+    positions = cmds.getAttr(f'{crv}.cv[*]') or []  # Local positions of every CV
+    if not positions:
         cmds.warning('Found no CVs!')
+        return []
+    world = cmds.xform(f'{crv}.cv[*]', q=True, ws=True, t=True)
+
+    skip = get_excluded_cvs(positions, exclude)
+    cvs = [i for i in range(len(positions)) if i not in skip]
+    if not cvs:
+        cmds.warning('Found no CVs!')
+        return []
+
+    prefix = crv.partition('_')[0]
+    padding = len(str(len(cvs) - 1))
+    top_grp = f"{prefix}_cluster_grp"
+    batch = GraphBatch(f"{prefix}_crv_to_clusters")
+    batch.create_node("transform", top_grp)
+
+    clusters = []
+    for index, cv in enumerate(cvs):
+        n = f"{prefix}_cluster_{str(index).rjust(padding, '0')}"
+        grp = batch.create_node("transform", f"{n}_grp", parent=top_grp)
+        batch.set_attr(f"{grp}.translate", *world[cv * 3:cv * 3 + 3])  # Group sits on its CV
+        batch.call("cluster", f"{crv}.cv[{cv}]", name=n)  # Create cluster on a cv
+        clusters.append(grp)
+
+    # Handles keep their world position, so one parent per group puts every cluster under its group
+    for grp in clusters:
+        batch.call("parent", f"{grp[:-len('_grp')]}Handle", grp)
+    batch.commit()
+
+    clusters.sort()
     return clusters
 
 
 def crv_collide_with_geo(clusters, collider=""):
     cmds.select(collider, r=True)
-    import maya.mel as mel
     mel.eval("cMuscle_makeMuscle(0);")
     cmds.select(clusters, r=True)
     mel.eval("cMuscle_rigKeepOutSel()")
@@ -101,13 +152,28 @@ def crv_collide_with_geo(clusters, collider=""):
     cmds.select(cl=True)
 
 
-def crv_cluster_collusion(crv, collider, exclude=None, jnt=True):
+def crv_cluster_collusion(crv, collider, exclude=None, jnt=True, collision="cmuscle", frames=None):
+    """
+    Args:
+        collision (str): "cmuscle" for live keepOut nodes, "bake" to key the pushed clusters over frames
+            with rig_stuff.keep_out against the collider at every frame, no per frame collision cost once baked
+        frames (list[float]): frames to bake, the playback range if None
+    """
     clusters = crv_to_clusters(crv=crv, exclude=exclude)
-    crv_collide_with_geo(clusters=clusters, collider=collider)
+    if collision == "bake":
+        from rig_stuff.keep_out import bake_keep_out
+
+        # The neck the collar sits on is skinned or animated, so sample it every frame
+        bake_keep_out(clusters, collider, frames=frames, deforming=True)
+    else:
+        crv_collide_with_geo(clusters=clusters, collider=collider)
 
     if jnt:
+        from rig_stuff.arc_length import equidistant_params
+
         name = crv.partition("_")[0]
         offsets = []
+        params = equidistant_params(crv, len(clusters), closed=True)  # Equal spacing along the collar
         for index, c in enumerate(clusters):
             padding = len(str(clusters.index(clusters[-1])))
             z_padded = f"{str(index).rjust(padding, '0')}"
@@ -123,9 +189,8 @@ def crv_cluster_collusion(crv, collider, exclude=None, jnt=True):
             cmds.createNode('pointOnCurveInfo', name=poc_info)
             cmds.connectAttr(f"{crv}.local", f"{poc_info}.inputCurve")
 
-            parameter = float(index) / float(len(clusters))
-            cmds.setAttr(f"{poc_info}.parameter", parameter)
-            cmds.setAttr(f"{poc_info}.turnOnPercentage", 1)
+            cmds.setAttr(f"{poc_info}.parameter", params[index])
+            cmds.setAttr(f"{poc_info}.turnOnPercentage", 0)
             cmds.connectAttr(f"{poc_info}.position", f"{offset}.translate")
 
         grp = cmds.group(em=True, name=f"{name}_grp")
@@ -154,15 +219,13 @@ def jnt_chain_to_crv(j="", smooth=True, name="curve"):
     crv = cmds.curve(n=f'{name}_curve', d=1, p=joints)
     shape = cmds.rename(cmds.listRelatives(crv, c=True, shapes=True)[0], f'{name}_curveShape')
     if smooth is True:
-        cmds.rebuildCurve(crv, rt=0, s=len(get_jnt_heirarchy(j)) - 1, kr=0, ch=0)  # Smooth curve - optional
+        cmds.rebuildCurve(crv, rt=0, s=len(joints) - 1, kr=0, ch=0)  # Smooth curve - optional
     return shape
 
 
 def jnt_chain_distr_on_crv(j="", crv="", rebuild_chain=False):
-    # TODO figure out way to make joints more equidistant from each other
-
     """
-    Attempts to evenly distribute joints along an existing curve
+    Evenly distributes joints along an existing curve, equal arc length apart
     Args:
         j: top joint in hierarchy. Best if its children are only the joints you want on the curve
         crv: the curve to distribute existing joints along
@@ -187,14 +250,16 @@ def jnt_chain_distr_on_crv(j="", crv="", rebuild_chain=False):
             clear_orients(joint)
         clear_orients(joint)
 
+    from rig_stuff.arc_length import equidistant_params
+
+    params = equidistant_params(crv, len(joints))
     for index, joint in enumerate(joints):
         poc_info = f"{joint}_pointOnCurveInfo"
         cmds.createNode('pointOnCurveInfo', name=poc_info)
         cmds.connectAttr(f"{crv}.local", f"{poc_info}.inputCurve")
 
-        parameter = float(index) / float(len(joints) - 1)
-        cmds.setAttr(f"{poc_info}.parameter", parameter)
-        cmds.setAttr(f"{poc_info}.turnOnPercentage", 1)
+        cmds.setAttr(f"{poc_info}.parameter", params[index])
+        cmds.setAttr(f"{poc_info}.turnOnPercentage", 0)
         cmds.connectAttr(f"{poc_info}.position", f"{joint}.translate")
 
     if rebuild_chain is True:
@@ -218,6 +283,7 @@ def jnt_chain_distr_on_crv(j="", crv="", rebuild_chain=False):
             cmds.delete(world_up)
 
 
+@hierarchy_scope()
 def jnt_chain_to_surface(j, name="", width=4):
     """
     Creates surface that can be used for ribbon from an existing joint chain
@@ -248,6 +314,7 @@ def jnt_chain_to_surface(j, name="", width=4):
     return [shape_surface, shape_curve]
 
 
+@hierarchy_scope()
 def setup_ribbon_base(j="", name="", follow_jnts=True, width=4, loc_shape=False):
     """
     Makes a ribbon from a chain of joints, and distributes transform nodes to follow the ribbon using uv pin
@@ -255,7 +322,9 @@ def setup_ribbon_base(j="", name="", follow_jnts=True, width=4, loc_shape=False)
     Args:
         j: top joint in hierarchy. Best if its children are only the joints you want on the surface
         name: name of the chain
-        follow_jnts: True if you want the groups to more closely match the source joint chain's behavior
+        follow_jnts: True if you want the groups to more closely match the source joint chain's behavior.
+            "bake" solves the same closest points once, at the current pose, and sets them as static coordinates
+            instead of a closestPointOnSurface and decomposeMatrix per joint
         width: width of the resulting ribbon curve
         loc_shape: whether you want to see locator shape where the transform groups are made
 
@@ -267,6 +336,20 @@ def setup_ribbon_base(j="", name="", follow_jnts=True, width=4, loc_shape=False)
     shape = ribbon[0]
     joints = get_jnt_heirarchy(j)
 
+    if not follow_jnts:
+        from rig_stuff.arc_length import ArcLengthCache
+
+        # rebuildSurface moved U away from the source curve's parameters, so space along the ribbon's own
+        # middle isoparm. Its parameters are the ribbon's U, uvPin wants them normalized 0 to 1
+        iso = cmds.duplicateCurve(f"{shape}.v[0.5]", ch=0, name=f"{name}_ribbon_isoparm")[0]
+        params = ArcLengthCache().equidistant_params(iso, len(joints))  # Own cache, the isoparm is deleted next
+        cmds.delete(iso)
+        params_u = (params - params[0]) / (params[-1] - params[0])
+    elif follow_jnts == "bake":
+        from rig_stuff.closest_surface import solve_pin_coordinates
+
+        pinned = solve_pin_coordinates(shape, joints)
+
     uv_pin = cmds.createNode("uvPin", name=f"{ribbon[0]}_uvPin")
     cmds.connectAttr(f"{shape}.worldSpace[0]", f"{uv_pin}.deformedGeometry")
 
@@ -283,7 +366,10 @@ def setup_ribbon_base(j="", name="", follow_jnts=True, width=4, loc_shape=False)
         cmds.parent(grp, loc)
         grps.append(grp)
 
-        if follow_jnts:
+        if follow_jnts == "bake":
+            cmds.setAttr(f"{uv_pin}.coordinate[{index}].coordinateU", pinned["u"][index])
+            cmds.setAttr(f"{uv_pin}.coordinate[{index}].coordinateV", pinned["v"][index])
+        elif follow_jnts:
             closest_pos = cmds.createNode("closestPointOnSurface", name=f"{joint}_closestPointOnSurface")
             cmds.connectAttr(f"{shape}.worldSpace[0]", f"{closest_pos}.inputSurface")
 
@@ -294,8 +380,7 @@ def setup_ribbon_base(j="", name="", follow_jnts=True, width=4, loc_shape=False)
             cmds.connectAttr(f"{closest_pos}.result.parameterU", f"{uv_pin}.coordinate[{index}].coordinateU")
             cmds.connectAttr(f"{closest_pos}.result.parameterV", f"{uv_pin}.coordinate[{index}].coordinateV")
         else:
-            param_u = float(index) / float(len(joints) - 1)
-            cmds.setAttr(f"{uv_pin}.coordinate[{index}].coordinateU", param_u)
+            cmds.setAttr(f"{uv_pin}.coordinate[{index}].coordinateU", params_u[index])
             cmds.setAttr(f"{uv_pin}.coordinate[{index}].coordinateV", 0.5)
 
         cmds.connectAttr(f"{uv_pin}.outputMatrix[{index}]", f"{loc}.offsetParentMatrix")
@@ -312,7 +397,8 @@ def setup_ik_spline(jnt_a, jnt_b, name, crv):
     return ik
 
 
-# TODO: in future, move this to a class
+# RailSpineBuilder in rig_stuff/rail_spine.py is the class version, without the throwaway constraints
+@hierarchy_scope()
 def setup_rail_spine(j="", name="", neck="", stretch=True, width=4):
     """
     Sets up a rail spine as demonstrated by Perry Leijten
@@ -422,5 +508,26 @@ def setup_rail_spine(j="", name="", neck="", stretch=True, width=4):
     cmds.parent(ctrl_grps, grp)
 
 
-crv_cluster_collusion(crv="Collar_curve", collider="Neck_collusion_geo", exclude="front", jnt=True)
-setup_rail_spine(j='C_Spine_0', name="C_Spine", neck="C_Neck", stretch=True, width=4)
\ No newline at end of file
+@hierarchy_scope()
+def build(spec=None):
+    """
+    Builds every collar collision and rail spine in the spec
+
+    Args:
+        spec (dict or str): {"collars": [crv_cluster_collusion kwargs], "rail_spines": [setup_rail_spine kwargs],
+            "builder": bool}, or a path to the same as JSON. Missing keys fall back to SPEC
+    """
+    spec = load_spec(spec, SPEC)
+    for collar in spec["collars"]:
+        crv_cluster_collusion(**collar)
+    for rail_spine in spec["rail_spines"]:
+        if spec["builder"]:
+            from rig_stuff.rail_spine import RailSpineBuilder
+
+            print(RailSpineBuilder(**rail_spine).build().report())
+        else:
+            setup_rail_spine(**rail_spine)
+
+
+if __name__ == "__main__":
+    build()
@@ -0,0 +1,38 @@
+'''
+Module level caches that hold scene names or plugs register here to be emptied when the scene they came from goes away
+'''
+
+SCENE_EVENTS = ("SceneOpened", "NewSceneOpened")
+
+_callback_ids = {}  # clear function -> [callback ids]
+
+
+def clear_on_scene_change(func):
+    """
+    Calls func after every scene new and open. Registering the same func again does nothing,
+    so caches can call this each time they fill
+
+    Args:
+        func (callable): takes no arguments, usually a cache's clear
+
+    Returns:
+        bool: True if func is registered, False without OpenMaya, e.g. fake cmds
+    """
+    if func not in _callback_ids:
+        try:
+            import maya.api.OpenMaya as om
+        except ImportError:
+            _callback_ids[func] = []  # Only tried once, caches fill in tight loops
+        else:
+            _callback_ids[func] = [om.MEventMessage.addEventCallback(event, lambda *args: func())
+                                   for event in SCENE_EVENTS]
+    return bool(_callback_ids[func])
+
+
+def remove_callbacks():
+    import maya.api.OpenMaya as om
+
+    for ids in _callback_ids.values():
+        if ids:
+            om.MMessage.removeCallbacks(ids)
+    _callback_ids.clear()
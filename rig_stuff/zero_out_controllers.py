@@ -2,22 +2,106 @@
 Zeroes out selected controllers keyable attributes, if they are in the defined controller set...
 '''
 
-import maya.cmds as cmds
-
-# First define the set with the character's controls
-ctrls_list = cmds.listConnections("Controls_Set" + '.dagSetMembers')
-# Get what is selected, only if visible
-selection = cmds.ls(sl=True, v=True)
-
-# If selection items ARE in the controls set, zero the keyable attributes
-if not set(selection).isdisjoint(set(ctrls_list)):
-    for obj in selection:
-        keyable = cmds.listAttr(obj, keyable=1, unlocked=1, settable=1)
-        for attr in keyable:
-            default = cmds.attributeQuery(attr, node=obj, listDefault=1)
-            if cmds.getAttr(obj + "." + attr, settable=1) != 0:
-                cmds.setAttr(obj + "." + attr, default[0])
-
-        print (f"{obj} has been zeroed out!")
-else:
-    cmds.warning("Sorry! Make sure your selection is only visible controllers.")
\ No newline at end of file
+from rig_stuff.lazy_cmds import cmds
+from rig_stuff.scene_callbacks import clear_on_scene_change
+
+# Compound attributes that can be read with one getAttr instead of three
+COMPOUNDS = {"translate": ("translateX", "translateY", "translateZ"),
+             "rotate": ("rotateX", "rotateY", "rotateZ"),
+             "scale": ("scaleX", "scaleY", "scaleZ")}
+
+# (node type, attr) -> default, filled once per scene. Dynamic attrs are keyed by node instead
+_defaults = {}
+
+
+def get_default(obj, attr, node_type, user_defined=()):
+    """
+    Args:
+        obj (str): node name
+        attr (str): attribute name
+        node_type (str): type of the node, static attributes share defaults across it
+        user_defined (set): user defined attributes of the node, their defaults can differ per node
+
+    Returns:
+        float: default value of the attribute
+    """
+    key = (obj if attr in user_defined else node_type, attr)
+    if key not in _defaults:
+        clear_on_scene_change(clear_default_cache)  # Node keyed defaults would go stale with the scene
+        default = cmds.attributeQuery(attr, node=obj, listDefault=1)
+        _defaults[key] = default[0] if default else 0
+    return _defaults[key]
+
+
+def clear_default_cache():
+    _defaults.clear()
+
+
+def get_keyable_values(obj, keyable):
+    """
+    Reads keyable attributes, pulling translate/rotate/scale as one compound each
+
+    Args:
+        obj (str): node name
+        keyable (list[str]): keyable, unlocked, settable attributes of the node
+
+    Returns:
+        dict: {attr: value}
+    """
+    values = {}
+    remaining = set(keyable)
+    for compound, children in COMPOUNDS.items():
+        if remaining.issuperset(children):
+            values.update(zip(children, cmds.getAttr(f"{obj}.{compound}")[0]))
+            remaining.difference_update(children)
+    for attr in keyable:
+        if attr in remaining:
+            values[attr] = cmds.getAttr(f"{obj}.{attr}")
+    return values
+
+
+def zero_out(objs):
+    """
+    Resets keyable, unlocked, settable attributes of objs to their defaults in one undo chunk.
+    Attributes that are already at their default are left alone.
+
+    Args:
+        objs (list[str]): controllers to reset
+
+    Returns:
+        dict: {"checked": attrs looked at, "changed": attrs set, "skipped": attrs already at default}
+    """
+    counts = {"checked": 0, "changed": 0, "skipped": 0}
+    cmds.undoInfo(openChunk=True, chunkName="zero_out_controllers")
+    try:
+        for obj in objs:
+            keyable = cmds.listAttr(obj, keyable=1, unlocked=1, settable=1) or []
+            if not keyable:
+                continue
+            node_type = cmds.nodeType(obj)
+            user_defined = set(cmds.listAttr(obj, userDefined=1) or [])
+            values = get_keyable_values(obj, keyable)
+            for attr in keyable:
+                counts["checked"] += 1
+                default = get_default(obj, attr, node_type, user_defined)
+                if values[attr] == default:
+                    counts["skipped"] += 1
+                    continue
+                cmds.setAttr(f"{obj}.{attr}", default)
+                counts["changed"] += 1
+    finally:
+        cmds.undoInfo(closeChunk=True)
+    return counts
+
+
+if __name__ == "__main__":
+    from rig_stuff.control_sets import get_index
+
+    # Only the selected objects that are in a character's controls set, only if visible
+    ctrls = get_index().filter(cmds.ls(sl=True, v=True))
+
+    if ctrls:
+        result = zero_out(ctrls)
+        print(f"{len(ctrls)} controls zeroed out! {result}")
+    else:
+        cmds.warning("Sorry! Make sure your selection is only visible controllers.")
@@ -0,0 +1,188 @@
+import os
+import threading
+from collections import OrderedDict
+
+from PySide2 import QtGui
+
+
+class IconEntry(object):
+    """
+    Everything an ImageButton needs from its image, read once
+
+    Attributes:
+        size (QtCore.QSize): image size, the button and icon size
+        on (QtGui.QPixmap): icon while toggled on
+        off (QtGui.QPixmap): disabled look, while toggled off
+        name (str): clean name of image without path or extension, the ctrl name
+        nbytes (int): memory held by both pixmaps
+    """
+    def __init__(self, path, image=None):
+        """
+        Args:
+            path (str): path to image, Qt resource paths like ":/out_joint.png" work too
+            image (QtGui.QImage): already decoded image, e.g. by IconCache.prewarm
+        """
+        self.on = QtGui.QPixmap.fromImage(image) if image is not None else QtGui.QPixmap(path)
+        self.size = self.on.size()
+        icon = QtGui.QIcon()
+        icon.addPixmap(self.on, QtGui.QIcon.Normal, QtGui.QIcon.On)
+        self.off = icon.pixmap(self.size, QtGui.QIcon.Disabled, QtGui.QIcon.On)
+        self.name = os.path.basename(os.path.splitext(path)[0])
+        self.nbytes = sum(p.width() * p.height() * max(p.depth(), 8) // 8 for p in (self.on, self.off))
+
+
+class IconCache(object):
+    """
+    Process wide cache of ImageButton icons, keyed by path and modification time so edited images reload.
+    Least recently used icons are dropped once the pixmaps go over the byte budget.
+
+    Example:
+        Decode a picker's images in the background before its window opens ::
+
+            from ui_stuff.icon_cache import get_cache
+
+            get_cache().prewarm(glob.glob("picker_icons/*.png"))
+            ...
+            print(get_cache().report())
+    """
+    def __init__(self, budget=64 * 1024 * 1024):
+        """
+        Args:
+            budget (int): bytes of pixmaps to keep
+        """
+        self.budget = budget
+        self.entries = OrderedDict()  # (path, mtime) -> IconEntry, least recently used first
+        self.keys = {}  # path -> its current key, to drop entries of older versions of a file
+        self.images = {}  # (path, mtime) -> QImage decoded by prewarm, not yet turned into pixmaps
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.prewarmed = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def key(path):
+        """
+        Returns:
+            tuple: (absolute path, mtime in ns), mtime is None for Qt resources and missing files
+        """
+        if path.startswith(":"):
+            return path, None
+        path = os.path.abspath(path)
+        try:
+            return path, os.stat(path).st_mtime_ns
+        except OSError:
+            return path, None
+
+    def get(self, path):
+        """
+        Pixmaps are made in the calling thread, so call this from the UI thread
+
+        Args:
+            path (str): path to image
+
+        Returns:
+            IconEntry: cached icon of the image
+        """
+        key = self.key(path)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        with self.lock:
+            image = self.images.pop(key, None)
+        if image is not None:
+            self.prewarmed += 1
+        else:
+            self.misses += 1
+        entry = IconEntry(path, image)
+        self.add(key, entry)
+        return entry
+
+    def add(self, key, entry):
+        old = self.keys.get(key[0])
+        if old is not None and old != key and old in self.entries:  # Image changed on disk
+            self.nbytes -= self.entries.pop(old).nbytes
+        self.keys[key[0]] = key
+        self.entries[key] = entry
+        self.nbytes += entry.nbytes
+        while self.nbytes > self.budget and len(self.entries) > 1:
+            _, dropped = self.entries.popitem(last=False)
+            self.nbytes -= dropped.nbytes
+            self.evictions += 1
+
+    def prewarm(self, paths, background=True):
+        """
+        Decodes images not cached yet, so the first get of each skips the disk.
+        QImage is safe off the UI thread, the pixmaps are still made in get
+
+        Args:
+            paths (list[str]): image paths
+            background (bool): if True, decodes in a daemon thread and returns right away
+
+        Returns:
+            threading.Thread or None: the thread decoding, None when not in the background
+        """
+        keys = [self.key(path) for path in paths]
+
+        def decode():
+            for key in keys:
+                if key in self.entries or key in self.images:
+                    continue
+                image = QtGui.QImage(key[0])
+                with self.lock:
+                    self.images[key] = image
+
+        if not background:
+            decode()
+            return None
+        thread = threading.Thread(target=decode, name="IconCache.prewarm", daemon=True)
+        thread.start()
+        return thread
+
+    def clear(self):
+        with self.lock:
+            self.images.clear()
+        self.entries.clear()
+        self.keys.clear()
+        self.nbytes = 0
+
+    def stats(self):
+        """
+        Returns:
+            dict: {"hits", "misses", "prewarmed", "evictions", "hit_rate", "entries", "bytes", "budget"}
+        """
+        lookups = self.hits + self.misses + self.prewarmed
+        return {"hits": self.hits, "misses": self.misses, "prewarmed": self.prewarmed, "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0, "entries": len(self.entries),
+                "bytes": self.nbytes, "budget": self.budget}
+
+    def report(self):
+        """
+        Returns:
+            str: one line summary of stats
+        """
+        s = self.stats()
+        return (f"icon cache: {s['hit_rate']:.1%} hit rate ({s['hits']} hits, {s['misses']} read from disk, "
+                f"{s['prewarmed']} prewarmed), {s['entries']} icons, "
+                f"{s['bytes'] / 1048576.0:.1f} of {s['budget'] / 1048576.0:.1f} MB, {s['evictions']} evicted")
+
+
+_cache = None
+
+
+def get_cache():
+    """
+    Returns:
+        IconCache: the cache every ImageButton shares
+    """
+    global _cache
+    if _cache is None:
+        _cache = IconCache()
+    return _cache
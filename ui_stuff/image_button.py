@@ -1,11 +1,14 @@
 import os
-from PySide2 import QtCore, QtWidgets, QtGui
+from PySide2 import QtWidgets
+
+from ui_stuff.icon_cache import get_cache
 
 
 class ImageButton(QtWidgets.QPushButton):
     """
     Creates an ImageButton object that is a QPushButton with an image icon inside.
-    Size of icon is determined by size of image.
+    Size of icon is determined by size of image. Images are read once per process through ui_stuff.icon_cache,
+    so buttons sharing an image, or a picker opened again, skip the disk.
 
     Example:
         Place an icon and connect it to corresponding controller with maya cmds ::
@@ -31,7 +34,8 @@ class ImageButton(QtWidgets.QPushButton):
             y (float):  y pixel coordinate relative to parent widget
 
         """
-        size = QtGui.QImageReader(img).size()
+        entry = get_cache().get(img)
+        size = entry.size
 
         self.setStyleSheet("QPushButton {"
                            "border: none;"
@@ -50,16 +54,14 @@ class ImageButton(QtWidgets.QPushButton):
 
         self.setFixedSize(size.width(), size.height())
         self.move(x, y)
-        self.setToolTip(self.get_img_name(img))
+        self.setToolTip(entry.name)
 
-        # Two versions of icon, one for toggled state and one for not toggled
-        icon = QtGui.QIcon()
-        toggle_on = QtGui.QPixmap(img)
-        icon.addPixmap(toggle_on, QtGui.QIcon.Normal, QtGui.QIcon.On)
-        toggle_off = icon.pixmap(toggle_on.size(), QtGui.QIcon.Disabled, QtGui.QIcon.On)
+        # Two versions of icon, one for toggled state and one for not toggled, shared with other buttons
+        toggle_on = entry.on
+        toggle_off = entry.off
 
         self.setIcon(toggle_off)
-        self.setIconSize(QtCore.QSize(size))  # Button and icon have same dimensions
+        self.setIconSize(size)  # Button and icon have same dimensions
 
         self.setCheckable(True)
 
@@ -79,5 +81,4 @@ class ImageButton(QtWidgets.QPushButton):
         Returns:
             str: clean name of image without path or extension
         """
-        path = os.path.splitext(QtGui.QImageReader(img).fileName())[0]
-        return os.path.basename(path)
+        return os.path.basename(os.path.splitext(img)[0])
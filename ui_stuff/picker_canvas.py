@@ -0,0 +1,253 @@
+import os
+
+from PySide2 import QtCore, QtGui, QtWidgets
+
+
+def pack_atlas(sizes, width=2048, padding=1):
+    """
+    Shelf packs rectangles into one image, tallest first, new shelf when a row is full
+
+    Args:
+        sizes (list[QtCore.QSize]): image sizes
+        width (int): atlas width, grows to the widest image if needed
+        padding (int): pixels between images, so smooth scaling never bleeds a neighbour in
+
+    Returns:
+        tuple[list[QtCore.QRect], QtCore.QSize]: rect of each size in the atlas, and the atlas size
+    """
+    width = max([width] + [size.width() + padding for size in sizes])
+    rects = [None] * len(sizes)
+    x = y = shelf = 0
+    for i in sorted(range(len(sizes)), key=lambda i: -sizes[i].height()):
+        size = sizes[i]
+        if x + size.width() > width:
+            x, y, shelf = 0, y + shelf + padding, 0
+        rects[i] = QtCore.QRect(x, y, size.width(), size.height())
+        x += size.width() + padding
+        shelf = max(shelf, size.height())
+    return rects, QtCore.QSize(width, y + shelf)
+
+
+class PickerItem(object):
+    """
+    One control on a PickerCanvas
+
+    Attributes:
+        name (str): ctrl name, also the tooltip
+        img (str): path to image
+        rect (QtCore.QRect): place on the canvas
+        source (QtCore.QRect): place in the atlas
+        checked (bool): toggled on
+    """
+    __slots__ = ("name", "img", "rect", "source", "checked")
+
+    def __init__(self, name, img, x, y):
+        self.name = name
+        self.img = img
+        self.rect = QtCore.QRect(x, y, 0, 0)
+        self.source = None
+        self.checked = False
+
+
+class PickerCanvas(QtWidgets.QWidget):
+    """
+    A whole picker in one widget, the lighter stand in for a parent widget full of ImageButtons.
+    Every icon is painted from one packed atlas image, and clicks find their control through a grid
+    of cells instead of one QPushButton, style sheet and hover handler per control.
+    Controls toggle on click like ImageButton, with the same on and disabled looks, hover colour and tooltip.
+
+    Example:
+        Place icons and select the corresponding controllers with maya cmds ::
+
+            def create_widgets(self):
+                self.ctrl_wdg = PickerCanvas()
+                for img, x, y in icons:
+                    self.ctrl_wdg.add_img(img, x, y)
+                self.ctrl_wdg.clicked.connect(lambda name: cmds.select(f'{name}', tgl=True))
+    """
+    clicked = QtCore.Signal(str)
+    toggled = QtCore.Signal(str, bool)
+
+    hover_color = QtGui.QColor("#444444")
+
+    def __init__(self, parent=None, cell=64):
+        """
+        Args:
+            parent (QtWidgets.QWidget): parent widget
+            cell (int): grid cell size in pixels, around the size of an icon works best
+        """
+        super(PickerCanvas, self).__init__(parent)
+        self.cell = cell
+        self.items = []
+        self.names = {}  # name -> index in items
+        self.grid = {}  # (column, row) -> indices of items overlapping that cell, in paint order
+        self.atlas_on = None
+        self.atlas_off = None
+        self.hovered = None
+        self.pressed = None
+        self.setMouseTracking(True)
+        self.setStyleSheet("QToolTip { color: white; background-color: black; border: none; }")
+
+    def __len__(self):
+        return len(self.items)
+
+    def add_img(self, img, x=0, y=0, name=None):
+        """
+        Takes image path and coordinates to place relative to the canvas, like ImageButton
+
+        Args:
+            img (str): Path to image
+            x (int): x pixel coordinate relative to canvas
+            y (int): y pixel coordinate relative to canvas
+            name (str): ctrl name, defaults to the image name like ImageButton.get_img_name
+
+        Returns:
+            str: name of the control
+        """
+        name = name or self.get_img_name(img)
+        self.names[name] = len(self.items)
+        self.items.append(PickerItem(name, img, x, y))
+        self.atlas_on = None  # Packed again on the next paint
+        return name
+
+    @staticmethod
+    def get_img_name(img):  # Icon name matches ctrl name
+        return os.path.basename(os.path.splitext(img)[0])
+
+    def build(self):
+        """
+        Packs every distinct image into the atlas and fills the grid. Runs on the first paint after add_img,
+        call it directly to pay for it before the window shows
+        """
+        paths = list(dict.fromkeys(item.img for item in self.items))
+        images = [QtGui.QImage(path) for path in paths]
+        rects, size = pack_atlas([image.size() for image in images])
+
+        atlas = QtGui.QImage(size, QtGui.QImage.Format_ARGB32_Premultiplied)
+        atlas.fill(QtCore.Qt.transparent)
+        painter = QtGui.QPainter(atlas)
+        for image, rect in zip(images, rects):
+            painter.drawImage(rect.topLeft(), image)
+        painter.end()
+
+        self.atlas_on = QtGui.QPixmap.fromImage(atlas)
+        icon = QtGui.QIcon()
+        icon.addPixmap(self.atlas_on, QtGui.QIcon.Normal, QtGui.QIcon.On)
+        self.atlas_off = icon.pixmap(self.atlas_on.size(), QtGui.QIcon.Disabled, QtGui.QIcon.On)  # One pass
+
+        sources = dict(zip(paths, rects))
+        self.grid = {}
+        bounds = QtCore.QRect()
+        for index, item in enumerate(self.items):
+            item.source = sources[item.img]
+            item.rect.setSize(item.source.size())
+            bounds = bounds.united(item.rect)
+            for key in self.cells(item.rect):
+                self.grid.setdefault(key, []).append(index)
+        self.setMinimumSize(bounds.right() + 1, bounds.bottom() + 1)
+
+    def cells(self, rect):
+        """
+        Returns:
+            list[tuple]: (column, row) of every grid cell rect overlaps
+        """
+        c = self.cell
+        return [(column, row)
+                for column in range(rect.left() // c, rect.right() // c + 1)
+                for row in range(rect.top() // c, rect.bottom() // c + 1)]
+
+    def item_at(self, pos):
+        """
+        Args:
+            pos (QtCore.QPoint): point on the canvas
+
+        Returns:
+            int or None: index of the topmost item under pos
+        """
+        if self.atlas_on is None:
+            self.build()
+        for index in reversed(self.grid.get((pos.x() // self.cell, pos.y() // self.cell), ())):
+            if self.items[index].rect.contains(pos):
+                return index
+        return None
+
+    def is_checked(self, name):
+        return self.items[self.names[name]].checked
+
+    def set_checked(self, name, checked=True):
+        """
+        Toggles a control without clicking it, e.g. to match the scene selection. Emits toggled, not clicked
+        """
+        item = self.items[self.names[name]]
+        if item.checked != checked:
+            item.checked = checked
+            self.update(item.rect)
+            self.toggled.emit(name, checked)
+
+    def paintEvent(self, event):
+        if self.atlas_on is None:
+            self.build()
+        area = event.rect()
+        indices = set()
+        for key in self.cells(area):
+            indices.update(self.grid.get(key, ()))
+
+        painter = QtGui.QPainter(self)
+        for index in sorted(indices):  # Insertion order, later controls on top like later siblings
+            item = self.items[index]
+            if not item.rect.intersects(area):
+                continue
+            if index == self.hovered:
+                painter.fillRect(item.rect, self.hover_color)
+            painter.drawPixmap(item.rect, self.atlas_on if item.checked else self.atlas_off, item.source)
+        painter.end()
+
+    def set_hovered(self, index):
+        if index == self.hovered:
+            return
+        for old in (self.hovered, index):
+            if old is not None:
+                self.update(self.items[old].rect)  # Only the two icons repaint
+        self.hovered = index
+
+    def mouseMoveEvent(self, event):
+        self.set_hovered(self.item_at(event.pos()))
+        super(PickerCanvas, self).mouseMoveEvent(event)
+
+    def leaveEvent(self, event):
+        self.set_hovered(None)
+        super(PickerCanvas, self).leaveEvent(event)
+
+    def mousePressEvent(self, event):
+        if event.button() == QtCore.Qt.LeftButton:
+            self.pressed = self.item_at(event.pos())
+        super(PickerCanvas, self).mousePressEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        if event.button() == QtCore.Qt.LeftButton and self.pressed is not None:
+            index, self.pressed = self.pressed, None
+            if self.item_at(event.pos()) == index:  # Released over the same icon, like a QPushButton click
+                item = self.items[index]
+                self.set_checked(item.name, not item.checked)
+                self.clicked.emit(item.name)
+        super(PickerCanvas, self).mouseReleaseEvent(event)
+
+    def event(self, event):
+        if event.type() == QtCore.QEvent.ToolTip:
+            index = self.item_at(event.pos())
+            if index is None:
+                QtWidgets.QToolTip.hideText()
+                event.ignore()
+            else:
+                QtWidgets.QToolTip.showText(event.globalPos(), self.items[index].name, self, self.items[index].rect)
+            return True
+        return super(PickerCanvas, self).event(event)
+
+    def nbytes(self):
+        """
+        Returns:
+            int: memory held by both atlas pixmaps
+        """
+        if self.atlas_on is None:
+            return 0
+        return sum(p.width() * p.height() * p.depth() // 8 for p in (self.atlas_on, self.atlas_off))
@@ -0,0 +1,418 @@
+'''
+KD-tree over a mesh's vertex positions, for batched nearest vertex, radius and mirror queries in place of
+linear scans over get_vtx_pos tuples. Trees are saved next to the scene and only rebuilt when the mesh's
+topology signature or vertex positions change, see VtxTree.for_mesh.
+'''
+
+import hashlib
+import os
+
+import numpy as np
+
+from get_vtx_pos import get_topology_signature, get_vtx_positions
+from rig_stuff.lazy_cmds import cmds
+
+VERSION = 2
+
+
+class VtxTree(object):
+    """
+    Balanced KD-tree built a level at a time with NumPy, every node at a level split in one pass.
+    The tree is implicit: node n has children 2n + 1 and 2n + 2, and every leaf holds the same number of
+    slots of order, padded past the last vertex so the levels stay rectangular.
+
+    Example:
+        Mirror a vertex selection and name paired points ::
+
+            tree = VtxTree.for_mesh("body_geo")
+            mirror = tree.mirror_table()
+            other_side = mirror[selected_indices]
+            pairs = tree.symmetry_pairs()["pairs"]  # [Lf_, Rt_] vertex of each pair
+
+    Attributes:
+        positions (numpy.ndarray): (N, 3) vertex positions
+        signature (tuple): topology signature the tree was built for, see get_topology_signature
+        leaf_size (int): slots per leaf
+        levels (int): splits from the root to a leaf
+        order (numpy.ndarray): vertex of every slot, leaf by leaf, N or more for padding
+        split_axis, split_value (numpy.ndarray): split of each inner node
+        lo, hi (numpy.ndarray): bounds of each node's vertices
+    """
+    def __init__(self, positions, leaf_size=16, signature=None):
+        """
+        Args:
+            positions (numpy.ndarray): (N, 3) vertex positions, get_vtx_positions output
+            leaf_size (int): most vertices per leaf
+            signature (tuple): topology signature to save with the tree
+        """
+        self.positions = np.ascontiguousarray(positions, dtype=np.float64).reshape(-1, 3)
+        self.signature = tuple(signature) if signature is not None else None
+        count = len(self.positions)
+        self.levels = max(0, int(np.ceil(np.log2(max(count, 1) / float(leaf_size)))))
+        self.leaf_size = -(-max(count, 1) // (1 << self.levels))
+        self.order = None  # Built by the first query that needs it, mirror_table mostly doesn't
+
+    def __len__(self):
+        return len(self.positions)
+
+    def build(self):
+        """
+        Splits every node of a level at once, at the median of the longest side of its cell.
+        Padding slots sort to either end of a node, half each way, so every leaf keeps real vertices
+        """
+        count = len(self.positions)
+        slots = self.leaf_size << self.levels
+        coords = np.zeros((3, slots))  # Axis major, so each level reads one axis per node
+        coords[:, :count] = self.positions.T
+        flat = coords.ravel()
+        order = np.arange(slots)  # Slots past count are padding
+        cell_lo = self.positions.min(axis=0, keepdims=True) if count else np.zeros((1, 3))
+        cell_hi = self.positions.max(axis=0, keepdims=True) if count else np.zeros((1, 3))
+
+        inner = (1 << self.levels) - 1
+        self.split_axis = np.zeros(inner, dtype=np.int8)
+        self.split_value = np.zeros(inner)
+        for level in range(self.levels):
+            rows = 1 << level
+            block = order.reshape(rows, -1)
+            half = block.shape[1] // 2
+            axis = (cell_hi - cell_lo).argmax(axis=1)  # Longest side of the node's cell, not its exact bounds
+            values = flat[axis[:, None] * slots + block]
+            pad = block >= count
+            if count < slots:
+                first_half = np.cumsum(pad, axis=1) <= pad.sum(axis=1, keepdims=True) // 2
+                values[pad] = np.where(first_half[pad], -np.inf, np.inf)
+            part = np.argpartition(values, half, axis=1)
+            block[:] = np.take_along_axis(block, part, axis=1)
+            split = values[np.arange(rows), part[:, half]]
+            nodes = np.arange(rows) + rows - 1
+            self.split_axis[nodes] = axis
+            self.split_value[nodes] = split
+
+            cell_lo, cell_hi = np.repeat(cell_lo, 2, axis=0), np.repeat(cell_hi, 2, axis=0)
+            cell_hi[0::2][np.arange(rows), axis] = split
+            cell_lo[1::2][np.arange(rows), axis] = split
+        self.order = order
+        self.update_bounds()
+
+    def update_bounds(self):
+        """
+        Bounds of every node from its real vertices, leaves first. Each leaf's vertices are copied out
+        in slot order, so queries read a leaf as one contiguous block
+        """
+        leaves = 1 << self.levels
+        count = len(self.positions)
+        slots = self.order.reshape(leaves, self.leaf_size)
+        real = slots < count
+        self.leaf_vertex = np.where(real, slots, -1)
+        # Padding repeats a real vertex of its leaf so the bounds stay tight
+        first = slots[np.arange(leaves), real.argmax(axis=1)]
+        self.leaf_points = self.positions[np.where(real, slots, first[:, None])] if count else \
+            np.zeros((leaves, self.leaf_size, 3))
+        self.lo = np.empty((2 * leaves - 1, 3))
+        self.hi = np.empty((2 * leaves - 1, 3))
+        self.lo[leaves - 1:] = self.leaf_points.min(axis=1)
+        self.hi[leaves - 1:] = self.leaf_points.max(axis=1)
+        for level in range(self.levels - 1, -1, -1):
+            nodes = np.arange(1 << level) + (1 << level) - 1
+            self.lo[nodes] = np.minimum(self.lo[2 * nodes + 1], self.lo[2 * nodes + 2])
+            self.hi[nodes] = np.maximum(self.hi[2 * nodes + 1], self.hi[2 * nodes + 2])
+
+    def box_distance(self, points, nodes):
+        gap = np.maximum(np.maximum(self.lo[nodes] - points, points - self.hi[nodes]), 0.0)
+        return np.einsum("ij,ij->i", gap, gap)
+
+    def leaf_distances(self, points, leaves):
+        """
+        Args:
+            points (numpy.ndarray): (M, 3) one point per leaf
+            leaves (numpy.ndarray): (M,) leaf numbers, 0 is the first leaf
+
+        Returns:
+            numpy.ndarray: (M, leaf_size) squared distance to each slot of the leaf, inf for padding
+        """
+        delta = self.leaf_points[leaves] - points[:, None]
+        dist = np.einsum("ijk,ijk->ij", delta, delta)
+        dist[self.leaf_vertex[leaves] < 0] = np.inf
+        return dist
+
+    def descend(self, points):
+        """
+        Returns:
+            numpy.ndarray: leaf number each point falls in by the splits
+        """
+        node = np.zeros(len(points), dtype=np.int64)
+        rows = np.arange(len(points))
+        for _ in range(self.levels):
+            right = points[rows, self.split_axis[node]] >= self.split_value[node]
+            node = 2 * node + 1 + right
+        return node - ((1 << self.levels) - 1)
+
+    def walk(self, points, limit):
+        """
+        Takes (point, node) pairs down the tree a level at a time, dropping nodes further than limit
+
+        Args:
+            points (numpy.ndarray): (P, 3) query points
+            limit (numpy.ndarray): (P,) squared distance of each
+
+        Returns:
+            tuple[numpy.ndarray, numpy.ndarray]: point and leaf number of every pair reaching a leaf, by point
+        """
+        if self.order is None:
+            self.build()
+        pair_point = np.arange(len(points))
+        pair_node = np.zeros(len(points), dtype=np.int64)
+        for level in range(self.levels + 1):
+            keep = self.box_distance(points[pair_point], pair_node) <= limit[pair_point]
+            pair_point, pair_node = pair_point[keep], pair_node[keep]
+            if level < self.levels:
+                pair_node = (2 * pair_node[:, None] + [1, 2]).ravel()
+                pair_point = np.repeat(pair_point, 2)
+        return pair_point, pair_node - ((1 << self.levels) - 1)
+
+    def query(self, points, k=1, chunk=4096):
+        """
+        k nearest vertices of each point
+
+        Args:
+            points (numpy.ndarray): (P, 3) query points
+            k (int): neighbours per point
+            chunk (int): points per pass, bounds the memory of a pass
+
+        Returns:
+            tuple[numpy.ndarray, numpy.ndarray]: (P, k) distances and (P, k) vertex indices, nearest first,
+            inf and -1 where the mesh has fewer than k vertices
+        """
+        if self.order is None:
+            self.build()
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        best = np.full((len(points), k), np.inf)
+        index = np.full((len(points), k), -1, dtype=np.int64)
+        for start in range(0, len(points), chunk):
+            part = points[start:start + chunk]
+            rows = np.arange(len(part))
+
+            # The k-th distance among the leaves next to the one each point falls in bounds the walk
+            span = min(1 << self.levels, 1 << max(0, int(np.ceil(np.log2(2.0 * k / self.leaf_size)))))
+            first = self.descend(part) // span * span
+            near = (first[:, None] + np.arange(span)).ravel()
+            home = self.leaf_distances(np.repeat(part, span, axis=0), near).reshape(len(part), -1)
+            bound = np.partition(home, k - 1, axis=1)[:, k - 1] if home.shape[1] >= k else np.full(len(part), np.inf)
+            pair_point, leaf = self.walk(part, bound)
+
+            # Every leaf a point reached goes in that point's row, then the k smallest of each row are kept
+            counts = np.bincount(pair_point, minlength=len(part))
+            rank = np.arange(len(pair_point)) - (np.cumsum(counts) - counts)[pair_point]
+            width = max(int(counts.max()), -(-k // self.leaf_size))
+            dist = np.full((len(part), width, self.leaf_size), np.inf)
+            vertex = np.full((len(part), width, self.leaf_size), -1, dtype=np.int64)
+            dist[pair_point, rank] = self.leaf_distances(part[pair_point], leaf)
+            vertex[pair_point, rank] = self.leaf_vertex[leaf]
+            dist, vertex = dist.reshape(len(part), -1), vertex.reshape(len(part), -1)
+            pick = np.argpartition(dist, k - 1, axis=1)[:, :k] if dist.shape[1] > k else \
+                np.broadcast_to(np.arange(k), (len(part), k))
+            pick = np.take_along_axis(pick, np.argsort(dist[rows[:, None], pick], axis=1), axis=1)
+            best[start:start + chunk] = dist[rows[:, None], pick]
+            index[start:start + chunk] = vertex[rows[:, None], pick]
+        return np.sqrt(best), index
+
+    def nearest(self, points):
+        """
+        Closest vertex to each point, e.g. to snap locators or joints to a mesh.
+        For the closest point on the surface use rig_stuff.keep_out.TriangleBvh.closest
+
+        Returns:
+            tuple[numpy.ndarray, numpy.ndarray]: (P,) vertex indices and (P, 3) their positions
+        """
+        _, index = self.query(points, 1)
+        return index[:, 0], self.positions[index[:, 0]]
+
+    def query_radius(self, points, radius):
+        """
+        Every vertex within radius of each point
+
+        Args:
+            points (numpy.ndarray): (P, 3) query points
+            radius (float or numpy.ndarray): distance, or (P,) distance per point
+
+        Returns:
+            dict: {"index": vertices, "distance": their distances, nearest first within each point,
+                   "offsets": (P + 1,) point i's hits are index[offsets[i]:offsets[i + 1]]}
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        limit = np.broadcast_to(np.asarray(radius, dtype=np.float64) ** 2, (len(points),))
+        point, leaf = self.walk(points, limit)
+        dist = self.leaf_distances(points[point], leaf)
+        vertex = self.leaf_vertex[leaf]
+        inside = dist <= limit[point][:, None]
+        point, vertex, dist = np.broadcast_to(point[:, None], inside.shape)[inside], vertex[inside], dist[inside]
+        order = np.lexsort((dist, point))
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(point, minlength=len(points)))])
+        return {"index": vertex[order], "distance": np.sqrt(dist[order]), "offsets": offsets}
+
+    def mirror_table(self, axis=0, tolerance=1e-4):
+        """
+        Vertex on the other side of each vertex. Vertices are matched by hashing them onto a tolerance sized
+        grid, only the ones the grid can't pair go through the tree
+
+        Args:
+            axis (int): mirror axis, 0 for x
+            tolerance (float): furthest a mirrored vertex can be from its match
+
+        Returns:
+            numpy.ndarray: (N,) mirrored vertex of each vertex, itself on the centre line, -1 if unmatched
+        """
+        positions = self.positions
+        mirrored = positions.copy()
+        mirrored[:, axis] *= -1.0
+        table = np.full(len(positions), -1, dtype=np.int64)
+
+        # Keyed on the unsigned side, a vertex and its mirror share a grid cell, so one sort lines them up
+        cells = np.floor(positions / tolerance + 0.5).astype(np.int64)
+        side = np.sign(cells[:, axis])
+        cells[:, axis] = np.abs(cells[:, axis])
+        keys = (cells[:, 0] * 73856093) ^ (cells[:, 1] * 19349663) ^ (cells[:, 2] * 83492791)
+        sort = np.argsort(keys)
+        keys = keys[sort]
+        same = keys[1:] == keys[:-1]
+        alone = np.concatenate([[True], ~same]) & np.concatenate([~same, [True]])
+        centre = sort[alone & (side[sort] == 0)]
+        table[centre] = centre
+        start = np.flatnonzero(same & np.concatenate([[True], ~same[:-1]]) & np.concatenate([~same[1:], [True]]))
+        a, b = sort[start], sort[start + 1]  # Cells of exactly two vertices
+        delta = positions[a] - mirrored[b]
+        paired = (side[a] == -side[b]) & (side[a] != 0) & (np.einsum("ij,ij->i", delta, delta) <= tolerance ** 2)
+        table[a[paired]] = b[paired]
+        table[b[paired]] = a[paired]
+
+        # Vertices across a cell edge from their mirror, or sharing a cell with others, are searched for
+        missed = np.flatnonzero(table < 0)
+        if self.order is None and len(missed) <= 32:  # A few scans beat building the tree
+            for vertex in missed:
+                dist = np.einsum("ij,ij->i", positions - mirrored[vertex], positions - mirrored[vertex])
+                table[vertex] = dist.argmin() if dist.min() <= tolerance ** 2 else -1
+        elif len(missed):
+            dist, index = self.query(mirrored[missed], 1)
+            table[missed] = np.where(dist[:, 0] <= tolerance, index[:, 0], -1)
+        return table
+
+    def symmetry_pairs(self, axis=0, tolerance=1e-4):
+        """
+        Splits the vertices into mirrored pairs for Lf_/Rt_ naming, centre vertices and unmatched ones
+
+        Args:
+            axis (int): mirror axis, 0 for x
+            tolerance (float): see mirror_table
+
+        Returns:
+            dict: {"pairs": (M, 2) [positive side, negative side] vertices, the positive side is Lf_,
+                   "centre": vertices on the mirror plane, "unmatched": vertices with no mirror}
+        """
+        table = self.mirror_table(axis, tolerance)
+        side = self.positions[:, axis]
+        positive = np.flatnonzero((side > tolerance) & (table >= 0))
+        return {"pairs": np.stack([positive, table[positive]], axis=1),
+                "centre": np.flatnonzero(np.abs(side) <= tolerance),
+                "unmatched": np.flatnonzero(table < 0)}
+
+    def save(self, path):
+        """
+        Writes the tree as an uncompressed .npz, loads back without a rebuild.
+        Leaf bounds are cheap to redo, so only the splits and order are kept
+        """
+        if self.order is None:
+            self.build()
+        temp = f"{path}.tmp.npz"
+        np.savez(temp, version=VERSION, positions=self.positions, order=self.order,
+                 split_axis=self.split_axis, split_value=self.split_value,
+                 shape=[self.leaf_size, self.levels], signature=np.array(self.signature or (), dtype=np.int64),
+                 checksum=position_checksum(self.positions))
+        os.replace(temp, path)
+
+    @classmethod
+    def load(cls, path, signature=None, checksum=None):
+        """
+        Args:
+            path (str): .npz written by save
+            signature (tuple): topology signature the tree must match, None to skip the check
+            checksum (str): position_checksum the tree must match, None to skip the check
+
+        Returns:
+            VtxTree or None: None if the file is unreadable, from another version, for other topology
+            or for moved vertices
+        """
+        try:
+            with np.load(path) as data:
+                if int(data["version"]) != VERSION:
+                    return None
+                saved = tuple(int(v) for v in data["signature"])
+                if signature is not None and saved != tuple(signature):
+                    return None
+                if checksum is not None and str(data["checksum"]) != checksum:
+                    return None
+                tree = cls(data["positions"], signature=saved or None)
+                tree.leaf_size, tree.levels = (int(v) for v in data["shape"])
+                for name in ("order", "split_axis", "split_value"):
+                    setattr(tree, name, data[name])
+            tree.update_bounds()
+        except (OSError, KeyError, ValueError):
+            return None
+        return tree
+
+    @classmethod
+    def for_mesh(cls, mesh, path=None, rebuild=False):
+        """
+        Loads the mesh's saved tree if neither its topology nor its vertex positions changed, otherwise
+        builds and saves one. Positions are read every call, a bulk read is far cheaper than a build
+
+        Args:
+            mesh (str): mesh name
+            path (str): .npz to keep the tree in, defaults to index_path next to the open scene
+            rebuild (bool): if True, builds even when the saved tree matches
+
+        Returns:
+            VtxTree: tree of the mesh's world space vertices
+        """
+        signature = get_topology_signature(mesh)
+        positions = get_vtx_positions(mesh)
+        path = path or index_path(mesh)
+        if path and not rebuild and os.path.exists(path):
+            tree = cls.load(path, signature, position_checksum(positions))
+            if tree is not None:
+                return tree
+        tree = cls(positions, signature=signature)
+        if path:
+            tree.save(path)
+        return tree
+
+
+def position_checksum(positions):
+    """
+    Args:
+        positions (numpy.ndarray): (N, 3) vertex positions
+
+    Returns:
+        str: bounding box and a hash of every position, changes when any vertex moves
+    """
+    positions = np.ascontiguousarray(positions, dtype=np.float64).reshape(-1, 3)
+    digest = hashlib.blake2b(positions.tobytes(), digest_size=16).hexdigest()
+    if not len(positions):
+        return digest
+    bounds = np.concatenate([positions.min(axis=0), positions.max(axis=0)])
+    return " ".join(f"{v:.6g}" for v in bounds) + " " + digest
+
+
+def index_path(mesh):
+    """
+    Args:
+        mesh (str): mesh name
+
+    Returns:
+        str or None: "<scene>.<mesh>.vtx_index.npz" beside the open scene, None for an unsaved scene
+    """
+    scene = cmds.file(q=True, sceneName=True)
+    if not scene:
+        return None
+    name = mesh.strip("|").replace("|", "_").replace(":", "_")
+    return f"{os.path.splitext(scene)[0]}.{name}.vtx_index.npz"